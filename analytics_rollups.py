@@ -0,0 +1,354 @@
+# analytics_rollups.py
+
+# --- Daily analytics rollups ---
+# One row per (day, country, region, calculation_route, channel_type, metric)
+# holding count, sum, sum of squares, min, max and a t-digest-style quantile
+# sketch. refresh_rollups() folds only analytics rows with id above a stored
+# watermark into the rollups, so refresh cost tracks new data, not history.
+# Ids are handed out before commit, so a lower id can become visible after a
+# higher one. The watermark therefore stops at the first row inserted less than
+# settle_seconds ago; by the time a row has settled, earlier inserts have
+# committed. Settling uses inserted_at, which the database sets (see utcnow()),
+# not the request timestamp: a row replayed from the writer journal hours later
+# keeps its old timestamp but is only just being inserted.
+# Full refreshes run from the daily script or `flask refresh-rollups`; the
+# dashboard only does a small bounded catch-up that never waits on a refresher.
+# Blank/NULL dimensions are stored as '' so they can be part of the key.
+
+import json
+import math
+from datetime import datetime, timedelta
+
+from sqlalchemy import DateTime, and_, bindparam, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+SKETCH_COMPRESSION = 100
+ROLLUP_SETTLE_SECONDS = 300
+WATERMARK_NAME = 'daily'
+ROLLUP_DIMENSIONS = ('country', 'region', 'calculation_route', 'channel_type')
+
+
+class utcnow(FunctionElement):
+    """The database's current UTC time, naive like datetime.utcnow(); usable as a server_default."""
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow)
+def _utcnow_default(element, compiler, **kw):
+    return 'CURRENT_TIMESTAMP'  # SQLite keeps CURRENT_TIMESTAMP in UTC
+
+
+@compiles(utcnow, 'postgresql')
+def _utcnow_postgresql(element, compiler, **kw):
+    return "TIMEZONE('utc', CURRENT_TIMESTAMP)"
+
+
+class QuantileSketch:
+    """
+    Merging t-digest: sorted [mean, weight] centroids, each spanning at most one unit of
+    the k1 scale function. Exact (percentile_cont) while it holds <= compression points.
+    """
+
+    def __init__(self, centroids=None, compression=SKETCH_COMPRESSION):
+        self.compression = compression
+        self.centroids = sorted([float(m), float(w)] for m, w in (centroids or []))
+
+    @property
+    def total(self):
+        return sum(w for _m, w in self.centroids)
+
+    def add(self, value, weight=1.0):
+        self.centroids.append([float(value), float(weight)])
+        if len(self.centroids) > 2 * self.compression:
+            self._compress()
+
+    def merge(self, other):
+        self.centroids.extend([m, w] for m, w in other.centroids)
+        self._compress()
+        return self
+
+    def _compress(self):
+        self.centroids.sort()
+        if len(self.centroids) <= self.compression:
+            return
+        total = self.total
+        merged = [list(self.centroids[0])]
+        before = 0.0
+        for mean, weight in self.centroids[1:]:
+            last = merged[-1]
+            if self._scale((before + last[1] + weight) / total) - self._scale(before / total) <= 1.0:
+                last[0] = (last[0] * last[1] + mean * weight) / (last[1] + weight)
+                last[1] += weight
+            else:
+                before += last[1]
+                merged.append([mean, weight])
+        self.centroids = merged
+
+    def _scale(self, q):
+        """k1 scale function: centroids are small near the tails, at most ~compression in total."""
+        return self.compression / (2 * math.pi) * math.asin(2 * min(max(q, 0.0), 1.0) - 1)
+
+    def quantile(self, q):
+        """Linear interpolation between centroid centres (rank space), like percentile_cont."""
+        self._compress()
+        if not self.centroids:
+            return None
+        if len(self.centroids) == 1:
+            return self.centroids[0][0]
+        target = q * (self.total - 1) + 0.5
+        before = 0.0
+        prev_mean, prev_centre = None, None
+        for mean, weight in self.centroids:
+            centre = before + weight / 2.0
+            if centre >= target:
+                if prev_centre is None:
+                    return mean
+                return prev_mean + (mean - prev_mean) * (target - prev_centre) / (centre - prev_centre)
+            prev_mean, prev_centre = mean, centre
+            before += weight
+        return self.centroids[-1][0]
+
+    def to_json(self):
+        self._compress()
+        return json.dumps(self.centroids, separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, text):
+        return cls(json.loads(text) if text else [])
+
+
+class RollupAggregate:
+    """count/sum/sum_sq/min/max plus a quantile sketch for one rollup key."""
+
+    __slots__ = ('count', 'total', 'total_sq', 'minimum', 'maximum', 'sketch')
+
+    def __init__(self, count=0, total=0.0, total_sq=0.0, minimum=None, maximum=None, sketch=None):
+        self.count = count
+        self.total = total
+        self.total_sq = total_sq
+        self.minimum = minimum
+        self.maximum = maximum
+        self.sketch = sketch if sketch is not None else QuantileSketch()
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.total_sq += value * value
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+        self.sketch.add(value)
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.total_sq += other.total_sq
+        for attr, pick in (('minimum', min), ('maximum', max)):
+            mine, theirs = getattr(self, attr), getattr(other, attr)
+            setattr(self, attr, theirs if mine is None else (mine if theirs is None else pick(mine, theirs)))
+        self.sketch.merge(other.sketch)
+        return self
+
+    def stats(self):
+        """{'avg','min','max','median','count','stddev'} (zeros when empty)."""
+        if not self.count:
+            return {'avg': 0, 'min': 0, 'max': 0, 'median': 0, 'count': 0, 'stddev': 0}
+        mean = self.total / self.count
+        variance = max(self.total_sq / self.count - mean * mean, 0.0)
+        return {
+            'avg': mean,
+            'min': self.minimum,
+            'max': self.maximum,
+            'median': self.sketch.quantile(0.5),
+            'count': self.count,
+            'stddev': variance ** 0.5,
+        }
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(row['value_count'], row['value_sum'], row['value_sum_sq'], row['value_min'],
+                   row['value_max'], QuantileSketch.from_json(row['sketch']))
+
+    def to_columns(self):
+        return {
+            'value_count': self.count,
+            'value_sum': self.total,
+            'value_sum_sq': self.total_sq,
+            'value_min': self.minimum,
+            'value_max': self.maximum,
+            'sketch': self.sketch.to_json(),
+        }
+
+
+# --- Metrics ---
+# Each extractor maps an analytics row (mapping) to a float, or None to skip the row.
+# Fees, committed amounts and manday rates use the dashboard's "0 means not set" rule;
+# prices and volumes keep zeros.
+
+def _raw(column):
+    def extract(row):
+        value = row.get(column)
+        return float(value) if value is not None else None
+    return extract
+
+
+def _nonzero(column):
+    def extract(row):
+        value = row.get(column)
+        return float(value) if value not in (None, 0) else None
+    return extract
+
+
+def _discount_pct(price_column, rate_column):
+    def extract(row):
+        price, rate = row.get(price_column), row.get(rate_column)
+        if price is None or rate is None or rate <= 0:
+            return None
+        return (rate - price) / rate * 100
+    return extract
+
+
+def _one_time_dev_cost(row):
+    cost = ((row.get('bot_ui_manday_rate') or 0) * (row.get('bot_ui_mandays') or 0)
+            + (row.get('custom_ai_manday_rate') or 0) * (row.get('custom_ai_mandays') or 0))
+    return float(cost) if cost else None
+
+
+ROLLUP_METRICS = {
+    'calculations': lambda row: 1.0,
+    'platform_fee': _nonzero('platform_fee'),
+    'ai_price': _raw('ai_price'),
+    'advanced_price': _raw('advanced_price'),
+    'basic_marketing_price': _raw('basic_marketing_price'),
+    'basic_utility_price': _raw('basic_utility_price'),
+    'voice_notes_rate': _raw('voice_notes_rate'),
+    'committed_amount': _nonzero('committed_amount'),
+    'one_time_dev_cost': _one_time_dev_cost,
+    'bot_ui_manday_rate': _nonzero('bot_ui_manday_rate'),
+    'custom_ai_manday_rate': _nonzero('custom_ai_manday_rate'),
+    'ai_volume': _raw('ai_volume'),
+    'advanced_volume': _raw('advanced_volume'),
+    'basic_marketing_volume': _raw('basic_marketing_volume'),
+    'basic_utility_volume': _raw('basic_utility_volume'),
+    'ai_discount_pct': _discount_pct('ai_price', 'ai_rate_card_price'),
+    'advanced_discount_pct': _discount_pct('advanced_price', 'advanced_rate_card_price'),
+    'basic_marketing_discount_pct': _discount_pct('basic_marketing_price', 'basic_marketing_rate_card_price'),
+    'basic_utility_discount_pct': _discount_pct('basic_utility_price', 'basic_utility_rate_card_price'),
+    'voice_total_cost': _raw('voice_total_cost'),
+    'voice_cost_pstn_inbound': _raw('voice_cost_pstn_inbound'),
+    'voice_cost_pstn_outbound': _raw('voice_cost_pstn_outbound'),
+    'voice_cost_pstn_manual': _raw('voice_cost_pstn_manual'),
+    'voice_cost_wa_outbound': _raw('voice_cost_wa_outbound'),
+    'voice_cost_wa_inbound': _raw('voice_cost_wa_inbound'),
+}
+
+
+def rollup_key(row, metric):
+    timestamp = row.get('timestamp')
+    day = timestamp.date() if timestamp is not None else None
+    return (day,) + tuple(row.get(dim) or '' for dim in ROLLUP_DIMENSIONS) + (metric,)
+
+
+def aggregate_rows(rows):
+    """{rollup key: RollupAggregate} for a batch of analytics rows."""
+    partials = {}
+    for row in rows:
+        if row.get('timestamp') is None:
+            continue
+        for metric, extract in ROLLUP_METRICS.items():
+            value = extract(row)
+            if value is None:
+                continue
+            key = rollup_key(row, metric)
+            aggregate = partials.get(key)
+            if aggregate is None:
+                aggregate = partials[key] = RollupAggregate()
+            aggregate.add(value)
+    return partials
+
+
+_KEY_COLUMNS = ('day',) + ROLLUP_DIMENSIONS + ('metric',)
+
+
+def _merge_partials(conn, rollups, partials):
+    days = {key[0] for key in partials}
+    existing = {
+        tuple(row[c] for c in _KEY_COLUMNS): row
+        for row in conn.execute(select(rollups).where(rollups.c.day.in_(days))).mappings()
+    }
+    inserts, updates = [], []
+    for key, aggregate in partials.items():
+        row = existing.get(key)
+        if row is not None:
+            aggregate = RollupAggregate.from_row(row).merge(aggregate)
+            values = {f'k_{c}': v for c, v in zip(_KEY_COLUMNS, key)}
+            values.update(aggregate.to_columns())
+            updates.append(values)
+        else:
+            values = dict(zip(_KEY_COLUMNS, key))
+            values.update(aggregate.to_columns())
+            inserts.append(values)
+    if inserts:
+        conn.execute(rollups.insert(), inserts)
+    if updates:
+        statement = rollups.update().where(
+            and_(*(rollups.c[c] == bindparam(f'k_{c}') for c in _KEY_COLUMNS))
+        ).values({c: bindparam(c) for c in RollupAggregate().to_columns()})
+        conn.execute(statement, updates)
+
+
+def refresh_rollups(engine, analytics, rollups, state, batch_size=5000, settle_seconds=ROLLUP_SETTLE_SECONDS,
+                    max_batches=None, wait=True):
+    """
+    Fold analytics rows above the watermark into the daily rollups, one transaction per
+    batch (rollups and watermark move together). The watermark row is locked FOR UPDATE
+    so concurrent refreshers serialize (wait=False gives up instead of queueing behind
+    one); it never passes a row inserted less than settle_seconds ago. Stops after
+    max_batches batches if given. Returns the number of analytics rows processed.
+    """
+    with engine.connect() as conn:
+        cutoff = conn.execute(select(utcnow())).scalar() - timedelta(seconds=settle_seconds)
+    processed = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        batches += 1
+        try:
+            with engine.begin() as conn:
+                last_id = conn.execute(
+                    select(state.c.last_analytics_id).where(state.c.name == WATERMARK_NAME)
+                    .with_for_update(nowait=not wait)
+                ).scalar()
+                if last_id is None:
+                    conn.execute(state.insert().values(name=WATERMARK_NAME, last_analytics_id=0, refreshed_at=datetime.utcnow()))
+                    last_id = 0
+                batch = conn.execute(
+                    select(analytics).where(analytics.c.id > last_id).order_by(analytics.c.id).limit(batch_size)
+                ).mappings().all()
+                rows = []
+                for row in batch:
+                    inserted_at = row.get('inserted_at')
+                    if inserted_at is not None and inserted_at > cutoff:
+                        break  # not settled: rows below it may still be committing
+                    rows.append(row)
+                if not rows:
+                    # Nothing settled to fold in: the rollups are current as of now
+                    conn.execute(
+                        state.update().where(state.c.name == WATERMARK_NAME).values(refreshed_at=datetime.utcnow())
+                    )
+                    return processed
+                _merge_partials(conn, rollups, aggregate_rows(rows))
+                conn.execute(
+                    state.update()
+                    .where(state.c.name == WATERMARK_NAME)
+                    .values(last_analytics_id=rows[-1]['id'], refreshed_at=datetime.utcnow())
+                )
+        except OperationalError:
+            if wait:
+                raise
+            return processed  # another refresher holds the watermark
+        processed += len(rows)
+        if len(rows) < len(batch):
+            return processed
+    return processed
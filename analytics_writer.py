@@ -0,0 +1,306 @@
+# analytics_writer.py
+
+# --- Background analytics writer ---
+# Analytics and FunnelEvent rows are queued in-process and written in bulk
+# (one executemany INSERT per table and column set) by a daemon thread, either
+# every `flush_interval` seconds or as soon as `batch_size` rows are waiting.
+# Keyed UPDATEs (e.g. flags set on a row after it was inserted) go through the
+# same queue and run after the inserts of their batch, so request threads never
+# have to flush to see their own rows.
+# If the database is unreachable, or the queue is full, rows are appended to a
+# local JSON-lines journal and replayed on the next successful flush. Each process
+# journals to its own file (pid in the name), so workers never read or delete
+# each other's lines; journals left by processes that have exited are claimed
+# with an atomic rename and replayed by whichever worker gets to them first.
+# A batch that fails for any other reason is retried one row at a time, so a
+# single bad row cannot hold back its group; a row that keeps failing on its own
+# is moved to a dead-letter file after `max_attempts` flushes.
+# Per-table `after_insert` hooks run in the same transaction as the INSERT, so
+# derived aggregates (e.g. per-user calculation counts) never drift from the rows.
+
+import atexit
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import uuid
+from datetime import datetime
+
+from sqlalchemy import and_, select
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+logger = logging.getLogger(__name__)
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+def _decode(obj):
+    if '__datetime__' in obj:
+        return datetime.fromisoformat(obj['__datetime__'])
+    return obj
+
+
+# Connection-level failures (database down, network): the rows are fine, so they
+# are journaled without counting an attempt against them
+_UNAVAILABLE_ERRORS = (OperationalError, InterfaceError)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+class AnalyticsWriter:
+    """Bounded queue of pending INSERT rows, flushed in batches by a background thread."""
+
+    def __init__(self, app, db, tables, journal_path, max_queue=10000, batch_size=200,
+                 flush_interval=2.0, asynchronous=True, after_insert=None, max_attempts=5):
+        self.app = app
+        self.db = db
+        self.tables = {table.name: table for table in tables}
+        self.after_insert = dict(after_insert or {})
+        self.journal_path = journal_path
+        root, ext = os.path.splitext(journal_path)
+        self.dead_letter_path = f'{root}.dead{ext}'
+        self.max_attempts = max_attempts
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.asynchronous = asynchronous
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._journal_lock = threading.Lock()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    # --- Producer side (request threads) ---
+    def enqueue(self, table, values):
+        """Queue one row for `table` (a Table or table name). Never raises, never blocks."""
+        self._put((getattr(table, 'name', table), dict(values)))
+
+    def enqueue_update(self, table, match, values, latest_by=None):
+        """
+        Queue an UPDATE of the rows whose columns equal `match`; with latest_by, only the row
+        with the highest value in that column. Runs after the inserts queued before it.
+        """
+        self._put((getattr(table, 'name', table), dict(values), dict(match), latest_by))
+
+    def _put(self, item):
+        name = item[0]
+        if not self.asynchronous:
+            self._write([item])
+            return
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            logger.warning("Analytics queue full; journaling row for %s", name)
+            self._spill([(item, 0)])
+            return
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self):
+        """Write everything queued so far (and any journaled rows) now, in the caller's thread."""
+        with self._flush_lock:
+            items = []
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write(items)
+
+    def close(self, timeout=10.0):
+        """Stop the background thread and drain the queue (called at worker exit)."""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            atexit.unregister(self.close)
+        self.flush()
+
+    # --- Writer thread ---
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='analytics-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Analytics writer flush failed")
+
+    # --- Persistence ---
+    def _write(self, items):
+        entries = self._take_journal() + [(item, 0) for item in items]
+        if not entries:
+            return
+        grouped = {}
+        updates = []
+        for item, attempts in entries:
+            if len(item) == 2:
+                name, values = item
+                grouped.setdefault((name, tuple(sorted(values))), []).append((values, attempts))
+            else:
+                updates.append((item, attempts))
+        with self.app.app_context():
+            # One transaction per group so a bad group cannot hold back the rest
+            for (name, _columns), rows in grouped.items():
+                try:
+                    self._insert(name, [values for values, _attempts in rows])
+                except _UNAVAILABLE_ERRORS:
+                    logger.exception("Analytics batch insert into %s failed; journaling %d rows", name, len(rows))
+                    self._spill([((name, values), attempts) for values, attempts in rows])
+                except Exception:
+                    logger.exception("Analytics batch insert into %s failed; retrying %d rows one at a time",
+                                     name, len(rows))
+                    for values, attempts in rows:
+                        self._attempt((name, values), attempts, lambda: self._insert(name, [values]))
+            for item, attempts in updates:
+                self._attempt(item, attempts, lambda: self._update(item))
+
+    def _insert(self, name, rows):
+        with self.db.engine.begin() as conn:
+            conn.execute(self.tables[name].insert(), rows)
+            hook = self.after_insert.get(name)
+            if hook is not None:
+                hook(conn, rows)
+
+    def _update(self, item):
+        with self.db.engine.begin() as conn:
+            conn.execute(self._update_statement(*item))
+
+    def _attempt(self, item, attempts, write):
+        """Run write(); on failure journal the item again, or dead-letter it after max_attempts."""
+        try:
+            write()
+        except _UNAVAILABLE_ERRORS:
+            logger.exception("Analytics write to %s failed; journaling it", item[0])
+            self._spill([(item, attempts)])
+        except Exception:
+            attempts += 1
+            if attempts >= self.max_attempts:
+                logger.exception("Analytics write to %s failed %d times; moving it to %s",
+                                 item[0], attempts, self.dead_letter_path)
+                self._spill([(item, attempts)], self.dead_letter_path)
+            else:
+                logger.exception("Analytics write to %s failed (attempt %d of %d); journaling it",
+                                 item[0], attempts, self.max_attempts)
+                self._spill([(item, attempts)])
+
+    def _update_statement(self, name, values, match, latest_by):
+        table = self.tables[name]
+        if latest_by is None:
+            return table.update().where(and_(*(table.c[k] == v for k, v in match.items()))).values(**values)
+        # Alias the inner scan so it is not correlated with the table being updated
+        inner = table.alias()
+        pk = list(table.primary_key.columns)[0]
+        latest = (
+            select(inner.c[pk.name])
+            .where(and_(*(inner.c[k] == v for k, v in match.items())))
+            .order_by(inner.c[latest_by].desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+        return table.update().where(pk == latest).values(**values)
+
+    def _journal_file(self):
+        root, ext = os.path.splitext(self.journal_path)
+        return f'{root}.{os.getpid()}{ext}'
+
+    def _orphaned_journals(self):
+        """Journals no running process owns: the shared file of earlier versions, files of
+        exited processes, and claims a previous replay did not finish."""
+        root, ext = os.path.splitext(self.journal_path)
+        own = self._journal_file()
+        paths = [self.journal_path] if os.path.exists(self.journal_path) else []
+        for path in glob.glob(f'{glob.escape(root)}.*{ext}'):
+            owner = path[len(root) + 1:len(path) - len(ext)]
+            if owner.startswith('claimed-'):
+                owner = owner.split('-')[1]
+            if path == own or not owner.isdigit():
+                continue
+            if int(owner) == os.getpid() or not _pid_alive(int(owner)):
+                paths.append(path)
+        return paths
+
+    def _spill(self, entries, path=None):
+        """Append (item, attempts) entries to this process's journal (or `path`)."""
+        path = path or self._journal_file()
+        try:
+            with self._journal_lock:
+                directory = os.path.dirname(path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(path, 'a', encoding='utf-8') as f:
+                    for item, attempts in entries:
+                        record = {'table': item[0], 'values': item[1]}
+                        if len(item) > 2:
+                            record.update(match=item[2], latest_by=item[3])
+                        if attempts:
+                            record['attempts'] = attempts
+                        f.write(json.dumps(record, default=_encode) + '\n')
+        except Exception:
+            logger.exception("Failed to journal %d analytics rows", len(entries))
+
+    def _take_journal(self):
+        """
+        Load and remove journaled (item, attempts) entries: this process's own journal, plus
+        orphaned ones claimed by renaming them first (they are re-journaled if the write fails again).
+        """
+        lines = []
+        with self._journal_lock:
+            own = self._journal_file()
+            try:
+                with open(own, 'r', encoding='utf-8') as f:
+                    lines.extend(f.readlines())
+                os.remove(own)
+            except OSError:
+                pass
+            root, ext = os.path.splitext(self.journal_path)
+            for path in self._orphaned_journals():
+                claimed = f'{root}.claimed-{os.getpid()}-{uuid.uuid4().hex}{ext}'
+                try:
+                    os.replace(path, claimed)  # only one process wins the rename
+                    with open(claimed, 'r', encoding='utf-8') as f:
+                        lines.extend(f.readlines())
+                    os.remove(claimed)
+                except OSError:
+                    continue
+        entries = []
+        for line in lines:
+            try:
+                record = json.loads(line, object_hook=_decode)
+                if record['table'] not in self.tables:
+                    continue
+                if 'match' in record:
+                    item = (record['table'], record['values'], record['match'], record.get('latest_by'))
+                else:
+                    item = (record['table'], record['values'])
+                entries.append((item, record.get('attempts', 0)))
+            except Exception:
+                logger.warning("Skipping unreadable analytics journal line")
+        return entries
@@ -2,25 +2,40 @@
 # This app provides a pricing calculator for messaging services with dynamic inclusions, platform fees, and analytics.
 # Key features: dynamic inclusions, robust error handling, session management, and professional UI.
 
-from flask import Flask, render_template, request, session, redirect, url_for, flash, send_file, abort, jsonify
-from calculator import calculate_pricing, get_suggested_price, meta_costs_table, calculate_total_mandays, calculate_total_manday_cost, COUNTRY_MANDAY_RATES, calculate_total_mandays_breakdown, get_committed_amount_rate_for_volume, get_lowest_tier_price
+from flask import Flask, render_template, request, session, redirect, url_for, flash, send_file, abort, jsonify, Response
+from calculator import calculate_pricing, get_suggested_price, calculate_total_mandays, calculate_total_manday_cost, calculate_total_mandays_breakdown, get_committed_amount_rate_for_volume, get_lowest_tier_price, get_committed_amount_rates, calculate_margin_sweep, solve_prices_for_target_margin, simulate_volume_uncertainty, calculate_ai_price_table
 import os
 import sys
+import gzip
+import json
 import secrets
 import time
+import tempfile
 from urllib.parse import urlparse
 from werkzeug.middleware.proxy_fix import ProxyFix
-from collections import Counter, defaultdict
+from collections import Counter
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from datetime import datetime
-from sqlalchemy import func
+from sqlalchemy import case, distinct, func
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg, insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 import uuid
-from calculator import get_committed_amount_rates
 from io import BytesIO
-from docx import Document
+from session_store import create_session_interface
+from result_cache import ResultCache
+from analytics_writer import AnalyticsWriter
+from analytics_rollups import WATERMARK_NAME, RollupAggregate, refresh_rollups, utcnow
+from sow_template import SowTemplate
+from sow_cache import SowArtifactCache
+from sow_jobs import DONE, QueueFull, SowJob, SowJobQueue
 from pricing_config import (
-    committed_amount_slabs,
+    find_committed_slab_rates,
+    get_committed_slab_index,
+    get_programmed_bundles,
+    nearest_programmed_bundles,
+    get_rate_card,
+    refresh_rate_card,
     PLATFORM_PRICING_GUIDANCE,
     get_voice_notes_price,
     AI_AGENT_PRICING,
@@ -43,6 +58,14 @@ VOICE_COMPLEXITY_TO_PROFILE_ID = {
 }
 
 
+def ai_agent_model_options():
+    """
+    AI agent model names per pricing key, for the volumes step dropdown.
+    Prices stay server side (see /api/ai-prices); the page only needs the names.
+    """
+    return {pricing_key: list(models) for pricing_key, models in AI_AGENT_PRICING.items()}
+
+
 def dev_location_for_manday_rates(country, inputs):
     """
     Pick delivery location keys for manday rate tables.
@@ -220,6 +243,45 @@ app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 app.config['SESSION_COOKIE_SECURE'] = os.environ.get('RAILWAY_ENVIRONMENT') == 'production' or os.environ.get('FLASK_ENV') == 'production'
 
+# Server-side sessions: the cookie carries only an opaque id; quote data stays on the host.
+# SESSION_BACKEND=sqlite (default) | filesystem | cookie (Flask's signed-cookie session).
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'sqlite')
+SESSION_TTL_SECONDS = int(os.environ.get('SESSION_TTL_SECONDS', 12 * 60 * 60))
+_default_session_path = os.path.join(
+    tempfile.gettempdir(),
+    'pricing-calc-sessions' if SESSION_BACKEND.strip().lower() == 'filesystem' else 'pricing-calc-sessions.db',
+)
+_session_interface = create_session_interface(
+    SESSION_BACKEND,
+    os.environ.get('SESSION_STORE_PATH', _default_session_path),
+    SESSION_TTL_SECONDS,
+)
+if _session_interface is not None:
+    app.session_interface = _session_interface
+
+# Assembled results-page data per (calculation_id, inputs hash); emptied when the rate card changes
+RESULT_CACHE = ResultCache(maxsize=int(os.environ.get('RESULT_CACHE_SIZE', 256)))
+
+
+def result_cache_version():
+    """Rate-card version RESULT_CACHE entries are tagged with; rebuilds the card first if a rate table was edited."""
+    return refresh_rate_card().version
+
+# Master SOW template, parsed once per worker and deep-copied for each generated SOW
+SOW_TEMPLATE = SowTemplate(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'master sow', 'Latest SOW Master Copy 2026.docx'))
+
+# Generated SOW documents on local disk, keyed by a hash of everything that goes into them
+SOW_CACHE = SowArtifactCache(
+    os.environ.get('SOW_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'pricing-calc-sow-cache')),
+    max_bytes=int(os.environ.get('SOW_CACHE_MAX_MB', 200)) * 1024 * 1024,
+)
+
+# Background SOW builds for the sow_details page (bounded so they cannot starve calculator requests)
+SOW_JOBS = SowJobQueue(
+    max_workers=int(os.environ.get('SOW_JOB_WORKERS', 1)),
+    max_pending=int(os.environ.get('SOW_JOB_MAX_PENDING', 16)),
+)
+
 # Railway / reverse proxy: correct Host and scheme (url_for, Origin checks)
 app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_port=1, x_prefix=1)
 
@@ -412,6 +474,8 @@ def clear_calc_session(preserve_auth: bool = True):
         'manday_breakdown', 'dev_cost_breakdown', 'dev_cost_currency', 'inputs',
         'voice_pricing'
     ]
+    if session.get('calculation_id'):
+        RESULT_CACHE.discard_calculation(session['calculation_id'])
     for k in keys_to_clear:
         if k in session:
             session.pop(k)
@@ -505,7 +569,7 @@ def calculate_platform_fee(country, bfsi_tier, personalize_load, human_agents, a
     Returns (fee, currency).
     Now uses PLATFORM_PRICING_GUIDANCE for all values.
     """
-    guidance = PLATFORM_PRICING_GUIDANCE.get(country, PLATFORM_PRICING_GUIDANCE['APAC'])
+    guidance = get_rate_card().country(country).platform_guidance
     fee = guidance['minimum']
     currency = 'INR' if country == 'India' else 'USD'
     # BFSI Tiers
@@ -575,16 +639,15 @@ def record_funnel_event(step, inputs=None, profile=None):
         inputs = inputs or session.get('inputs') or {}
         profile = profile or session.get('profile') or {}
         route = 'bundle' if float(inputs.get('committed_amount', 0) or 0) > 0 else 'volumes'
-        ev = FunnelEvent(
-            user_email=(profile or {}).get('email'),
-            calculation_id=session.get('calculation_id'),
-            step=step,
-            route=route,
-            country=inputs.get('country'),
-            region=inputs.get('region'),
-        )
-        db.session.add(ev)
-        db.session.commit()
+        ANALYTICS_WRITER.enqueue(FunnelEvent.__table__, {
+            'timestamp': datetime.utcnow(),
+            'user_email': (profile or {}).get('email'),
+            'calculation_id': session.get('calculation_id'),
+            'step': step,
+            'route': route,
+            'country': inputs.get('country'),
+            'region': inputs.get('region'),
+        })
     except Exception:
         logger.exception("Failed to record funnel event for step '%s'", step)
 
@@ -593,6 +656,7 @@ class Analytics(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     calculation_id = db.Column(db.String(64), unique=False, nullable=True)  # Transaction ID for each calculation
     timestamp = db.Column(db.DateTime, nullable=False)
+    inserted_at = db.Column(db.DateTime, nullable=True, server_default=utcnow())  # set by the database; see analytics_rollups.py
     user_name = db.Column(db.String(128))
     user_email = db.Column(db.String(256), nullable=True)
     country = db.Column(db.String(64))
@@ -653,6 +717,16 @@ class Analytics(db.Model):
     sow_downloaded = db.Column(db.Boolean, nullable=True, default=False)
 
 
+# Indexes for the hot lookups (migration: add_hot_lookup_indexes; benchmark:
+# scripts/benchmark_analytics_indexes.py). calculation_id -> latest row (SOW routes,
+# user_support_lookup), user_email -> latest row (profile lookup), country/region
+# and timestamp filters/ordering (dashboards and daily export).
+db.Index('ix_analytics_calculation_id_timestamp', Analytics.calculation_id, Analytics.timestamp)
+db.Index('ix_analytics_user_email_timestamp', Analytics.user_email, Analytics.timestamp.desc())
+db.Index('ix_analytics_country_region', Analytics.country, Analytics.region)
+db.Index('ix_analytics_timestamp', Analytics.timestamp)
+
+
 class FunnelEvent(db.Model):
     """
     Lightweight step-level funnel tracking for the calculator.
@@ -669,6 +743,114 @@ class FunnelEvent(db.Model):
     country = db.Column(db.String(64), nullable=True)
     region = db.Column(db.String(64), nullable=True)
 
+
+db.Index('ix_funnel_events_calculation_id_step', FunnelEvent.calculation_id, FunnelEvent.step)
+db.Index('ix_funnel_events_timestamp', FunnelEvent.timestamp)
+
+
+class UserCalculationCount(db.Model):
+    """
+    Running count of Analytics rows per user_name, kept in step with inserts
+    so the results page never has to scan the analytics table.
+    """
+    __tablename__ = 'user_calculation_counts'
+
+    user_name = db.Column(db.String(128), primary_key=True)
+    calculation_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+def _bump_user_calculation_counts(conn, rows):
+    """after_insert hook for analytics: add this batch's rows to the per-user counts."""
+    counts = Counter(r.get('user_name') for r in rows if r.get('user_name'))
+    if not counts:
+        return
+    table = UserCalculationCount.__table__
+    # Single-statement upsert, so two first-time writers for a user cannot race to the INSERT
+    stmt = (sqlite_insert if conn.dialect.name == 'sqlite' else pg_insert)(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_name],
+        set_={'calculation_count': table.c.calculation_count + stmt.excluded.calculation_count},
+    )
+    conn.execute(stmt, [{'user_name': name, 'calculation_count': n} for name, n in counts.items()])
+
+
+def get_top_users():
+    """[(user_name, calculation_count), ...] most active first, from the running counts."""
+    return [
+        (row.user_name, row.calculation_count)
+        for row in UserCalculationCount.query.order_by(
+            UserCalculationCount.calculation_count.desc(), UserCalculationCount.user_name
+        ).all()
+    ]
+
+
+
+class AnalyticsDailyRollup(db.Model):
+    """
+    Per-day aggregate of one analytics metric for a country/region/route/channel_type
+    slice; see analytics_rollups.py. Blank dimensions are stored as ''.
+    """
+    __tablename__ = 'analytics_daily_rollups'
+
+    day = db.Column(db.Date, primary_key=True)
+    country = db.Column(db.String(64), primary_key=True)
+    region = db.Column(db.String(64), primary_key=True)
+    calculation_route = db.Column(db.String(16), primary_key=True)
+    channel_type = db.Column(db.String(32), primary_key=True)
+    metric = db.Column(db.String(48), primary_key=True)
+    value_count = db.Column(db.Integer, nullable=False, default=0)
+    value_sum = db.Column(db.Float, nullable=False, default=0)
+    value_sum_sq = db.Column(db.Float, nullable=False, default=0)
+    value_min = db.Column(db.Float, nullable=True)
+    value_max = db.Column(db.Float, nullable=True)
+    sketch = db.Column(db.Text, nullable=True)  # JSON [[mean, weight], ...] quantile sketch
+
+
+# Dashboard reads filter on metric and group by day (the primary key leads with day)
+db.Index('ix_analytics_daily_rollups_metric_day', AnalyticsDailyRollup.metric, AnalyticsDailyRollup.day)
+
+
+class AnalyticsRollupState(db.Model):
+    """Watermark: the highest analytics.id already folded into the rollups."""
+    __tablename__ = 'analytics_rollup_state'
+
+    name = db.Column(db.String(32), primary_key=True)
+    last_analytics_id = db.Column(db.Integer, nullable=False, default=0)
+    refreshed_at = db.Column(db.DateTime, nullable=True)
+
+
+def refresh_analytics_rollups(batch_size=5000, max_batches=None, wait=True):
+    """Fold analytics rows added since the last refresh into the daily rollups."""
+    return refresh_rollups(
+        db.engine, Analytics.__table__, AnalyticsDailyRollup.__table__, AnalyticsRollupState.__table__,
+        batch_size=batch_size, max_batches=max_batches, wait=wait,
+    )
+
+
+# The dashboard folds in at most this many new rows per page load (one batch, never
+# waiting on another refresher), so its series keep up between the scheduled refreshes
+ROLLUP_PAGE_CATCH_UP_ROWS = 500
+
+
+@app.cli.command('refresh-rollups')
+def refresh_rollups_command():
+    """Bring the analytics daily rollups up to date."""
+    ANALYTICS_WRITER.flush()
+    print(f"Folded {refresh_analytics_rollups()} analytics rows into the daily rollups")
+
+# Analytics/FunnelEvent inserts are batched off the request path; see analytics_writer.py
+ANALYTICS_WRITER = AnalyticsWriter(
+    app,
+    db,
+    [Analytics.__table__, FunnelEvent.__table__],
+    after_insert={Analytics.__tablename__: _bump_user_calculation_counts},
+    journal_path=os.environ.get(
+        'ANALYTICS_JOURNAL_PATH', os.path.join(tempfile.gettempdir(), 'pricing-calc-analytics.jsonl')
+    ),
+    flush_interval=float(os.environ.get('ANALYTICS_FLUSH_SECONDS', 2)),
+    asynchronous=os.environ.get('ANALYTICS_ASYNC', '1') != '0',
+)
+
 # Country to currency symbol mapping
 COUNTRY_CURRENCY = {
     'India': '₹',
@@ -726,6 +908,137 @@ def api_lookup_profile():
             result['region'] = existing.region
     return jsonify(result)
 
+# Upper bound on grid cells per sweep request (volumes x prices x platform fees)
+MARGIN_SWEEP_MAX_CELLS = int(os.environ.get('MARGIN_SWEEP_MAX_CELLS', '250000'))
+
+
+def _calc_base_inputs(overrides):
+    """Session volumes and chosen prices for the current calculation, overridden by request values."""
+    base = dict(session.get('inputs') or {})
+    base.update(session.get('pricing_inputs') or {})
+    base.update(overrides or {})
+    return base
+
+
+@app.route('/api/margin-sweep', methods=['POST'])
+def api_margin_sweep():
+    """
+    What-if margin grid for the results-page heatmap.
+    JSON body: msg_type, volumes, prices or discounts, optional platform_fees, country and inputs.
+    """
+    payload = request.get_json(silent=True) or {}
+    base = _calc_base_inputs(payload.get('inputs'))
+    country = payload.get('country') or base.get('country') or 'India'
+    msg_type = payload.get('msg_type', 'basic_marketing')
+    volumes = payload.get('volumes') or []
+    prices = payload.get('prices')
+    discounts = payload.get('discounts')
+    platform_fees = payload.get('platform_fees') or [base.get('platform_fee', 0) or 0]
+    price_count = len(prices if prices is not None else (discounts or []))
+    cells = len(volumes) * price_count * len(platform_fees)
+    if not cells:
+        return jsonify({'error': 'volumes and prices/discounts are required'}), 400
+    if cells > MARGIN_SWEEP_MAX_CELLS:
+        return jsonify({'error': f'grid too large ({cells} cells, max {MARGIN_SWEEP_MAX_CELLS})'}), 400
+    try:
+        result = calculate_margin_sweep(
+            country, base, msg_type, volumes, platform_fees,
+            sweep_prices=prices, sweep_discounts=discounts,
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result)
+
+@app.route('/api/target-margin', methods=['POST'])
+def api_target_margin():
+    """
+    Lowest prices that keep margin at or above a floor, solved analytically (no DB access).
+    JSON body: target_margin (percent), optional country and inputs overriding the session calculation.
+    """
+    payload = request.get_json(silent=True) or {}
+    base = _calc_base_inputs(payload.get('inputs'))
+    country = payload.get('country') or base.get('country') or 'India'
+
+    def _num(key):
+        value = base.get(key)
+        return float(value) if value not in (None, '') else None
+
+    try:
+        result = solve_prices_for_target_margin(
+            country,
+            _num('ai_volume') or 0,
+            _num('advanced_volume') or 0,
+            _num('basic_marketing_volume') or 0,
+            _num('basic_utility_volume') or 0,
+            _num('platform_fee') or 0,
+            float(payload.get('target_margin')),
+            ai_price=_num('ai_price'),
+            advanced_price=_num('advanced_price'),
+            basic_marketing_price=_num('basic_marketing_price'),
+            basic_utility_price=_num('basic_utility_price'),
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result)
+
+# Upper bound on Monte Carlo draws per simulation request
+VOLUME_SIMULATION_MAX_DRAWS = int(os.environ.get('VOLUME_SIMULATION_MAX_DRAWS', '200000'))
+
+
+@app.route('/api/volume-simulation', methods=['POST'])
+def api_volume_simulation():
+    """
+    P10/P50/P90 revenue, margin and bundle overage for the current calculation under volume uncertainty.
+    JSON body: distribution ({'type': 'uniform', 'spread': 0.2} or {'type': 'lognormal', 'sigma': 0.3}),
+    optional draws, seed, country and inputs.
+    """
+    payload = request.get_json(silent=True) or {}
+    base = _calc_base_inputs(payload.get('inputs'))
+    country = payload.get('country') or base.get('country') or 'India'
+    distribution = payload.get('distribution') or {'type': 'uniform', 'spread': 0.2}
+    try:
+        if not isinstance(distribution, dict):
+            raise ValueError("distribution must be an object, e.g. {'type': 'uniform', 'spread': 0.2}")
+        draws = int(payload.get('draws') or 100000)
+        if not 0 < draws <= VOLUME_SIMULATION_MAX_DRAWS:
+            raise ValueError(f'draws must be between 1 and {VOLUME_SIMULATION_MAX_DRAWS}')
+        volumes = {key: float(base.get(key, 0) or 0) for key in ('ai_volume', 'advanced_volume', 'basic_marketing_volume', 'basic_utility_volume')}
+        prices = {
+            key: float(base[key]) for key in ('ai_price', 'advanced_price', 'basic_marketing_price', 'basic_utility_price')
+            if base.get(key) not in (None, '')
+        }
+        voice_inputs = base if base.get('channel_type') in ('voice_only', 'text_voice') else None
+        result = simulate_volume_uncertainty(
+            country, volumes, float(base.get('platform_fee', 0) or 0), distribution,
+            prices=prices, committed_amount=float(base.get('committed_amount', 0) or 0),
+            voice_inputs=voice_inputs, draws=draws, seed=payload.get('seed'),
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result)
+
+@app.route('/api/ai-prices')
+def api_ai_prices():
+    """
+    AI per-message prices for every model/complexity, as the prices step computes them.
+    Query args: country (defaults to the session country), ai_volume (defaults to the session volume).
+    """
+    inputs = session.get('inputs') or {}
+    country = (request.args.get('country') or inputs.get('country') or 'India').strip()
+    try:
+        ai_volume = float(request.args.get('ai_volume', inputs.get('ai_volume', 0)) or 0)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'ai_volume must be a number'}), 400
+    tier_markup = get_suggested_price(country, 'ai', ai_volume) if ai_volume else get_lowest_tier_price(country, 'ai')
+    card = get_rate_card()
+    return jsonify({
+        'country': country,
+        'pricing_key': card.country(country).ai_pricing_key,
+        'rate_card_version': card.version,
+        'tier_markup': tier_markup,
+        'prices': calculate_ai_price_table(country, tier_markup),
+    })
+
 @app.route('/profile-email', methods=['GET', 'POST'])
 def profile_email():
     """
@@ -824,7 +1137,7 @@ def index():
     results = None
     currency_symbol = None
 
-    min_fees = {country: data['minimum'] for country, data in PLATFORM_PRICING_GUIDANCE.items()}
+    min_fees = dict(get_rate_card().min_platform_fees)
 
     # ---------------------------------------------------------------------
     # Profile step – still available but no longer forced before volumes.
@@ -1101,7 +1414,7 @@ def index():
                     profile=profile,
                     calculation_id=calculation_id,
                     min_fees=min_fees,
-                    ai_agent_pricing=AI_AGENT_PRICING,
+                    ai_agent_models=ai_agent_model_options(),
                 )
         # Ensure profile is updated from form data
         profile = session.get('profile') or {}
@@ -1171,7 +1484,7 @@ def index():
             calculation_id=calculation_id,
             min_fees=min_fees,
             voice_rate_card=voice_rate_card,
-            ai_agent_pricing=AI_AGENT_PRICING,
+            ai_agent_models=ai_agent_model_options(),
         )
 
     elif step == 'prices' and request.method == 'POST':
@@ -1351,7 +1664,7 @@ def index():
                 calculation_id=calculation_id,
                 min_fees=min_fees,
                 voice_rate_card=voice_rate_card,
-                ai_agent_pricing=AI_AGENT_PRICING,
+                ai_agent_models=ai_agent_model_options(),
             )
         _vprint('HANDLER: No discount errors, continuing to results calculation', file=sys.stderr, flush=True)
 
@@ -1433,14 +1746,8 @@ def index():
         # --- Ensure manday_rates is always set and complete ---
         country = (inputs.get('country') or 'India').strip()
         dev_location = dev_location_for_manday_rates(country, inputs)
-        rates = COUNTRY_MANDAY_RATES.get(country, COUNTRY_MANDAY_RATES['APAC'])
         # Always reset manday_rates to backend defaults when country or dev_location changes
-        if country == 'LATAM':
-            default_bot_ui = float(rates['bot_ui'].get(dev_location, 0.0) or 0.0)
-            default_custom_ai = float(rates['custom_ai'].get(dev_location, 0.0) or 0.0)
-        else:
-            default_bot_ui = float(rates.get('bot_ui', 0.0) or 0.0)
-            default_custom_ai = float(rates.get('custom_ai', 0.0) or 0.0)
+        default_bot_ui, default_custom_ai = get_rate_card().country(country).manday_rates(dev_location)
         manday_rates = {
             'bot_ui': default_bot_ui,
             'custom_ai': default_custom_ai,
@@ -1517,7 +1824,7 @@ def index():
                 calculation_id=calculation_id,
                 min_fees=min_fees,
                 voice_rate_card=build_voice_rate_card_for_prices(inputs, country),
-                ai_agent_pricing=AI_AGENT_PRICING,
+                ai_agent_models=ai_agent_model_options(),
             )
         
         # Remove duplicate Committed Amount if present
@@ -1553,21 +1860,15 @@ def index():
                 calculation_id=calculation_id,
                 min_fees=min_fees,
                 voice_rate_card=build_voice_rate_card_for_prices(inputs, country),
-                ai_agent_pricing=AI_AGENT_PRICING,
+                ai_agent_models=ai_agent_model_options(),
             )
         _vprint("PASSED results validation, about to render results page", file=sys.stderr, flush=True)
         try:
             # --- Ensure manday_rates is always set and complete ---
             country = (inputs.get('country') or 'India').strip()
             dev_location = dev_location_for_manday_rates(country, inputs)
-            rates = COUNTRY_MANDAY_RATES.get(country, COUNTRY_MANDAY_RATES['APAC'])
             # Always reset manday_rates to backend defaults when country or dev_location changes
-            if country == 'LATAM':
-                default_bot_ui = float(rates['bot_ui'].get(dev_location, 0.0) or 0.0)
-                default_custom_ai = float(rates['custom_ai'].get(dev_location, 0.0) or 0.0)
-            else:
-                default_bot_ui = float(rates.get('bot_ui', 0.0) or 0.0)
-                default_custom_ai = float(rates.get('custom_ai', 0.0) or 0.0)
+            default_bot_ui, default_custom_ai = get_rate_card().country(country).manday_rates(dev_location)
             manday_rates = {
                 'bot_ui': default_bot_ui,
                 'custom_ai': default_custom_ai,
@@ -1637,7 +1938,7 @@ def index():
                     calculation_id=calculation_id,
                     min_fees=min_fees,
                     voice_rate_card=build_voice_rate_card_for_prices(inputs, country),
-                    ai_agent_pricing=AI_AGENT_PRICING,
+                    ai_agent_models=ai_agent_model_options(),
                 )
         except Exception as e:
             _vprint(f"DEBUG: Error in manday/dev cost or pricing calculation: {e}", file=sys.stderr, flush=True)
@@ -1663,7 +1964,7 @@ def index():
                 calculation_id=calculation_id,
                 min_fees=min_fees,
                 voice_rate_card=build_voice_rate_card_for_prices(inputs, inputs.get('country', 'India')),
-                ai_agent_pricing=AI_AGENT_PRICING,
+                ai_agent_models=ai_agent_model_options(),
             )
         results['margin'] = results.get('margin', '')
         expected_invoice_amount = results.get('revenue', 0)
@@ -2015,13 +2316,8 @@ def index():
             analytics_kwargs['calculation_route'] = 'volumes'
         # Debug: Log manday rates and breakdown before saving to Analytics
         _vprint(f"DEBUG: Saving Analytics: bot_ui_manday_rate={analytics_kwargs.get('bot_ui_manday_rate')}, custom_ai_manday_rate={analytics_kwargs.get('custom_ai_manday_rate')}, bot_ui_mandays={analytics_kwargs.get('bot_ui_mandays')}, custom_ai_mandays={analytics_kwargs.get('custom_ai_mandays')}, calculation_route={analytics_kwargs.get('calculation_route')}", file=sys.stderr, flush=True)
-        top_users = []
         try:
-            new_analytics = Analytics(**analytics_kwargs)
-            db.session.add(new_analytics)
-            db.session.commit()
-            user_names = [row[0] for row in db.session.query(Analytics.user_name).all() if row[0]]
-            top_users = Counter(user_names).most_common()
+            ANALYTICS_WRITER.enqueue(Analytics.__table__, analytics_kwargs)
         except Exception:
             logger.exception("Analytics save failed; continuing to results page")
             db.session.rollback()
@@ -2039,7 +2335,7 @@ def index():
         ai_volume = float(inputs.get('ai_volume', 0) or 0)
         advanced_volume = float(inputs.get('advanced_volume', 0) or 0)
         platform_fee_total = float(platform_fee)
-        meta_costs = meta_costs_table.get(country, meta_costs_table['APAC'])
+        meta_costs = get_rate_card().country(country).meta_costs
         if all(float(inputs.get(v, 0)) == 0.0 for v in ['ai_volume', 'advanced_volume', 'basic_marketing_volume', 'basic_utility_volume']):
             rates = get_committed_amount_rates(country, committed_amount)
             ai_price = rates['ai']
@@ -2083,7 +2379,7 @@ def index():
         if all(float(inputs.get(v, 0)) == 0.0 for v in ['ai_volume', 'advanced_volume', 'basic_marketing_volume', 'basic_utility_volume']):
             committed_amount = float(inputs.get('committed_amount', 0) or 0)
             rates = get_committed_amount_rates(inputs.get('country', 'India'), committed_amount)
-            meta_costs = meta_costs_table.get(inputs.get('country', 'India'), meta_costs_table['APAC'])
+            meta_costs = get_rate_card().country(inputs.get('country', 'India')).meta_costs
             ai_volume = float(inputs.get('ai_volume', 0) or 0)
             advanced_volume = float(inputs.get('advanced_volume', 0) or 0)
             basic_marketing_volume = float(inputs.get('basic_marketing_volume', 0) or 0)
@@ -2118,7 +2414,7 @@ def index():
                 }
             }
             # Calculate pricing simulation for internal analysis
-            pricing_simulation = calculate_pricing_simulation(inputs, session.get('pricing_inputs'))
+            pricing_simulation = cached_pricing_simulation(calculation_id, inputs, session.get('pricing_inputs'))
             # Persist for SOW downloads and results refresh
             session['final_price_details'] = final_price_details
             session['final_inclusions'] = final_inclusions
@@ -2142,7 +2438,6 @@ def index():
                 user_selections=user_selections,
                 inputs=inputs,
                 contradiction_warning=contradiction_warning,
-                top_users=top_users,
                 total_mandays=total_mandays,
                 text_mandays=text_mandays,
                 text_manday_breakdown=text_manday_breakdown,
@@ -2173,7 +2468,7 @@ def index():
         if 'pricing_inputs' in session:
             session['pricing_inputs']['platform_fee'] = platform_fee
         # Use this platform_fee for all downstream calculations and rendering
-        pricing_simulation = calculate_pricing_simulation(inputs, session.get('pricing_inputs'))
+        pricing_simulation = cached_pricing_simulation(calculation_id, inputs, session.get('pricing_inputs'))
         # Persist for SOW downloads and results refresh
         session['final_price_details'] = final_price_details
         session['final_inclusions'] = final_inclusions
@@ -2199,7 +2494,6 @@ def index():
             user_selections=user_selections,
             inputs=inputs,
             contradiction_warning=contradiction_warning,
-            top_users=top_users,
             total_mandays=total_mandays,
             text_mandays=text_mandays,
             text_manday_breakdown=text_manday_breakdown,
@@ -2235,23 +2529,17 @@ def index():
                 flash('Session expired or missing. Please start again.', 'error')
             currency_symbol = COUNTRY_CURRENCY.get('India', '₹')
             record_funnel_event('volumes', inputs={}, profile=profile)
-            return render_template('index.html', step='volumes', currency_symbol=currency_symbol, inputs={}, profile=profile, calculation_id=calculation_id, min_fees=min_fees, ai_agent_pricing=AI_AGENT_PRICING)
+            return render_template('index.html', step='volumes', currency_symbol=currency_symbol, inputs={}, profile=profile, calculation_id=calculation_id, min_fees=min_fees, ai_agent_models=ai_agent_model_options())
         currency_symbol = COUNTRY_CURRENCY.get(inputs.get('country', 'India'), '$')
         record_funnel_event('volumes', inputs=inputs, profile=profile)
-        return render_template('index.html', step='volumes', currency_symbol=currency_symbol, inputs=inputs, profile=profile, calculation_id=calculation_id, min_fees=min_fees, ai_agent_pricing=AI_AGENT_PRICING)
+        return render_template('index.html', step='volumes', currency_symbol=currency_symbol, inputs=inputs, profile=profile, calculation_id=calculation_id, min_fees=min_fees, ai_agent_models=ai_agent_model_options())
     elif step == 'prices':
         inputs = session.get('inputs', {})
         pricing_inputs = session.get('pricing_inputs', {}) or {}
         country = (inputs.get('country') or 'India').strip()
         dev_location = dev_location_for_manday_rates(country, inputs)
         _vprint(f"DEBUG: country used for manday rates = '{country}'", file=sys.stderr, flush=True)
-        rates = COUNTRY_MANDAY_RATES.get(country, COUNTRY_MANDAY_RATES['APAC'])
-        if country == 'LATAM':
-            default_bot_ui = float(rates['bot_ui'].get(dev_location, 0.0) or 0.0)
-            default_custom_ai = float(rates['custom_ai'].get(dev_location, 0.0) or 0.0)
-        else:
-            default_bot_ui = float(rates.get('bot_ui', 0.0) or 0.0)
-            default_custom_ai = float(rates.get('custom_ai', 0.0) or 0.0)
+        default_bot_ui, default_custom_ai = get_rate_card().country(country).manday_rates(dev_location)
         if request.method == 'POST':
             # Validate user rates
             def parse_number(val):
@@ -2291,7 +2579,7 @@ def index():
                     calculation_id=calculation_id,
                     min_fees=min_fees,
                     voice_rate_card=build_voice_rate_card_for_prices(inputs, country),
-                    ai_agent_pricing=AI_AGENT_PRICING,
+                    ai_agent_models=ai_agent_model_options(),
                 )
             # Save user rates for use in results
             session['manday_rates'] = {
@@ -2330,7 +2618,7 @@ def index():
                 calculation_id=calculation_id,
                 min_fees=min_fees,
                 voice_rate_card=build_voice_rate_card_for_prices(inputs, country),
-                ai_agent_pricing=AI_AGENT_PRICING,
+                ai_agent_models=ai_agent_model_options(),
             )
     elif step == 'bundle' and request.method == 'POST':
         # User submitted messaging bundle commitment (can be 0)
@@ -2359,24 +2647,13 @@ def index():
         pricing_inputs = session.get('pricing_inputs', {}) or {}
         country = (country or 'India').strip()
         dev_location = dev_location_for_manday_rates(country, inputs)
-        rates = COUNTRY_MANDAY_RATES.get(country, COUNTRY_MANDAY_RATES['APAC'])
-        if country == 'LATAM':
-            default_bot_ui = float(rates['bot_ui'].get(dev_location, 0.0) or 0.0)
-            default_custom_ai = float(rates['custom_ai'].get(dev_location, 0.0) or 0.0)
-        else:
-            default_bot_ui = float(rates.get('bot_ui', 0.0) or 0.0)
-            default_custom_ai = float(rates.get('custom_ai', 0.0) or 0.0)
+        default_bot_ui, default_custom_ai = get_rate_card().country(country).manday_rates(dev_location)
         # --- Set default per-message prices for all countries based on committed amount using committed_amount_slabs ---
-        slabs = committed_amount_slabs.get(country, committed_amount_slabs.get('APAC', []))
         # Find the correct slab for the committed amount
-        selected_slab = None
-        for lower, upper, rates in slabs:
-            if lower <= committed_amount < upper:
-                selected_slab = rates
-                break
-        if not selected_slab and slabs:
+        selected_slab = find_committed_slab_rates(country, committed_amount)
+        if not selected_slab:
             # If above all slabs, use the highest slab
-            selected_slab = slabs[-1][2]
+            selected_slab = get_committed_slab_index(country)['rates'][-1]
         suggested_prices = {
             'ai_price': selected_slab['ai'] if selected_slab else '',
             'advanced_price': selected_slab['advanced'] if selected_slab else '',
@@ -2407,7 +2684,7 @@ def index():
             calculation_id=calculation_id,
             min_fees=min_fees,
             voice_rate_card=build_voice_rate_card_for_prices(inputs, country),
-            ai_agent_pricing=AI_AGENT_PRICING,
+            ai_agent_models=ai_agent_model_options(),
         )
     elif step == 'results':
         # Handle GET request for results page (page refresh)
@@ -2431,53 +2708,30 @@ def index():
         dev_cost_currency = session.get('dev_cost_currency', 'INR')
         voice_pricing = results.get('voice_pricing') or session.get('voice_pricing') or {}
 
-        # Always recompute manday rates + text dev cost to avoid stale zeros
-        try:
-            country = (inputs.get('country') or 'India').strip()
-            dev_location = dev_location_for_manday_rates(country, inputs)
-            rates = COUNTRY_MANDAY_RATES.get(country, COUNTRY_MANDAY_RATES['APAC'])
-            if country == 'LATAM':
-                default_bot_ui = float(rates['bot_ui'].get(dev_location, 0.0) or 0.0)
-                default_custom_ai = float(rates['custom_ai'].get(dev_location, 0.0) or 0.0)
-            else:
-                default_bot_ui = float(rates.get('bot_ui', 0.0) or 0.0)
-                default_custom_ai = float(rates.get('custom_ai', 0.0) or 0.0)
-            manday_rates = {
-                'bot_ui': default_bot_ui,
-                'custom_ai': default_custom_ai,
-                'default_bot_ui': default_bot_ui,
-                'default_custom_ai': default_custom_ai,
-            }
-            manday_rates['bot_ui'] = float(manday_rates.get('bot_ui', default_bot_ui))
-            manday_rates['custom_ai'] = float(manday_rates.get('custom_ai', default_custom_ai))
-            manday_rates['default_bot_ui'] = float(default_bot_ui)
-            manday_rates['default_custom_ai'] = float(default_custom_ai)
-            manday_rates['bot_ui_discount'] = round(100 * (default_bot_ui - manday_rates['bot_ui']) / default_bot_ui, 3) if default_bot_ui else 0
-            manday_rates['custom_ai_discount'] = round(100 * (default_custom_ai - manday_rates['custom_ai']) / default_custom_ai, 3) if default_custom_ai else 0
-
-            total_dev_cost, dev_cost_currency, dev_cost_breakdown = calculate_total_manday_cost(inputs, manday_rates)
-            text_manday_breakdown = dev_cost_breakdown.get('mandays_breakdown', {})
-            text_mandays = text_manday_breakdown.get('total', calculate_total_mandays(inputs))
-            session['dev_cost_breakdown'] = dev_cost_breakdown
-            session['dev_cost_currency'] = dev_cost_currency
-            session['manday_breakdown'] = text_manday_breakdown
-            session['manday_rates'] = manday_rates
-        except Exception as e:
-            _vprint(f"Error calculating dev_cost_breakdown: {e}", file=sys.stderr, flush=True)
-            dev_cost_breakdown = {'total_cost': 0, 'ba_cost': 0, 'qa_cost': 0, 'pm_cost': 0, 'uplift_amount': 0}
-            dev_cost_currency = 'INR'
-            text_manday_breakdown = calculate_total_mandays_breakdown(inputs)
-            text_mandays = text_manday_breakdown.get('total', 0)
-        
-        # Recalculate pricing simulation
-        pricing_simulation = calculate_pricing_simulation(inputs, pricing_inputs)
-        
-        # Text mandays (pre-voice merge) for display
-        total_mandays = calculate_total_mandays(inputs)
-        if 'text_mandays' not in locals():
-            text_mandays = total_mandays
-        if 'text_manday_breakdown' not in locals():
-            text_manday_breakdown = calculate_total_mandays_breakdown(inputs)
+        # Manday costing and pricing simulation are cached per calculation + inputs hash
+        page = RESULT_CACHE.get_or_compute(
+            RESULT_CACHE.key(calculation_id, 'results_page', inputs, pricing_inputs),
+            result_cache_version(),
+            lambda: _compute_results_page_context(inputs),
+        )
+        dev_cost_breakdown = page['dev_cost_breakdown']
+        dev_cost_currency = page['dev_cost_currency']
+        text_manday_breakdown = page['text_manday_breakdown']
+        text_mandays = page['text_mandays']
+        total_mandays = page['total_mandays']
+        if 'manday_rates' in page:
+            manday_rates = page['manday_rates']
+            # Only rewrite session keys that changed, so a plain refresh does not re-store the session
+            for key, value in (
+                ('dev_cost_breakdown', dev_cost_breakdown),
+                ('dev_cost_currency', dev_cost_currency),
+                ('manday_breakdown', text_manday_breakdown),
+                ('manday_rates', manday_rates),
+            ):
+                if session.get(key) != value:
+                    session[key] = value
+
+        pricing_simulation = cached_pricing_simulation(calculation_id, inputs, pricing_inputs)
         manday_breakdown = dict(text_manday_breakdown or {})
 
         # Text and voice mandays remain separate on the results page
@@ -2522,18 +2776,19 @@ def index():
     
     country = session.get('inputs', {}).get('country', 'India')
     currency_symbol = COUNTRY_CURRENCY.get(country, '$')
-    return render_template('index.html', step='volumes', currency_symbol=currency_symbol, inputs=session.get('inputs', {}), calculation_id=None, min_fees=min_fees, ai_agent_pricing=AI_AGENT_PRICING)
+    return render_template('index.html', step='volumes', currency_symbol=currency_symbol, inputs=session.get('inputs', {}), calculation_id=None, min_fees=min_fees, ai_agent_models=ai_agent_model_options())
 
 
-def generate_sow_docx(inputs, results, final_price_details, profile, sow_details=None, calculation_id=None):
+def generate_sow_docx(inputs, results, final_price_details, profile, sow_details=None, calculation_id=None,
+                      inclusion_items=None):
     """
     Construct a Scope of Work .docx document in memory using the master template.
+    inclusion_items defaults to the session's inclusions (pass them in outside a request).
     """
-    from pathlib import Path
     from datetime import datetime
-    # Load master SOW template so all static sections stay intact
-    template_path = Path(__file__).resolve().parent / 'master sow' / 'Latest SOW Master Copy 2026.docx'
-    doc = Document(str(template_path))
+    # Fresh copy of the parsed master SOW template so all static sections stay intact
+    sow_doc = SOW_TEMPLATE.new_document()
+    doc = sow_doc.doc
 
     # Basic profile / deal context (used where relevant)
     name = (profile or {}).get('name') or inputs.get('user_name', '')
@@ -2560,32 +2815,8 @@ def generate_sow_docx(inputs, results, final_price_details, profile, sow_details
     if calculation_id:
         doc.add_paragraph(f"Calculation ID: {calculation_id}")
 
-    def _row_text(table, row_idx):
-        if not table or row_idx >= len(table.rows):
-            return []
-        return [cell.text.strip() for cell in table.rows[row_idx].cells]
-
-    def _find_table_by_headers(headers):
-        for table in doc.tables:
-            row0 = _row_text(table, 0)
-            if row0 and all(h in row0 for h in headers):
-                return table
-        return None
-
-    def _find_tables_by_headers(headers):
-        matches = []
-        for table in doc.tables:
-            row0 = _row_text(table, 0)
-            if row0 and all(h in row0 for h in headers):
-                matches.append(table)
-        return matches
-
-    def _find_table_by_row_label(label, row_idx=1):
-        for table in doc.tables:
-            row = _row_text(table, row_idx)
-            if row and row[0] == label:
-                return table
-        return None
+    _find_table_by_headers = sow_doc.table_by_headers
+    _find_table_by_row_label = sow_doc.table_by_row_label
 
     def _checkbox_group(options, selected):
         selected_set = set([s.strip() for s in (selected or [])])
@@ -2995,13 +3226,8 @@ def generate_sow_docx(inputs, results, final_price_details, profile, sow_details
 
     # Scope / inclusions – we keep the static prose from the template, but can
     # optionally append dynamic inclusions list at the end of that section.
-    inclusions = session.get('inclusions') or {}
-    final_inclusions = session.get('final_inclusions') or []
-    # Prefer the flattened list passed to the template; fall back to dict if needed.
-    inclusion_items = final_inclusions or []
-    if not inclusion_items and isinstance(inclusions, dict):
-        for vals in inclusions.values():
-            inclusion_items.extend(vals or [])
+    if inclusion_items is None:
+        inclusion_items = _sow_inclusion_items()
     if inclusion_items:
         # Append to end of document as an “Included Features” list so we
         # don’t disturb the master copy layout. Use default paragraph style
@@ -3107,6 +3333,83 @@ def generate_sow_docx(inputs, results, final_price_details, profile, sow_details
     return bio
 
 
+def _sow_inclusion_items():
+    """Calculator inclusions listed at the end of the SOW, from the session."""
+    inclusions = session.get('inclusions') or {}
+    final_inclusions = session.get('final_inclusions') or []
+    # Prefer the flattened list passed to the template; fall back to dict if needed.
+    inclusion_items = list(final_inclusions)
+    if not inclusion_items and isinstance(inclusions, dict):
+        for vals in inclusions.values():
+            inclusion_items.extend(vals or [])
+    return inclusion_items
+
+
+def _mark_sow_funnel(calculation_id, downloaded=False):
+    """
+    Flag the calculation's latest analytics row as SOW clicked (and downloaded). The update is
+    queued behind the results-page row in ANALYTICS_WRITER, so it never waits on a flush.
+    """
+    if not calculation_id:
+        return
+    flags = {'sow_generate_clicked': True}
+    if downloaded:
+        flags['sow_downloaded'] = True
+    ANALYTICS_WRITER.enqueue_update(
+        Analytics.__table__, {'calculation_id': calculation_id}, flags, latest_by='timestamp',
+    )
+
+
+def _mark_sow_downloaded(calculation_id):
+    """Flag the calculation's analytics row as SOW clicked and downloaded."""
+    _mark_sow_funnel(calculation_id, downloaded=True)
+
+
+def _sow_build_args(inputs, results, final_price_details, profile, sow_details, calculation_id):
+    """generate_sow_docx arguments for this request, with the session's inclusions resolved."""
+    return {
+        'inputs': inputs,
+        'results': results,
+        'final_price_details': final_price_details,
+        'profile': profile,
+        'sow_details': sow_details,
+        'calculation_id': calculation_id,
+        'inclusion_items': _sow_inclusion_items(),
+    }
+
+
+def _sow_cache_key(sow_args):
+    # The revision table carries today's date, so the day is part of the key too
+    return SOW_CACHE.key(
+        sow_args['inputs'], sow_args['results'], sow_args['final_price_details'], sow_args['sow_details'],
+        sow_args['profile'], sow_args['calculation_id'] or '', sow_args['inclusion_items'],
+        SOW_TEMPLATE.current_version(), datetime.utcnow().strftime('%Y-%m-%d'),
+    )
+
+
+def _build_cached_sow(sow_key, sow_args):
+    """Path of the generated SOW document, built only if it is not cached yet (no request context needed)."""
+    return SOW_CACHE.get_or_build(sow_key, lambda: generate_sow_docx(**sow_args).getvalue())
+
+
+def _open_cached_sow(sow_key, sow_args):
+    """Open handle on the generated SOW document; rebuilt if another worker evicted it meanwhile."""
+    return SOW_CACHE.open_or_build(sow_key, lambda: generate_sow_docx(**sow_args).getvalue())
+
+
+def _send_sow(sow_file, sow_key, calculation_id):
+    response = send_file(
+        sow_file,
+        mimetype="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        as_attachment=True,
+        download_name=f"SOW_{calculation_id or 'pricing'}.docx",
+        etag=sow_key,
+        conditional=True,
+    )
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
 @app.route('/generate-sow', methods=['GET'])
 def generate_sow():
     """
@@ -3134,21 +3437,7 @@ def generate_sow():
         return redirect(url_for('index'))
 
     # Mark that the SOW was actually downloaded for this calculation
-    if calculation_id:
-        try:
-            analytics_row = (
-                Analytics.query.filter_by(calculation_id=calculation_id)
-                .order_by(Analytics.timestamp.desc())
-                .first()
-            )
-            if analytics_row:
-                # Ensure click is marked as well for robustness
-                if not analytics_row.sow_generate_clicked:
-                    analytics_row.sow_generate_clicked = True
-                analytics_row.sow_downloaded = True
-                db.session.commit()
-        except Exception:
-            logger.exception("Failed to mark sow_downloaded in Analytics")
+    _mark_sow_downloaded(calculation_id)
 
     try:
         logger.info(
@@ -3166,14 +3455,9 @@ def generate_sow():
     # Record SOW download step for funnel analytics
     record_funnel_event('sow_download', inputs=inputs, profile=profile)
 
-    docx_io = generate_sow_docx(inputs, results, final_price_details, profile, sow_details, calculation_id)
-    filename = f"SOW_{calculation_id or 'pricing'}.docx"
-    return send_file(
-        docx_io,
-        mimetype="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        as_attachment=True,
-        download_name=filename,
-    )
+    sow_args = _sow_build_args(inputs, results, final_price_details, profile, sow_details, calculation_id)
+    sow_key = _sow_cache_key(sow_args)
+    return _send_sow(_open_cached_sow(sow_key, sow_args), sow_key, calculation_id)
 
 
 @app.route('/sow-details', methods=['GET', 'POST'])
@@ -3200,19 +3484,7 @@ def sow_details():
     record_funnel_event('sow_details', inputs=inputs, profile=profile)
 
     # Mark that the user has entered the SOW funnel for this calculation (for abandon analysis)
-    if calculation_id:
-        try:
-            analytics_row = (
-                Analytics.query.filter_by(calculation_id=calculation_id)
-                .order_by(Analytics.timestamp.desc())
-                .first()
-            )
-            if analytics_row and not analytics_row.sow_generate_clicked:
-                analytics_row.sow_generate_clicked = True
-                db.session.commit()
-        except Exception:
-            # Never break user flow if analytics update fails
-            logger.exception("Failed to mark sow_generate_clicked in Analytics")
+    _mark_sow_funnel(calculation_id)
 
     existing = session.get('sow_details') or {}
 
@@ -3317,8 +3589,6 @@ def sow_details():
             )
         except Exception:
             pass
-        # After capturing details, generate the doc immediately to avoid
-        # any session/cookie persistence issues between requests.
         try:
             logger.info(
                 "SOW_GENERATE_REQUEST",
@@ -3332,37 +3602,40 @@ def sow_details():
         except Exception:
             pass
 
+        sow_args = _sow_build_args(inputs, results, final_price_details, profile, sow, calculation_id)
+        sow_key = _sow_cache_key(sow_args)
+        if request.form.get('background') == '1':
+            # The page polls the job and downloads the document when it is ready
+            try:
+                job = SOW_JOBS.submit(
+                    sow_key,
+                    lambda: _build_cached_sow(sow_key, sow_args),
+                    meta={'calculation_id': calculation_id},
+                )
+            except QueueFull:
+                response = jsonify({'error': 'SOW generation is busy, please try again in a minute.'})
+                response.headers['Retry-After'] = '30'
+                return response, 503
+            return jsonify(_sow_job_payload(job)), 202
+
+        # Without JavaScript: generate the doc immediately to avoid
+        # any session/cookie persistence issues between requests.
+
         # Record SOW download step for funnel analytics
         record_funnel_event('sow_download', inputs=inputs, profile=profile)
 
         # Mark that the SOW was actually downloaded for this calculation
-        if calculation_id:
-            try:
-                analytics_row = (
-                    Analytics.query.filter_by(calculation_id=calculation_id)
-                    .order_by(Analytics.timestamp.desc())
-                    .first()
-                )
-                if analytics_row:
-                    if not analytics_row.sow_generate_clicked:
-                        analytics_row.sow_generate_clicked = True
-                    analytics_row.sow_downloaded = True
-                    db.session.commit()
-            except Exception:
-                logger.exception("Failed to mark sow_downloaded in Analytics")
-
-        docx_io = generate_sow_docx(inputs, results, final_price_details, profile, sow, calculation_id)
-        filename = f"SOW_{calculation_id or 'pricing'}.docx"
-        return send_file(
-            docx_io,
-            mimetype="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            as_attachment=True,
-            download_name=filename,
-        )
+        _mark_sow_downloaded(calculation_id)
+
+        return _send_sow(_open_cached_sow(sow_key, sow_args), sow_key, calculation_id)
 
-    # Defaults for initial load
+    # Defaults for initial load (reuse the results page's mandays when cached)
+    cached_page = RESULT_CACHE.get(
+        RESULT_CACHE.key(calculation_id, 'results_page', inputs, session.get('pricing_inputs')),
+        result_cache_version(),
+    )
     try:
-        default_total_mandays = calculate_total_mandays(inputs)
+        default_total_mandays = cached_page['total_mandays'] if cached_page else calculate_total_mandays(inputs)
     except Exception:
         default_total_mandays = ''
     def _float_val(val):
@@ -3408,556 +3681,554 @@ def sow_details():
         inputs=inputs,
     )
 
+
+def _sow_job_payload(job):
+    payload = job.to_dict()
+    payload['status_url'] = url_for('sow_job_status', job_id=job.id)
+    payload['download_url'] = url_for('sow_job_download', job_id=job.id)
+    return payload
+
+
+def _sow_beta_user():
+    email = ((session.get('profile') or {}).get('email') or '').strip().lower()
+    return bool(email and email in SOW_BETA_EMAILS)
+
+
+@app.route('/sow-jobs/<job_id>', methods=['GET'])
+def sow_job_status(job_id):
+    """Status of a background SOW build: queued, running, done or failed."""
+    if not _sow_beta_user():
+        abort(403)
+    job = SOW_JOBS.get(job_id)
+    if job is None:
+        if SOW_CACHE.get(job_id) is None:
+            return jsonify({'job_id': job_id, 'status': 'unknown', 'error': 'No such SOW job'}), 404
+        # Built earlier (or by another worker): the document is already cached
+        job = SowJob(job_id)
+        job.status = DONE
+    return jsonify(_sow_job_payload(job))
+
+
+@app.route('/sow-jobs/<job_id>/download', methods=['GET'])
+def sow_job_download(job_id):
+    """Download the document a finished SOW job built."""
+    if not _sow_beta_user():
+        abort(403)
+    sow_file = SOW_CACHE.open(job_id)
+    if sow_file is None:
+        job = SOW_JOBS.get(job_id)
+        status = job.status if job else 'unknown'
+        return jsonify({'job_id': job_id, 'status': status, 'error': 'SOW is not ready'}), 409 if job else 404
+    job = SOW_JOBS.get(job_id)
+    calculation_id = job.meta.get('calculation_id') if job else session.get('calculation_id')
+    inputs = session.get('inputs') or {}
+    record_funnel_event('sow_download', inputs=inputs, profile=session.get('profile') or {})
+    _mark_sow_downloaded(calculation_id)
+    return _send_sow(sow_file, job_id, calculation_id)
+
+
+# --- /analytics dashboard aggregations ---
+# Every dashboard statistic is computed in the database (GROUP BY, FILTER,
+# percentile_cont, mode() WITHIN GROUP, corr, date_trunc) in a fixed number of
+# queries, so dashboard latency and memory stay flat as the analytics table grows.
+# Medians are percentile_cont(0.5): the interpolated median for even counts.
+# Time series and per-country/region stats read the daily rollups instead
+# (refreshed by the refresh-rollups job, never here), so their cost tracks days, not rows; their
+# medians come from the rollup sketches (exact for small groups, else approximate).
+
+_ZERO_STATS = {'avg': 0, 'min': 0, 'max': 0, 'median': 0}
+
+# Dashboard key -> Analytics price column
+_MSG_PRICE_FIELDS = {
+    'ai': 'ai_price',
+    'advanced': 'advanced_price',
+    'basic_marketing': 'basic_marketing_price',
+    'basic_utility': 'basic_utility_price',
+}
+
+# Discount/mode keys -> (price column, rate-card column)
+_DISCOUNT_FIELDS = {
+    'ai': ('ai_price', 'ai_rate_card_price'),
+    'advanced': ('advanced_price', 'advanced_rate_card_price'),
+    'marketing': ('basic_marketing_price', 'basic_marketing_rate_card_price'),
+    'utility': ('basic_utility_price', 'basic_utility_rate_card_price'),
+    'platform_fee': ('platform_fee', 'platform_fee'),  # always 0, but for completeness
+}
+
+
+def _nonzero(expr):
+    """NULL for NULL/0 values, the dashboard's 'not set' filter (aggregates skip NULLs)."""
+    return case((expr != 0, expr))
+
+
+def _stat_columns(prefix, expr):
+    return [
+        func.avg(expr).label(f'{prefix}_avg'),
+        func.min(expr).label(f'{prefix}_min'),
+        func.max(expr).label(f'{prefix}_max'),
+        func.percentile_cont(0.5).within_group(expr).label(f'{prefix}_median'),
+    ]
+
+
+def _stats_from_row(row, prefix):
+    values = row._mapping
+    if values[f'{prefix}_avg'] is None:
+        return dict(_ZERO_STATS)
+    return {key: float(values[f'{prefix}_{key}']) for key in ('avg', 'min', 'max', 'median')}
+
+
+def _grouped_counts(expr, *conditions, limit=None):
+    """[(value, count), ...] most frequent first, like Counter.most_common."""
+    query = (
+        db.session.query(expr, func.count().label('n'))
+        .filter(*conditions)
+        .group_by(expr)
+        .order_by(func.count().desc())
+    )
+    if limit:
+        query = query.limit(limit)
+    return [(value, count) for value, count in query.all()]
+
+
+def _analytics_overview():
+    """Single-row totals, global price stats, modes, volumes and fee/deal correlation."""
+    fee = Analytics.platform_fee
+    deal_size = (
+        func.coalesce(Analytics.ai_volume, 0) + func.coalesce(Analytics.advanced_volume, 0)
+        + func.coalesce(Analytics.basic_marketing_volume, 0) + func.coalesce(Analytics.basic_utility_volume, 0)
+    )
+    avg_fee = db.session.query(func.avg(fee)).scalar_subquery()
+    columns = [
+        func.count().label('total'),
+        func.count().filter(Analytics.calculation_route == 'volumes').label('volumes_count'),
+        func.count().filter(Analytics.calculation_route == 'bundle').label('bundle_count'),
+        func.count().filter(Analytics.voice_notes_price == 'Yes').label('voice_notes_usage'),
+        func.count().filter(fee < 0.3 * avg_fee).label('fee_discount_triggered'),
+        func.count(fee).label('fee_count'),
+        func.corr(fee, deal_size).label('fee_deal_corr'),
+    ]
+    columns += _stat_columns('platform_fee', fee)
+    for key, field in list(_MSG_PRICE_FIELDS.items()) + [('voice_notes_rate', 'voice_notes_rate')]:
+        column = getattr(Analytics, field)
+        columns += _stat_columns(key, column)
+        columns.append(func.sum(column).label(f'{key}_sum'))
+    for key, (price_field, _rate_field) in _DISCOUNT_FIELDS.items():
+        columns.append(func.mode().within_group(getattr(Analytics, price_field)).label(f'{key}_mode'))
+    for field in ('ai_volume', 'advanced_volume', 'basic_marketing_volume', 'basic_utility_volume'):
+        columns.append(func.sum(func.coalesce(getattr(Analytics, field), 0)).label(f'{field}_total'))
+    return db.session.query(*columns).one()
+
+
+def _analytics_discount_stats():
+    """Discount vs rate card per type: avg/min/max/median, count and 10%-wide buckets."""
+    columns = []
+    for key, (price_field, rate_field) in _DISCOUNT_FIELDS.items():
+        price, rate = getattr(Analytics, price_field), getattr(Analytics, rate_field)
+        discount = case((rate > 0, (rate - price) / rate * 100))
+        bucket = func.least(func.greatest(func.floor(discount / 10), 0), 9)
+        columns += _stat_columns(key, discount)
+        columns.append(func.count(discount).label(f'{key}_count'))
+        columns += [func.count().filter(bucket == i).label(f'{key}_b{i}') for i in range(10)]
+    row = db.session.query(*columns).one()
+    values = row._mapping
+    result = {}
+    for key in _DISCOUNT_FIELDS:
+        stats = _stats_from_row(row, key)
+        stats['buckets'] = [values[f'{key}_b{i}'] for i in range(10)]
+        stats['count'] = values[f'{key}_count']
+        result[key] = stats
+    return result
+
+
+# Dashboard key -> rollup metric, for the per-country/region stats table
+_REGION_STAT_METRICS = {
+    'platform_fee': 'platform_fee',
+    'ai': 'ai_price',
+    'advanced': 'advanced_price',
+    'basic_marketing': 'basic_marketing_price',
+    'basic_utility': 'basic_utility_price',
+    'voice_notes_rate': 'voice_notes_rate',
+    'committed_amount': 'committed_amount',
+    'one_time_dev_cost': 'one_time_dev_cost',
+    'bot_ui_manday_cost': 'bot_ui_manday_rate',
+    'custom_ai_manday_cost': 'custom_ai_manday_rate',
+}
+
+
+def _rollup_stats(aggregate):
+    if aggregate is None or not aggregate.count:
+        return dict(_ZERO_STATS)
+    stats = aggregate.stats()
+    return {key: float(stats[key]) for key in _ZERO_STATS}
+
+
+def _analytics_stats_by_region():
+    """{country: {region: stats}} merged from the daily rollups; blank regions are 'All'."""
+    rollup = AnalyticsDailyRollup
+    rows = (
+        db.session.query(
+            rollup.country, rollup.region, rollup.metric, rollup.value_count, rollup.value_sum,
+            rollup.value_sum_sq, rollup.value_min, rollup.value_max, rollup.sketch,
+        )
+        .filter(rollup.country != '', rollup.metric.in_(list(_REGION_STAT_METRICS.values())))
+        .order_by(rollup.country, rollup.region)
+        .all()
+    )
+    merged = {}
+    for row in rows:
+        key = (row.country, row.region or 'All', row.metric)
+        aggregate = RollupAggregate.from_row(row._mapping)
+        if key in merged:
+            merged[key].merge(aggregate)
+        else:
+            merged[key] = aggregate
+    stats_by_region = {}
+    for country, region in dict.fromkeys((country, region) for country, region, _metric in merged):
+        stats = {name: _rollup_stats(merged.get((country, region, metric)))
+                 for name, metric in _REGION_STAT_METRICS.items()}
+        stats_by_region.setdefault(country, {})[region] = {
+            'platform_fee': stats['platform_fee'],
+            'msg_types': {
+                key: stats[key]
+                for key in ('ai', 'advanced', 'basic_marketing', 'basic_utility', 'voice_notes_rate')
+            },
+            'committed_amount': stats['committed_amount'],
+            'one_time_dev_cost': stats['one_time_dev_cost'],
+            'bot_ui_manday_cost': stats['bot_ui_manday_cost'],
+            'custom_ai_manday_cost': stats['custom_ai_manday_cost'],
+        }
+    return stats_by_region
+
+
+def _analytics_calculations_over_time():
+    """(by day, by ISO week, by month) calculation counts from the daily rollups."""
+    rows = (
+        db.session.query(AnalyticsDailyRollup.day, func.sum(AnalyticsDailyRollup.value_count).label('n'))
+        .filter(AnalyticsDailyRollup.metric == 'calculations')
+        .group_by(AnalyticsDailyRollup.day)
+        .order_by(AnalyticsDailyRollup.day)
+        .all()
+    )
+    by_day, by_week, by_month = {}, {}, {}
+    for day, n in rows:
+        n = int(n or 0)
+        year, week, _weekday = day.isocalendar()
+        by_day[str(day)] = n
+        by_week[f'{year}-W{week:02d}'] = by_week.get(f'{year}-W{week:02d}', 0) + n
+        by_month[day.strftime('%Y-%m')] = by_month.get(day.strftime('%Y-%m'), 0) + n
+    return by_day, by_week, by_month
+
+
+def _analytics_country_aggregates():
+    """Per-country average discounts and the price/platform-fee sums used by the charts."""
+    columns = [Analytics.country]
+    for key, field in _MSG_PRICE_FIELDS.items():
+        price = getattr(Analytics, field)
+        rate = getattr(Analytics, field.replace('_price', '_rate_card_price'))
+        columns += [
+            func.avg((rate - price) / func.nullif(rate, 0)).label(f'{key}_discount'),
+            func.sum(func.coalesce(price, 0)).label(f'{key}_sum'),
+            func.count(price).label(f'{key}_count'),
+        ]
+    columns += [
+        func.avg(_nonzero(Analytics.bot_ui_manday_rate)).label('bot_ui_manday_avg'),
+        func.avg(_nonzero(Analytics.custom_ai_manday_rate)).label('custom_ai_manday_avg'),
+        func.sum(func.coalesce(Analytics.platform_fee, 0)).label('platform_fee_sum'),
+        func.count(Analytics.platform_fee).label('platform_fee_count'),
+    ]
+    return (
+        db.session.query(*columns)
+        .filter(Analytics.country.isnot(None))
+        .group_by(Analytics.country)
+        .all()
+    )
+
+
+def _manday_discount(rate_card, avg_chosen):
+    if avg_chosen is None or not isinstance(rate_card, (int, float)) or not rate_card:
+        return 0.0
+    return 100 * (rate_card - float(avg_chosen)) / rate_card
+
+
+def _flat_manday_rates(country):
+    """
+    (bot_ui, custom_ai) rate-card manday rates for the dashboard discount; None for a kind
+    priced per dev location, since analytics rows do not record the location.
+    """
+    rates = get_rate_card().country(country)
+    return tuple(
+        default if len(set(by_location.values())) <= 1 else None
+        for by_location, default in (
+            (rates.bot_ui_rates, rates.default_bot_ui),
+            (rates.custom_ai_rates, rates.default_custom_ai),
+        )
+    )
+
+
+def _country_avg_discount(row):
+    """Average discount (percent) per message type and manday kind for one _analytics_country_aggregates row."""
+    row_values = row._mapping
+    discount = {
+        key: 100 * float(row_values[f'{key}_discount']) if row_values[f'{key}_discount'] is not None else 0.0
+        for key in _MSG_PRICE_FIELDS
+    }
+    bot_ui_rate, custom_ai_rate = _flat_manday_rates(row.country)
+    discount['bot_ui_manday'] = _manday_discount(bot_ui_rate, row.bot_ui_manday_avg)
+    discount['custom_ai_manday'] = _manday_discount(custom_ai_rate, row.custom_ai_manday_avg)
+    return discount
+
+
+def _analytics_usage_by_profile():
+    """Calculations per profile (email, else name, else 'Unknown'), first-seen order."""
+    key = func.coalesce(
+        func.nullif(Analytics.user_email, ''), func.nullif(Analytics.user_name, ''), 'Unknown'
+    ).label('profile_key')
+    rows = (
+        db.session.query(
+            key,
+            array_agg(aggregate_order_by(Analytics.user_email, Analytics.id))[1].label('email'),
+            array_agg(aggregate_order_by(Analytics.user_name, Analytics.id))[1].label('name'),
+            func.array_agg(distinct(Analytics.country)).label('countries'),
+            func.array_agg(distinct(Analytics.region)).label('regions'),
+            func.count().label('calculations'),
+            func.max(Analytics.timestamp).label('last_seen'),
+        )
+        .group_by(key)
+        .order_by(func.min(Analytics.id))
+        .all()
+    )
+    return [
+        {
+            'email': row.email,
+            'name': row.name or '',
+            'countries': ', '.join(sorted(c for c in row.countries if c)),
+            'regions': ', '.join(sorted(r for r in row.regions if r)),
+            'calculations': row.calculations,
+            'last_seen': row.last_seen,
+        }
+        for row in rows
+    ]
+
+
+def _analytics_usage_by_domain():
+    """Calculations per email domain (text after the first '@', lowercased)."""
+    domain = func.lower(
+        func.substr(Analytics.user_email, func.strpos(Analytics.user_email, '@') + 1)
+    ).label('domain')
+    rows = (
+        db.session.query(
+            domain,
+            func.count().label('calculations'),
+            func.array_agg(distinct(Analytics.country)).label('countries'),
+            func.array_agg(distinct(Analytics.region)).label('regions'),
+        )
+        .filter(Analytics.user_email.contains('@'))
+        .group_by(domain)
+        .order_by(func.min(Analytics.id))
+        .all()
+    )
+    return [
+        {
+            'domain': row.domain,
+            'calculations': row.calculations,
+            'countries': ', '.join(sorted(c for c in row.countries if c)),
+            'regions': ', '.join(sorted(r for r in row.regions if r)),
+        }
+        for row in rows
+    ]
+
+
+def _user_stats_manday_constants(country):
+    """(one_time_dev_cost, per_manday_cost) shown per user/country from the rate card."""
+    # LATAM prices by dev location; its own delivery location is the one shown here
+    bot_ui_rate, custom_ai_rate = get_rate_card().country(country).manday_rates(country)
+    return bot_ui_rate + custom_ai_rate, (bot_ui_rate + custom_ai_rate) / 2
+
+
+def _analytics_user_stats():
+    """{user_name: {(country, currency): stats}} from one GROUP BY."""
+    fields = {
+        'platform_fee': 'platform_fee',
+        'ai': 'ai_price',
+        'advanced': 'advanced_price',
+        'basic_marketing': 'basic_marketing_price',
+        'basic_utility': 'basic_utility_price',
+        'voice_notes_rate': 'voice_notes_rate',
+        'committed_amount': 'committed_amount',
+    }
+    columns = [Analytics.user_name, Analytics.country, Analytics.currency]
+    for key, field in fields.items():
+        columns += _stat_columns(key, getattr(Analytics, field))
+    rows = (
+        db.session.query(*columns)
+        .group_by(Analytics.user_name, Analytics.country, Analytics.currency)
+        .all()
+    )
+    user_stats = {}
+    for row in rows:
+        entry = {key: _stats_from_row(row, key) for key in fields}
+        dev_cost, per_manday_cost = _user_stats_manday_constants(row.country)
+        entry['one_time_dev_cost'] = {'avg': dev_cost, 'min': dev_cost, 'max': dev_cost, 'median': dev_cost}
+        entry['per_manday_cost'] = {
+            'avg': per_manday_cost, 'min': per_manday_cost, 'max': per_manday_cost, 'median': per_manday_cost
+        }
+        user_stats.setdefault(row.user_name, {})[(row.country, row.currency)] = entry
+    return user_stats
+
+
+def _analytics_voice_overview():
+    voice_calculation = Analytics.channel_type.in_(['voice_only', 'text_voice'])
+    row = db.session.query(
+        func.count().filter(voice_calculation).label('calculations'),
+        func.avg(Analytics.voice_total_cost).label('avg_total_cost'),
+        func.avg(Analytics.voice_mandays).label('avg_mandays'),
+        func.avg(Analytics.voice_platform_fee).label('avg_platform_fee'),
+        func.avg(Analytics.whatsapp_setup_fee).label('avg_setup_fee'),
+        func.sum(Analytics.whatsapp_voice_outbound_minutes).label('sum_wa_outbound_minutes'),
+        func.sum(Analytics.whatsapp_voice_inbound_minutes).label('sum_wa_inbound_minutes'),
+        func.sum(Analytics.pstn_inbound_ai_minutes).label('sum_pstn_inbound_minutes'),
+        func.sum(Analytics.pstn_outbound_ai_minutes).label('sum_pstn_outbound_minutes'),
+        func.sum(Analytics.pstn_manual_minutes).label('sum_pstn_manual_minutes'),
+        func.count().filter(Analytics.channel_type == 'voice_only').label('voice_only_count'),
+        func.count().filter(Analytics.channel_type == 'text_voice').label('text_voice_count'),
+    ).one()
+    overview = {'calculations': row.calculations}
+    for key in (
+        'avg_total_cost', 'avg_mandays', 'avg_platform_fee', 'avg_setup_fee',
+        'sum_wa_outbound_minutes', 'sum_wa_inbound_minutes', 'sum_pstn_inbound_minutes',
+        'sum_pstn_outbound_minutes', 'sum_pstn_manual_minutes',
+    ):
+        value = row._mapping[key]
+        overview[key] = float(value) if value is not None else 0.0
+    overview['channel_type_counts'] = {'voice_only': row.voice_only_count, 'text_voice': row.text_voice_count}
+    return overview
+
+
+def _catch_up_rollups():
+    """
+    Fold at most one small batch of new rows into the rollups (the backfill and full
+    refreshes are the daily script / `flask refresh-rollups`). Returns the rollups'
+    refreshed_at so the page can show how current its series are.
+    """
+    try:
+        refresh_analytics_rollups(batch_size=ROLLUP_PAGE_CATCH_UP_ROWS, max_batches=1, wait=False)
+    except Exception:
+        logger.exception("Rollup catch-up failed; showing the rollups as they are")
+        db.session.rollback()
+    try:
+        state = db.session.get(AnalyticsRollupState, WATERMARK_NAME)
+    except Exception:
+        db.session.rollback()
+        return None
+    return state.refreshed_at if state else None
+
+
+def build_analytics_dashboard():
+    """Everything analytics.html renders, computed with database-side aggregation."""
+    overview = _analytics_overview()
+    values = overview._mapping
+
+    rollups_refreshed_at = _catch_up_rollups()
+    calculations_by_day, calculations_by_week, seasonality = _analytics_calculations_over_time()
+
+    platform_fee_stats = _stats_from_row(overview, 'platform_fee')
+    avg_platform_fee = platform_fee_stats['avg']
+    message_volumes = {}
+    for key in _MSG_PRICE_FIELDS:
+        stats = _stats_from_row(overview, key)
+        # Historical quirk kept for the template: these are price (not volume) aggregates
+        message_volumes[key] = [float(values[f'{key}_sum'] or 0), stats['min'], stats['max'], stats['median']]
+
+    # Per-country stats for table; stats[country] is the 'All' region (else the first region)
+    stats_by_region = _analytics_stats_by_region()
+    stats = {}
+    for country, regions in stats_by_region.items():
+        stats[country] = regions['All'] if 'All' in regions else next(iter(regions.values()))
+
+    avg_price_data = {}
+    avg_platform_fee_data = {}
+    for row in _analytics_country_aggregates():
+        country = row.country
+        row_values = row._mapping
+        if country in stats:
+            stats[country]['avg_discount'] = _country_avg_discount(row)
+        avg_price_data[country] = {
+            key: {'sum': float(row_values[f'{key}_sum'] or 0), 'count': row_values[f'{key}_count']}
+            for key in _MSG_PRICE_FIELDS
+        }
+        avg_platform_fee_data[country] = {'sum': float(row.platform_fee_sum or 0), 'count': row.platform_fee_count}
+
+    total_calculations = values['total']
+    popular_types = sorted([
+        ('AI', float(values['ai_volume_total'] or 0)),
+        ('Advanced', float(values['advanced_volume_total'] or 0)),
+        ('Marketing', float(values['basic_marketing_volume_total'] or 0)),
+        ('Utility', float(values['basic_utility_volume_total'] or 0)),
+    ], key=lambda x: x[1], reverse=True)
+    # Pearson correlation only when every row has a platform fee (as before); NULL corr = no variance
+    correlation = 0
+    if total_calculations and values['fee_count'] == total_calculations and values['fee_deal_corr'] is not None:
+        correlation = float(values['fee_deal_corr'])
+
+    analytics = {
+        'calculations': total_calculations,
+        'volumes_count': values['volumes_count'],
+        'bundle_count': values['bundle_count'],
+        'calculations_by_day': calculations_by_day,
+        'calculations_by_week': calculations_by_week,
+        'country_counter': _grouped_counts(Analytics.country, Analytics.country.isnot(None), limit=5),
+        'platform_fee_stats': platform_fee_stats,
+        'platform_fee_options': _grouped_counts(Analytics.platform_fee, Analytics.platform_fee.isnot(None), limit=5),
+        'ai_stats': _stats_from_row(overview, 'ai'),
+        'advanced_stats': _stats_from_row(overview, 'advanced'),
+        'marketing_stats': _stats_from_row(overview, 'basic_marketing'),
+        'utility_stats': _stats_from_row(overview, 'basic_utility'),
+        'voice_notes_stats': _stats_from_row(overview, 'voice_notes_rate'),
+        'voice_notes_usage': values['voice_notes_usage'],
+        'voice_notes_percentage': (values['voice_notes_usage'] / total_calculations * 100) if total_calculations > 0 else 0,
+        'message_volumes': message_volumes,
+        'platform_fee_discount_triggered': values['fee_discount_triggered'] if avg_platform_fee else 0,
+        # Margin chosen and rate card (dummy values for now, replace with real if available)
+        'margin_chosen': [95.825],
+        'margin_rate_card': [0.0],
+        'stats': stats,
+        'discount_warnings': {},
+        'avg_price_data': avg_price_data,
+        'avg_platform_fee_data': avg_platform_fee_data,
+        'top_users': get_top_users(),
+        'user_stats': _analytics_user_stats(),
+        'ai_model_counts': _grouped_counts(
+            Analytics.ai_agent_model, Analytics.ai_agent_model.isnot(None), Analytics.ai_agent_model != '', limit=10
+        ),
+        'ai_complexity_counts': _grouped_counts(
+            func.coalesce(func.nullif(Analytics.ai_agent_complexity, ''), 'regular').label('complexity')
+        ),
+        'stats_by_region': stats_by_region,
+        'profile_usage': _analytics_usage_by_profile(),
+        'account_usage': _analytics_usage_by_domain(),
+        'discounts': _analytics_discount_stats(),
+        'modes': {key: values[f'{key}_mode'] for key in _DISCOUNT_FIELDS},
+        'popular_types': popular_types,
+        'platform_fee_vs_deal_correlation': correlation,
+        'seasonality': seasonality,
+        # The series and per-country stats come from the rollups; show how current they are
+        'rollups_refreshed_at': rollups_refreshed_at,
+    }
+    try:
+        analytics['voice_overview'] = _analytics_voice_overview()
+    except Exception:
+        db.session.rollback()
+        analytics['voice_overview'] = None
+    return analytics
+
+
 @app.route('/analytics', methods=['GET', 'POST'])
 def analytics():
     try:
         if request.method == 'POST':
             keyword = request.form.get('keyword', '')
             if keyword == SECRET_ANALYTICS_KEYWORD:
-                # Query the database for analytics
-                total_calculations = Analytics.query.count()
-                # Calculations by day
-                calculations_by_day = {str(row[0]): row[1] for row in db.session.query(func.date(Analytics.timestamp), func.count()).group_by(func.date(Analytics.timestamp)).all()}
-                # Calculations by week
-                calculations_by_week = {str(row[0]): row[1] for row in db.session.query(
-                    func.to_char(Analytics.timestamp, 'IYYY-"W"IW'),
-                    func.count()
-                ).group_by(
-                    func.to_char(Analytics.timestamp, 'IYYY-"W"IW')
-                ).all()}
-                # Most common countries
-                country_list = [row[0] for row in db.session.query(Analytics.country).all() if row[0] is not None]
-                country_counter = Counter(country_list).most_common(5)
-                # Platform fee stats
-                platform_fees = [row[0] for row in db.session.query(Analytics.platform_fee).all() if row[0] is not None]
-                if platform_fees:
-                    avg_platform_fee = sum(platform_fees) / len(platform_fees)
-                    min_platform_fee = min(platform_fees)
-                    max_platform_fee = max(platform_fees)
-                    median_platform_fee = sorted(platform_fees)[len(platform_fees)//2]
-                else:
-                    avg_platform_fee = min_platform_fee = max_platform_fee = median_platform_fee = 0
-                # Platform fee options (most common platform_fee values)
-                platform_fee_options = Counter(platform_fees).most_common(5)
-                # Message price stats by type
-                def get_stats(field):
-                    vals = [getattr(a, field) for a in Analytics.query.all() if getattr(a, field) is not None]
-                    if vals:
-                        return {
-                            'avg': sum(vals)/len(vals),
-                            'min': min(vals),
-                            'max': max(vals),
-                            'median': sorted(vals)[len(vals)//2]
-                        }
-                    else:
-                        return {'avg': 0, 'min': 0, 'max': 0, 'median': 0}
-                ai_stats = get_stats('ai_price')
-                advanced_stats = get_stats('advanced_price')
-                marketing_stats = get_stats('basic_marketing_price')
-                utility_stats = get_stats('basic_utility_price')
-                # Voice notes stats
-                voice_notes_stats = get_stats('voice_notes_rate')
-                # Voice notes usage stats
-                voice_notes_usage = Analytics.query.filter(Analytics.voice_notes_price == 'Yes').count()
-                voice_notes_total = Analytics.query.count()
-                voice_notes_percentage = (voice_notes_usage / voice_notes_total * 100) if voice_notes_total > 0 else 0
-                # Message volume distribution (sum, min, max, median for each type)
-                def get_volume_stats(field):
-                    vals = [getattr(a, field) for a in Analytics.query.all() if getattr(a, field) is not None]
-                    if vals:
-                        return [sum(vals), min(vals), max(vals), sorted(vals)[len(vals)//2]]
-                    else:
-                        return [0, 0, 0, 0]
-                message_volumes = {
-                    'ai': get_volume_stats('ai_price'),
-                    'advanced': get_volume_stats('advanced_price'),
-                    'basic_marketing': get_volume_stats('basic_marketing_price'),
-                    'basic_utility': get_volume_stats('basic_utility_price')
-                }
-                # Platform fee discount triggered (count)
-                platform_fee_discount_triggered = db.session.query(Analytics).filter(Analytics.platform_fee < 0.3 * avg_platform_fee).count() if avg_platform_fee else 0
-                # Margin chosen and rate card (dummy values for now, replace with real if available)
-                margin_chosen = [95.825]  # Example value, replace with real calculation if available
-                margin_rate_card = [0.0]  # Example value, replace with real calculation if available
-                # Per-country stats for table
-                stats = {}
-                stats_by_region = {}
-                countries = set(country_list)
-                for country in countries:
-                    country_analytics = Analytics.query.filter_by(country=country).all()
-                    # Group by region within country
-                    region_map = {}
-                    for a in country_analytics:
-                        region = getattr(a, 'region', '') or 'All'
-                        if region == 'All' or not region:
-                            region = 'All'  # Keep as 'All' instead of changing to country name
-                        if region not in region_map:
-                            region_map[region] = []
-                        region_map[region].append(a)
-                    stats_by_region[country] = {}
-                    for region, region_analytics in region_map.items():
-                        country_fees = [a.platform_fee for a in region_analytics if a.platform_fee is not None]
-                        country_ai = [a.ai_price for a in region_analytics if a.ai_price is not None]
-                        country_adv = [a.advanced_price for a in region_analytics if a.advanced_price is not None]
-                        country_mark = [a.basic_marketing_price for a in region_analytics if a.basic_marketing_price is not None]
-                        country_util = [a.basic_utility_price for a in region_analytics if a.basic_utility_price is not None]
-                        country_voice_notes = [a.voice_notes_rate for a in region_analytics if a.voice_notes_rate is not None]
-                        country_committed = [a.committed_amount for a in region_analytics if a.committed_amount not in (None, 0, '0', '', 'None')]
-                        # --- One Time Dev Cost Aggregation ---
-                        dev_costs = []
-                        bot_ui_rates = [a.bot_ui_manday_rate for a in region_analytics if a.bot_ui_manday_rate not in (None, 0, '0', '', 'None')]
-                        custom_ai_rates = [a.custom_ai_manday_rate for a in region_analytics if a.custom_ai_manday_rate not in (None, 0, '0', '', 'None')]
-                        bot_ui_mandays = [getattr(a, 'bot_ui_mandays', None) for a in region_analytics]
-                        custom_ai_mandays = [getattr(a, 'custom_ai_mandays', None) for a in region_analytics]
-                        for a in region_analytics:
-                            bot_ui_rate = a.bot_ui_manday_rate if a.bot_ui_manday_rate is not None else 0
-                            custom_ai_rate = a.custom_ai_manday_rate if a.custom_ai_manday_rate is not None else 0
-                            bot_days = getattr(a, 'bot_ui_mandays', 0) or 0
-                            ai_days = getattr(a, 'custom_ai_mandays', 0) or 0
-                            dev_cost = (bot_ui_rate * bot_days) + (custom_ai_rate * ai_days)
-                            dev_costs.append(dev_cost)
-                        def stat_dict(vals):
-                            filtered = [float(v) for v in vals if v not in (None, 0, '0', '', 'None')]
-                            if not filtered:
-                                return {'avg': 0, 'min': 0, 'max': 0, 'median': 0}
-                            avg = sum(filtered) / len(filtered)
-                            min_v = min(filtered)
-                            max_v = max(filtered)
-                            sorted_vals = sorted(filtered)
-                            n = len(sorted_vals)
-                            if n % 2 == 1:
-                                median = sorted_vals[n // 2]
-                            else:
-                                median = (sorted_vals[n // 2 - 1] + sorted_vals[n // 2]) / 2
-                            return {'avg': avg, 'min': min_v, 'max': max_v, 'median': median}
-                        stats_by_region[country][region] = {
-                            'platform_fee': stat_dict(country_fees),
-                            'msg_types': {
-                                'ai': {
-                                    'avg': sum(country_ai)/len(country_ai) if country_ai else 0,
-                                    'min': min(country_ai) if country_ai else 0,
-                                    'max': max(country_ai) if country_ai else 0,
-                                    'median': sorted(country_ai)[len(country_ai)//2] if country_ai else 0
-                                },
-                                'advanced': {
-                                    'avg': sum(country_adv)/len(country_adv) if country_adv else 0,
-                                    'min': min(country_adv) if country_adv else 0,
-                                    'max': max(country_adv) if country_adv else 0,
-                                    'median': sorted(country_adv)[len(country_adv)//2] if country_adv else 0
-                                },
-                                'basic_marketing': {
-                                    'avg': sum(country_mark)/len(country_mark) if country_mark else 0,
-                                    'min': min(country_mark) if country_mark else 0,
-                                    'max': max(country_mark) if country_mark else 0,
-                                    'median': sorted(country_mark)[len(country_mark)//2] if country_mark else 0
-                                },
-                                'basic_utility': {
-                                    'avg': sum(country_util)/len(country_util) if country_util else 0,
-                                    'min': min(country_util) if country_util else 0,
-                                    'max': max(country_util) if country_util else 0,
-                                    'median': sorted(country_util)[len(country_util)//2] if country_util else 0
-                                },
-                                'voice_notes_rate': {
-                                    'avg': sum(country_voice_notes)/len(country_voice_notes) if country_voice_notes else 0,
-                                    'min': min(country_voice_notes) if country_voice_notes else 0,
-                                    'max': max(country_voice_notes) if country_voice_notes else 0,
-                                    'median': sorted(country_voice_notes)[len(country_voice_notes)//2] if country_voice_notes else 0
-                                }
-                            },
-                            'committed_amount': stat_dict(country_committed),
-                            'one_time_dev_cost': stat_dict(dev_costs),
-                            'bot_ui_manday_cost': stat_dict(bot_ui_rates),
-                            'custom_ai_manday_cost': stat_dict(custom_ai_rates)
-                        }
-                    # For backward compatibility, keep the old stats[country] as the sum of all regions
-                    # Ensure stats[country] has the msg_types structure
-                    if 'All' in stats_by_region[country] and 'msg_types' in stats_by_region[country]['All']:
-                        stats[country] = stats_by_region[country]['All']
-                    else:
-                        # Get the first region that has msg_types
-                        for region_data in stats_by_region[country].values():
-                            if 'msg_types' in region_data:
-                                stats[country] = region_data
-                                break
-                        else:
-                            # Fallback: create a basic structure with msg_types
-                            stats[country] = {
-                                'platform_fee': {'avg': 0, 'min': 0, 'max': 0, 'median': 0},
-                                'msg_types': {
-                                    'ai': {'avg': 0, 'min': 0, 'max': 0, 'median': 0},
-                                    'advanced': {'avg': 0, 'min': 0, 'max': 0, 'median': 0},
-                                    'basic_marketing': {'avg': 0, 'min': 0, 'max': 0, 'median': 0},
-                                    'basic_utility': {'avg': 0, 'min': 0, 'max': 0, 'median': 0},
-                                    'voice_notes_rate': {'avg': 0, 'min': 0, 'max': 0, 'median': 0}
-                                },
-                                'committed_amount': {'avg': 0, 'min': 0, 'max': 0, 'median': 0},
-                                'one_time_dev_cost': {'avg': 0, 'min': 0, 'max': 0, 'median': 0},
-                                'bot_ui_manday_cost': {'avg': 0, 'min': 0, 'max': 0, 'median': 0},
-                                'custom_ai_manday_cost': {'avg': 0, 'min': 0, 'max': 0, 'median': 0}
-                            }
-                # --- Add average discount per country for all message types and manday rates ---
-                def avg_discount(chosen_list, rate_card_list):
-                    pairs = [
-                        (c, r)
-                        for c, r in zip(chosen_list, rate_card_list)
-                        if isinstance(c, (int, float)) and isinstance(r, (int, float)) and r
-                    ]
-                    if not pairs:
-                        return 0.0
-                    return 100 * sum((r - c) / r for c, r in pairs) / len(pairs)
-                for country in countries:
-                    country_analytics = Analytics.query.filter_by(country=country).all()
-                    # Message types
-                    ai_chosen = [a.ai_price for a in country_analytics if a.ai_price is not None]
-                    ai_rate = [a.ai_rate_card_price for a in country_analytics if a.ai_rate_card_price is not None]
-                    adv_chosen = [a.advanced_price for a in country_analytics if a.advanced_price is not None]
-                    adv_rate = [a.advanced_rate_card_price for a in country_analytics if a.advanced_rate_card_price is not None]
-                    mark_chosen = [a.basic_marketing_price for a in country_analytics if a.basic_marketing_price is not None]
-                    mark_rate = [a.basic_marketing_rate_card_price for a in country_analytics if a.basic_marketing_rate_card_price is not None]
-                    util_chosen = [a.basic_utility_price for a in country_analytics if a.basic_utility_price is not None]
-                    util_rate = [a.basic_utility_rate_card_price for a in country_analytics if a.basic_utility_rate_card_price is not None]
-                    # Manday rates
-                    bot_ui_chosen = [a.bot_ui_manday_rate for a in country_analytics if a.bot_ui_manday_rate not in (None, 0, '0', '', 'None')]
-                    bot_ui_rate = [COUNTRY_MANDAY_RATES.get(country, COUNTRY_MANDAY_RATES['APAC'])['bot_ui'] for _ in bot_ui_chosen]
-                    custom_ai_chosen = [a.custom_ai_manday_rate for a in country_analytics if a.custom_ai_manday_rate not in (None, 0, '0', '', 'None')]
-                    custom_ai_rate = [COUNTRY_MANDAY_RATES.get(country, COUNTRY_MANDAY_RATES['APAC'])['custom_ai'] for _ in custom_ai_chosen]
-                    stats[country]['avg_discount'] = {
-                        'ai': avg_discount(ai_chosen, ai_rate),
-                        'advanced': avg_discount(adv_chosen, adv_rate),
-                        'basic_marketing': avg_discount(mark_chosen, mark_rate),
-                        'basic_utility': avg_discount(util_chosen, util_rate),
-                        'bot_ui_manday': avg_discount(bot_ui_chosen, bot_ui_rate),
-                        'custom_ai_manday': avg_discount(custom_ai_chosen, custom_ai_rate),
-                    }
-                # Defensive: Ensure every stat in analytics['stats'] is a dict with msg_types
-                for country in list(stats.keys()):
-                    if not isinstance(stats[country], dict):
-                        stats[country] = {}
-                    
-                    # Ensure msg_types structure exists
-                    if 'msg_types' not in stats[country]:
-                        _vprint(f'DEBUG: Adding msg_types fallback for {country}', file=sys.stderr, flush=True)
-                        stats[country]['msg_types'] = {
-                            'ai': {'avg': 0, 'min': 0, 'max': 0, 'median': 0},
-                            'advanced': {'avg': 0, 'min': 0, 'max': 0, 'median': 0},
-                            'basic_marketing': {'avg': 0, 'min': 0, 'max': 0, 'median': 0},
-                            'basic_utility': {'avg': 0, 'min': 0, 'max': 0, 'median': 0},
-                            'voice_notes_rate': {'avg': 0, 'min': 0, 'max': 0, 'median': 0}
-                        }
-                # Profile-based usage summary (by profile/email)
-                profile_usage = []
-                profiles = {}
-                for a in Analytics.query.all():
-                    email = getattr(a, 'user_email', None)
-                    name = a.user_name or ''
-                    key = email or name or 'Unknown'
-                    entry = profiles.setdefault(key, {
-                        'email': email,
-                        'name': name,
-                        'countries': set(),
-                        'regions': set(),
-                        'count': 0,
-                        'last_ts': None,
-                    })
-                    entry['count'] += 1
-                    if a.country:
-                        entry['countries'].add(a.country)
-                    if a.region:
-                        entry['regions'].add(a.region)
-                    if a.timestamp and (entry['last_ts'] is None or a.timestamp > entry['last_ts']):
-                        entry['last_ts'] = a.timestamp
-                for entry in profiles.values():
-                    profile_usage.append({
-                        'email': entry['email'],
-                        'name': entry['name'],
-                        'countries': ', '.join(sorted(entry['countries'])),
-                        'regions': ', '.join(sorted(entry['regions'])),
-                        'calculations': entry['count'],
-                        'last_seen': entry['last_ts'],
-                    })
-
-                # Account/domain-level usage (group by email domain)
-                account_usage = []
-                domains = {}
-                for a in Analytics.query.all():
-                    email = getattr(a, 'user_email', None)
-                    if not email or '@' not in email:
-                        continue
-                    domain = email.split('@', 1)[1].lower()
-                    entry = domains.setdefault(domain, {
-                        'count': 0,
-                        'countries': set(),
-                        'regions': set(),
-                    })
-                    entry['count'] += 1
-                    if a.country:
-                        entry['countries'].add(a.country)
-                    if a.region:
-                        entry['regions'].add(a.region)
-                for dom, entry in domains.items():
-                    account_usage.append({
-                        'domain': dom,
-                        'calculations': entry['count'],
-                        'countries': ', '.join(sorted(entry['countries'])),
-                        'regions': ', '.join(sorted(entry['regions'])),
-                    })
-                # Per-user stats for table
-                user_stats = {}
-                user_country_currency_list = db.session.query(Analytics.user_name, Analytics.country, Analytics.currency).distinct().all()
-                for user, country, currency in user_country_currency_list:
-                    user_entries = Analytics.query.filter_by(user_name=user, country=country, currency=currency).all()
-                    def get_user_stats(field):
-                        vals = [getattr(a, field) for a in user_entries if getattr(a, field) is not None]
-                        if vals:
-                            return {
-                                'avg': sum(vals)/len(vals),
-                                'min': min(vals),
-                                'max': max(vals),
-                                'median': sorted(vals)[len(vals)//2]
-                            }
-                        else:
-                            return {'avg': 0, 'min': 0, 'max': 0, 'median': 0}
-                    # Add one_time_dev_cost and per_manday_cost for user/country/currency
-                    rates = COUNTRY_MANDAY_RATES.get(country, COUNTRY_MANDAY_RATES['APAC'])
-                    if country == 'LATAM':
-                        if isinstance(rates['bot_ui'], dict):
-                            bot_ui_rate = rates['bot_ui'].get(country, list(rates['bot_ui'].values())[0])
-                        else:
-                            bot_ui_rate = rates['bot_ui']
-                        if isinstance(rates['custom_ai'], dict):
-                            custom_ai_rate = rates['custom_ai'].get(country, list(rates['custom_ai'].values())[0])
-                        else:
-                            custom_ai_rate = rates['custom_ai']
-                    else:
-                        bot_ui_rate = rates['bot_ui']
-                        custom_ai_rate = rates['custom_ai']
-                    per_manday_cost = (bot_ui_rate + custom_ai_rate) / 2
-                    dev_cost = bot_ui_rate + custom_ai_rate
-                    one_time_dev_cost_stats = {'avg': dev_cost, 'min': dev_cost, 'max': dev_cost, 'median': dev_cost}
-                    per_manday_cost_stats = {'avg': per_manday_cost, 'min': per_manday_cost, 'max': per_manday_cost, 'median': per_manday_cost}
-                    user_stats.setdefault(user, {})[(country, currency)] = {
-                        'platform_fee': get_user_stats('platform_fee'),
-                        'ai': get_user_stats('ai_price'),
-                        'advanced': get_user_stats('advanced_price'),
-                        'basic_marketing': get_user_stats('basic_marketing_price'),
-                        'basic_utility': get_user_stats('basic_utility_price'),
-                        'voice_notes_rate': get_user_stats('voice_notes_rate'),
-                        'committed_amount': get_user_stats('committed_amount'),
-                        'one_time_dev_cost': one_time_dev_cost_stats,
-                        'per_manday_cost': per_manday_cost_stats
-                    }
-                # Compute avg_price_data and avg_platform_fee_data for Chart.js graphs
-                avg_price_data = {}
-                avg_platform_fee_data = {}
-                for country in countries:
-                    country_analytics = Analytics.query.filter_by(country=country).all()
-                    avg_price_data[country] = {
-                        'ai': {
-                            'sum': sum(a.ai_price or 0 for a in country_analytics),
-                            'count': len([a for a in country_analytics if a.ai_price is not None])
-                        },
-                        'advanced': {
-                            'sum': sum(a.advanced_price or 0 for a in country_analytics),
-                            'count': len([a for a in country_analytics if a.advanced_price is not None])
-                        },
-                        'basic_marketing': {
-                            'sum': sum(a.basic_marketing_price or 0 for a in country_analytics),
-                            'count': len([a for a in country_analytics if a.basic_marketing_price is not None])
-                        },
-                        'basic_utility': {
-                            'sum': sum(a.basic_utility_price or 0 for a in country_analytics),
-                            'count': len([a for a in country_analytics if a.basic_utility_price is not None])
-                        }
-                    }
-                    avg_platform_fee_data[country] = {
-                        'sum': sum(a.platform_fee or 0 for a in country_analytics),
-                        'count': len([a for a in country_analytics if a.platform_fee is not None])
-                    }
-                # Top users by number of calculations (show all, not just top 5)
-                all_analytics = Analytics.query.all()
-                user_names = [row.user_name for row in all_analytics if row.user_name]
-                top_users = Counter(user_names).most_common()  # Remove the 5 limit
-                # --- AI model & complexity analytics ---
-                ai_models = [getattr(a, 'ai_agent_model', None) for a in all_analytics]
-                ai_models = [m for m in ai_models if m]
-                ai_model_counts = Counter(ai_models).most_common(10)
-                ai_complexities = [getattr(a, 'ai_agent_complexity', None) or 'regular' for a in all_analytics]
-                ai_complexities = [c for c in ai_complexities if c]
-                ai_complexity_counts = Counter(ai_complexities).most_common()
-                # Add calculation route counts
-                volumes_count = Analytics.query.filter_by(calculation_route='volumes').count()
-                bundle_count = Analytics.query.filter_by(calculation_route='bundle').count()
-                analytics = {
-                    'calculations': total_calculations,
-                    'volumes_count': volumes_count,
-                    'bundle_count': bundle_count,
-                    'calculations_by_day': calculations_by_day,
-                    'calculations_by_week': calculations_by_week,
-                    'country_counter': country_counter,
-                    'platform_fee_stats': {
-                        'avg': avg_platform_fee,
-                        'min': min_platform_fee,
-                        'max': max_platform_fee,
-                        'median': median_platform_fee
-                    },
-                    'platform_fee_options': platform_fee_options,
-                    'ai_stats': ai_stats,
-                    'advanced_stats': advanced_stats,
-                    'marketing_stats': marketing_stats,
-                    'utility_stats': utility_stats,
-                    'voice_notes_stats': voice_notes_stats,
-                    'voice_notes_usage': voice_notes_usage,
-                    'voice_notes_percentage': voice_notes_percentage,
-                    'message_volumes': message_volumes,
-                    'platform_fee_discount_triggered': platform_fee_discount_triggered,
-                    'margin_chosen': margin_chosen,
-                    'margin_rate_card': margin_rate_card,
-                    'stats': stats,
-                    'discount_warnings': {},
-                    'avg_price_data': avg_price_data,
-                    'avg_platform_fee_data': avg_platform_fee_data,
-                    'top_users': top_users,
-                    'user_stats': user_stats,
-                    'all_analytics': all_analytics,
-                    'ai_model_counts': ai_model_counts,
-                    'ai_complexity_counts': ai_complexity_counts,
-                    'stats_by_region': stats_by_region,
-                    'profile_usage': profile_usage,
-                    'account_usage': account_usage,
-                }
-                # --- Voice overview analytics ---
-                try:
-                    voice_q = Analytics.query.filter(Analytics.channel_type.in_(['voice_only','text_voice']))
-                    voice_count = voice_q.count()
-                    def _agg(col, func_name='avg'):
-                        fn = getattr(func, func_name)
-                        val = db.session.query(fn(col)).scalar()
-                        try:
-                            return float(val) if val is not None else 0.0
-                        except Exception:
-                            return 0.0
-                    voice_overview = {
-                        'calculations': voice_count,
-                        'avg_total_cost': _agg(Analytics.voice_total_cost, 'avg'),
-                        'avg_mandays': _agg(Analytics.voice_mandays, 'avg'),
-                        'avg_platform_fee': _agg(Analytics.voice_platform_fee, 'avg'),
-                        'avg_setup_fee': _agg(Analytics.whatsapp_setup_fee, 'avg'),
-                        'sum_wa_outbound_minutes': _agg(Analytics.whatsapp_voice_outbound_minutes, 'sum'),
-                        'sum_wa_inbound_minutes': _agg(Analytics.whatsapp_voice_inbound_minutes, 'sum'),
-                        'sum_pstn_inbound_minutes': _agg(Analytics.pstn_inbound_ai_minutes, 'sum'),
-                        'sum_pstn_outbound_minutes': _agg(Analytics.pstn_outbound_ai_minutes, 'sum'),
-                        'sum_pstn_manual_minutes': _agg(Analytics.pstn_manual_minutes, 'sum'),
-                        'channel_type_counts': {
-                            'voice_only': Analytics.query.filter_by(channel_type='voice_only').count(),
-                            'text_voice': Analytics.query.filter_by(channel_type='text_voice').count(),
-                        }
-                    }
-                    analytics['voice_overview'] = voice_overview
-                except Exception as _:
-                    analytics['voice_overview'] = None
-                # --- Advanced Analytics Calculations ---
-                # 1. Discount calculations (by type and platform fee)
-                def get_discount_stats(price_field, rate_card_field):
-                    discounts = []
-                    for a in Analytics.query.all():
-                        price = getattr(a, price_field, None)
-                        rate_card = getattr(a, rate_card_field, None)
-                        if price is not None and rate_card is not None and rate_card > 0:
-                            discount = (rate_card - price) / rate_card * 100
-                            discounts.append(discount)
-                    if discounts:
-                        avg = sum(discounts) / len(discounts)
-                        minv = min(discounts)
-                        maxv = max(discounts)
-                        median = sorted(discounts)[len(discounts)//2]
-                    else:
-                        avg = minv = maxv = median = 0
-                    # Distribution buckets (0-10%, 10-20%, ...)
-                    buckets = [0]*10
-                    for d in discounts:
-                        idx = min(max(int(d // 10), 0), 9)
-                        buckets[idx] += 1
-                    return {'avg': avg, 'min': minv, 'max': maxv, 'median': median, 'buckets': buckets, 'count': len(discounts)}
-
-                ai_discount = get_discount_stats('ai_price', 'ai_rate_card_price')
-                advanced_discount = get_discount_stats('advanced_price', 'advanced_rate_card_price')
-                marketing_discount = get_discount_stats('basic_marketing_price', 'basic_marketing_rate_card_price')
-                utility_discount = get_discount_stats('basic_utility_price', 'basic_utility_rate_card_price')
-                platform_fee_discount = get_discount_stats('platform_fee', 'platform_fee')  # always 0, but for completeness
-
-                # 2. Most common prices (mode)
-                def get_mode(field):
-                    vals = [getattr(a, field) for a in Analytics.query.all() if getattr(a, field) is not None]
-                    if vals:
-                        return Counter(vals).most_common(1)[0][0]
-                    return None
-                ai_mode = get_mode('ai_price')
-                advanced_mode = get_mode('advanced_price')
-                marketing_mode = get_mode('basic_marketing_price')
-                utility_mode = get_mode('basic_utility_price')
-                platform_fee_mode = get_mode('platform_fee')
-
-                # 3. Popular message types (by total volume)
-                def get_total_volume(field):
-                    return sum(getattr(a, field) or 0 for a in Analytics.query.all())
-                total_ai_vol = get_total_volume('ai_volume')
-                total_adv_vol = get_total_volume('advanced_volume')
-                total_marketing_vol = get_total_volume('basic_marketing_volume')
-                total_utility_vol = get_total_volume('basic_utility_volume')
-                popular_types = sorted([
-                    ('AI', total_ai_vol),
-                    ('Advanced', total_adv_vol),
-                    ('Marketing', total_marketing_vol),
-                    ('Utility', total_utility_vol)
-                ], key=lambda x: x[1], reverse=True)
-
-                # 4. Platform fee vs. deal size (correlation)
-                import math
-                fees = [a.platform_fee for a in Analytics.query.all() if a.platform_fee is not None]
-                deal_sizes = [
-                    (getattr(a, 'ai_volume') or 0) + (getattr(a, 'advanced_volume') or 0) +
-                    (getattr(a, 'basic_marketing_volume') or 0) + (getattr(a, 'basic_utility_volume') or 0)
-                    for a in Analytics.query.all()
-                ]
-                if fees and deal_sizes and len(fees) == len(deal_sizes):
-                    n = len(fees)
-                    mean_fee = sum(fees)/n
-                    mean_deal = sum(deal_sizes)/n
-                    cov = sum((fees[i]-mean_fee)*(deal_sizes[i]-mean_deal) for i in range(n)) / n
-                    std_fee = math.sqrt(sum((f-mean_fee)**2 for f in fees)/n)
-                    std_deal = math.sqrt(sum((d-mean_deal)**2 for d in deal_sizes)/n)
-                    correlation = cov / (std_fee*std_deal) if std_fee and std_deal else 0
-                else:
-                    correlation = 0
-
-                # 5. Seasonality (by month)
-                month_counts = defaultdict(int)
-                for a in Analytics.query.all():
-                    if a.timestamp:
-                        month = a.timestamp.strftime('%Y-%m')
-                        month_counts[month] += 1
-                seasonality = dict(sorted(month_counts.items()))
-
-                # Add to analytics dict
-                analytics.update({
-                    'discounts': {
-                        'ai': ai_discount,
-                        'advanced': advanced_discount,
-                        'marketing': marketing_discount,
-                        'utility': utility_discount,
-                        'platform_fee': platform_fee_discount
-                    },
-                    'modes': {
-                        'ai': ai_mode,
-                        'advanced': advanced_mode,
-                        'marketing': marketing_mode,
-                        'utility': utility_mode,
-                        'platform_fee': platform_fee_mode
-                    },
-                    'popular_types': popular_types,
-                    'platform_fee_vs_deal_correlation': correlation,
-                    'seasonality': seasonality
-                })
+                analytics = build_analytics_dashboard()
                 return render_template('analytics.html', authorized=True, analytics=analytics)
             else:
                 flash('Incorrect keyword.', 'error')
@@ -3975,7 +4246,11 @@ def reset_analytics():
     """
     Resets the analytics_data dictionary to its initial state.
     """
+    ANALYTICS_WRITER.flush()
     db.session.query(Analytics).delete()
+    db.session.query(UserCalculationCount).delete()
+    db.session.query(AnalyticsDailyRollup).delete()
+    db.session.query(AnalyticsRollupState).delete()
     db.session.commit()
     return 'Analytics reset successfully', 200
 
@@ -3988,14 +4263,7 @@ def readme():
 def get_default_manday_rates(inputs):
     country = (inputs.get('country') or 'India').strip() if inputs else 'India'
     dev_location = dev_location_for_manday_rates(country, inputs)
-    rates = COUNTRY_MANDAY_RATES.get(country, COUNTRY_MANDAY_RATES['APAC'])
-    if country == 'LATAM':
-        default_bot_ui = rates['bot_ui'][dev_location]
-        default_custom_ai = rates['custom_ai'][dev_location]
-    else:
-        default_bot_ui = rates['bot_ui']
-        default_custom_ai = rates['custom_ai']
-    return default_bot_ui, default_custom_ai
+    return get_rate_card().country(country).manday_rates(dev_location)
 
 # --- PATCH: Wrap all suggested_prices dicts before rendering 'prices' step ---
 def patch_suggested_prices(suggested_prices, inputs):
@@ -4013,6 +4281,50 @@ def analytics_v2():
     """
     return render_template('analyticsv2.html')
 
+# Per-section summary artifacts written by scripts/update_analytics_daily.py
+# (minified, gzipped, named by content hash; listed in manifest.json)
+ANALYTICS_SUMMARY_DIR = os.environ.get(
+    'ANALYTICS_SUMMARY_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'analytics_summary')
+)
+_summary_manifest = {'mtime': None, 'manifest': None}
+
+def _load_summary_manifest():
+    """manifest.json, re-read only when the daily script has replaced it."""
+    path = os.path.join(ANALYTICS_SUMMARY_DIR, 'manifest.json')
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if _summary_manifest['mtime'] != mtime:
+        with open(path, 'r', encoding='utf-8') as f:
+            _summary_manifest['manifest'] = json.load(f)
+        _summary_manifest['mtime'] = mtime
+    return _summary_manifest['manifest']
+
+@app.route('/analytics/summary/<section>.json', methods=['GET'])
+def analytics_summary_section(section):
+    """
+    One section of the analyticsv2 summary. Sent pre-gzipped when the client accepts
+    gzip; the ETag is the content hash, so unchanged sections revalidate with a 304.
+    """
+    manifest = _load_summary_manifest()
+    entry = (manifest or {}).get('sections', {}).get(section)
+    if entry is None:
+        return jsonify({'error': f"No analytics summary section '{section}'; run scripts/update_analytics_daily.py"}), 404
+    try:
+        with open(os.path.join(ANALYTICS_SUMMARY_DIR, entry['file']), 'rb') as f:
+            body = f.read()
+    except FileNotFoundError:
+        abort(404)
+    gzipped = request.accept_encodings['gzip'] > 0
+    response = Response(body if gzipped else gzip.decompress(body), mimetype='application/json')
+    if gzipped:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.set_etag(f"{entry['etag']}-gzip" if gzipped else entry['etag'])
+    return response.make_conditional(request)
+
 def calculate_pricing_simulation(inputs, pricing_inputs=None):
     """
     Returns a dict with detailed calculations for both volume and committed amount routes for the given user inputs.
@@ -4025,7 +4337,7 @@ def calculate_pricing_simulation(inputs, pricing_inputs=None):
         basic_utility_volume = float(inputs.get('basic_utility_volume', 0) or 0)
         platform_fee = float(inputs.get('platform_fee', 0) or 0)
         committed_amount = float(inputs.get('committed_amount', 0) or 0)
-        meta_costs = meta_costs_table.get(country, meta_costs_table['APAC'])
+        meta_costs = dict(get_rate_card().country(country).meta_costs)
     except Exception as e:
         _vprint(f"ERROR in calculate_pricing_simulation: {e}", file=sys.stderr, flush=True)
         # Return a minimal valid structure to ensure internal section shows
@@ -4091,17 +4403,8 @@ def calculate_pricing_simulation(inputs, pricing_inputs=None):
     # Use user's chosen rates (not bundle rates with meta costs) for fair comparison
     required_committed_amount = (ai_volume * ai_price) + (advanced_volume * adv_price) + (basic_marketing_volume * mkt_price) + (basic_utility_volume * utl_price)
     
-    # Find the nearest programmed bundle amount
-    slabs = committed_amount_slabs.get(country, committed_amount_slabs['APAC'])
-    
-    # Get all programmed bundle amounts (both lower and upper bounds of tiers)
-    programmed_bundles = []
-    for slab in slabs:
-        programmed_bundles.append(slab[0])  # Lower bound
-        programmed_bundles.append(slab[1])  # Upper bound
-    
-    # Remove duplicates and sort
-    programmed_bundles = sorted(list(set(programmed_bundles)))
+    # Programmed bundle amounts (both lower and upper bounds of tiers), precompiled per country
+    programmed_bundles = get_programmed_bundles(country)
     
     # Determine which amount to use for bundle calculations
     # If user chose a committed amount (bundle route), use that; otherwise use required amount
@@ -4114,11 +4417,7 @@ def calculate_pricing_simulation(inputs, pricing_inputs=None):
         nearest_lower = 0  # No bundle
         nearest_upper = programmed_bundles[1] if len(programmed_bundles) > 1 else programmed_bundles[0]  # First meaningful bundle
     else:
-        lower_bundles = [bundle for bundle in programmed_bundles if bundle <= bundle_calculation_amount]
-        upper_bundles = [bundle for bundle in programmed_bundles if bundle >= bundle_calculation_amount]
-        
-        nearest_lower = max(lower_bundles) if lower_bundles else programmed_bundles[0]
-        nearest_upper = min(upper_bundles) if upper_bundles else programmed_bundles[-1]
+        nearest_lower, nearest_upper = nearest_programmed_bundles(country, bundle_calculation_amount)
     
     # Choose the closer one as the recommended bundle
     distance_to_lower = abs(bundle_calculation_amount - nearest_lower)
@@ -4129,14 +4428,8 @@ def calculate_pricing_simulation(inputs, pricing_inputs=None):
     else:
         nearest_bundle = nearest_upper
     
-    lower_tier_rates = None
-    upper_tier_rates = None
-    
-    for slab in slabs:
-        if slab[0] <= nearest_lower < slab[1]:
-            lower_tier_rates = slab[2]
-        if slab[0] <= nearest_upper < slab[1]:
-            upper_tier_rates = slab[2]
+    lower_tier_rates = find_committed_slab_rates(country, nearest_lower)
+    upper_tier_rates = find_committed_slab_rates(country, nearest_upper)
     
     # If committed_amount is 0, use the nearest programmed bundle
     if committed_amount == 0:
@@ -4223,6 +4516,57 @@ def calculate_pricing_simulation(inputs, pricing_inputs=None):
             'meta_costs': {'ai': 0, 'advanced': 0, 'marketing': 0, 'utility': 0}
         }
 
+def cached_pricing_simulation(calculation_id, inputs, pricing_inputs=None):
+    """calculate_pricing_simulation through RESULT_CACHE (deep copy; safe to mutate)."""
+    return RESULT_CACHE.get_or_compute(
+        RESULT_CACHE.key(calculation_id, 'pricing_simulation', inputs, pricing_inputs),
+        result_cache_version(),
+        lambda: calculate_pricing_simulation(inputs, pricing_inputs),
+    )
+
+
+def _compute_results_page_context(inputs):
+    """
+    Manday rates, text dev cost and manday totals for a results-page re-render.
+    'manday_rates' is only present when costing succeeded (the caller then persists it).
+    """
+    context = {}
+    # Always recompute manday rates + text dev cost to avoid stale zeros
+    try:
+        country = (inputs.get('country') or 'India').strip()
+        dev_location = dev_location_for_manday_rates(country, inputs)
+        default_bot_ui, default_custom_ai = get_rate_card().country(country).manday_rates(dev_location)
+        manday_rates = {
+            'bot_ui': float(default_bot_ui),
+            'custom_ai': float(default_custom_ai),
+            'default_bot_ui': float(default_bot_ui),
+            'default_custom_ai': float(default_custom_ai),
+            'bot_ui_discount': 0.0,
+            'custom_ai_discount': 0.0,
+        }
+        total_dev_cost, dev_cost_currency, dev_cost_breakdown = calculate_total_manday_cost(inputs, manday_rates)
+        text_manday_breakdown = dev_cost_breakdown.get('mandays_breakdown', {})
+        context.update(
+            manday_rates=manday_rates,
+            dev_cost_breakdown=dev_cost_breakdown,
+            dev_cost_currency=dev_cost_currency,
+            text_manday_breakdown=text_manday_breakdown,
+            text_mandays=text_manday_breakdown.get('total', calculate_total_mandays(inputs)),
+        )
+    except Exception as e:
+        _vprint(f"Error calculating dev_cost_breakdown: {e}", file=sys.stderr, flush=True)
+        text_manday_breakdown = calculate_total_mandays_breakdown(inputs)
+        context.update(
+            dev_cost_breakdown={'total_cost': 0, 'ba_cost': 0, 'qa_cost': 0, 'pm_cost': 0, 'uplift_amount': 0},
+            dev_cost_currency='INR',
+            text_manday_breakdown=text_manday_breakdown,
+            text_mandays=text_manday_breakdown.get('total', 0),
+        )
+    # Text mandays (pre-voice merge) for display
+    context['total_mandays'] = calculate_total_mandays(inputs)
+    return context
+
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     logger.info(f"Starting Flask app on port {port}")
@@ -1,5 +1,6 @@
 from app import db, Analytics, app
-from calculator import calculate_total_mandays_breakdown, COUNTRY_MANDAY_RATES
+from calculator import calculate_total_mandays_breakdown
+from pricing_config import COUNTRY_MANDAY_RATES
 import sys
 
 # Helper to get default rates for a country
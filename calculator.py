@@ -10,16 +10,20 @@
 # Meta costs for each country and message type.
 
 from pricing_config import (
-    meta_costs_table,
-    COUNTRY_MANDAY_RATES,
     ACTIVITY_MANDAYS,
     committed_amount_slabs,
+    get_committed_slab_index,
+    find_committed_slab_rates,
+    nearest_programmed_bundles,
+    get_rate_card,
+    AI_AGENT_MODEL_LEGACY_ALIASES,
     VOICE_DEV_EFFORT,
     LEVERAGE_VOICE_DEV_COSTS_INR,
     LEVERAGE_VOICE_ADDITIONAL_LANGUAGE_COST_INR,
     LEVERAGE_VOICE_BUILD_MARGIN,
     get_whatsapp_voice_tier,
-    get_whatsapp_voice_rate,
+    resolve_wa_voice_market,
+    get_wa_voice_tier_index,
     get_pstn_rates,
     get_one_time_dev_profile,
     get_voice_one_time_dev_profile,
@@ -33,18 +37,20 @@ from pricing_config import (
     TEXT_ONE_TIME_DYNAMIC_FLOW_INCLUDED_SCREENS,
     TEXT_ONE_TIME_FLOW_EXTRA_SCREEN_HOURS,
 )
+import copy
 import os
 import sys
+from functools import lru_cache
+import numpy as np
 
 # New function to map volume to committed amount slab rate
 
 def get_committed_amount_rate_for_volume(country, msg_type, volume):
-    slabs = committed_amount_slabs.get(country, committed_amount_slabs['APAC'])
-    for lower, upper, rates in slabs:
-        if lower <= volume < upper:
-            return rates[msg_type]
-    # Fallback to highest slab if above all
-    return slabs[-1][2][msg_type]
+    rates = find_committed_slab_rates(country, volume)
+    if rates is None:
+        # Fallback to highest slab if above all
+        rates = get_committed_slab_index(country)['rates'][-1]
+    return rates[msg_type]
 
 # Update get_suggested_price to use committed amount slab rates for volume route
 
@@ -74,7 +80,7 @@ def calculate_pricing(
     Calculate all pricing, revenue, costs, and margin for the given inputs.
     Returns a dictionary with detailed line items and summary values.
     """
-    costs = meta_costs_table.get(country, meta_costs_table['APAC'])
+    costs = get_rate_card().country(country).meta_costs
 
     # Get suggested and overage prices for each type
     suggested_ai_price = get_suggested_price(country, 'ai', ai_volume)
@@ -207,6 +213,322 @@ def calculate_pricing(
         'suggested_margin': f"{suggested_margin_percentage:.3f}%"
     }
 
+# --- Batch (vectorized) pricing ---
+# Columnar counterpart of calculate_pricing for re-pricing many deals in one pass.
+
+_BATCH_MSG_TYPES = ('ai', 'advanced', 'basic_marketing', 'basic_utility')
+
+
+def _batch_suggested_rates(country, msg_type, volumes):
+    """
+    Vectorized get_committed_amount_rate_for_volume for one country:
+    lower <= volume < upper, else the highest slab.
+    """
+    entry = get_committed_slab_index(country)
+    lowers = np.array(entry['lowers'], dtype=float)
+    uppers = np.array(entry['uppers'], dtype=float)
+    rates = np.array([r[msg_type] for r in entry['rates']], dtype=float)
+    idx = np.searchsorted(lowers, volumes, side='right') - 1
+    safe_idx = np.clip(idx, 0, len(rates) - 1)
+    in_slab = (idx >= 0) & (volumes < uppers[safe_idx])
+    return np.where(in_slab, rates[safe_idx], rates[-1])
+
+
+def _batch_price_array(values, n):
+    """Chosen-price column as floats; None/NaN means 'use suggested'."""
+    if values is None:
+        return np.full(n, np.nan)
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'fiu':
+        return values.astype(float)
+    return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+
+def calculate_pricing_batch(
+    countries, ai_volumes, advanced_volumes, basic_marketing_volumes, basic_utility_volumes, platform_fees,
+    ai_prices=None, advanced_prices=None, basic_marketing_prices=None, basic_utility_prices=None
+):
+    """
+    Vectorized calculate_pricing over columnar inputs (one entry per deal).
+    Chosen prices may be None or contain None/NaN entries to fall back to the suggested price.
+    Returns a dict of NumPy arrays; margins are percentages (calculate_pricing formats
+    the same numbers as f"{x:.3f}%").
+    """
+    countries = np.asarray(countries, dtype=object)
+    n = len(countries)
+    volumes = {
+        'ai': np.asarray(ai_volumes, dtype=float),
+        'advanced': np.asarray(advanced_volumes, dtype=float),
+        'basic_marketing': np.asarray(basic_marketing_volumes, dtype=float),
+        'basic_utility': np.asarray(basic_utility_volumes, dtype=float),
+    }
+    platform_fees = np.broadcast_to(np.asarray(platform_fees, dtype=float), (n,))
+    chosen = {
+        'ai': _batch_price_array(ai_prices, n),
+        'advanced': _batch_price_array(advanced_prices, n),
+        'basic_marketing': _batch_price_array(basic_marketing_prices, n),
+        'basic_utility': _batch_price_array(basic_utility_prices, n),
+    }
+
+    # Meta costs and suggested (slab) prices, resolved once per distinct country
+    cost_ai = np.zeros(n)
+    cost_marketing = np.zeros(n)
+    cost_utility = np.zeros(n)
+    suggested = {t: np.zeros(n) for t in _BATCH_MSG_TYPES}
+    card = get_rate_card()
+    for country in set(countries.tolist()):
+        mask = countries == country
+        costs = card.country(country).meta_costs
+        cost_ai[mask] = costs['ai']
+        cost_marketing[mask] = costs['marketing']
+        cost_utility[mask] = costs['utility']
+        for msg_type in _BATCH_MSG_TYPES:
+            suggested[msg_type][mask] = _batch_suggested_rates(country, msg_type, volumes[msg_type][mask])
+
+    user = {t: np.where(np.isnan(chosen[t]), suggested[t], chosen[t]) for t in _BATCH_MSG_TYPES}
+
+    # Same operation order as calculate_pricing so results match bit-for-bit
+    revenue = (
+        (cost_ai + user['ai']) * volumes['ai']
+        + user['advanced'] * volumes['advanced']
+        + (cost_marketing + user['basic_marketing']) * volumes['basic_marketing']
+        + (cost_utility + user['basic_utility']) * volumes['basic_utility']
+        + 0
+    )
+    suggested_revenue = (
+        (cost_ai + suggested['ai']) * volumes['ai']
+        + suggested['advanced'] * volumes['advanced']
+        + (cost_marketing + suggested['basic_marketing']) * volumes['basic_marketing']
+        + (cost_utility + suggested['basic_utility']) * volumes['basic_utility']
+        + 0
+    )
+    channel_cost = (volumes['basic_marketing'] * cost_marketing) + (volumes['basic_utility'] * cost_utility)
+    ai_costs = cost_ai * volumes['ai']
+    total_costs = channel_cost + ai_costs
+
+    def _margin_pct(rev):
+        denom = rev + platform_fees
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pct = (rev + platform_fees - total_costs) / denom * 100
+        return np.where(denom > 0, pct, 0.0)
+
+    return {
+        'platform_fee': platform_fees.copy(),
+        'revenue': revenue + platform_fees,
+        'suggested_revenue': suggested_revenue + platform_fees,
+        'channel_cost': channel_cost,
+        'ai_costs': ai_costs,
+        'total_costs': total_costs,
+        'margin': _margin_pct(revenue),
+        'suggested_margin': _margin_pct(suggested_revenue),
+        'suggested_prices': suggested,
+        'chosen_prices': user,
+    }
+
+# --- AI model price table ---
+
+@lru_cache(maxsize=8)
+def _ai_price_arrays(card_version, pricing_key):
+    """Canonical (non-alias) models of a pricing group as parallel arrays from the rate card matrix."""
+    card = get_rate_card()
+    aliases = set(AI_AGENT_MODEL_LEGACY_ALIASES)
+    keys = [key for key in card.ai_price_matrix if key[0] == pricing_key and key[1] not in aliases]
+    return (
+        tuple(key[1] for key in keys),
+        tuple(key[2] for key in keys),
+        np.array([card.ai_price_matrix[key][0] for key in keys], dtype=float),
+        np.array([card.ai_price_matrix[key][1] for key in keys], dtype=float),
+    )
+
+
+def calculate_ai_price_table(country, tier_ai_markup):
+    """
+    compute_ai_price_components for every model and complexity of the country's pricing group,
+    compared against the tier markup in one vectorized pass.
+    Returns {model: {complexity: {'raw_cost', 'final_price', 'markup', 'used_model'}}}.
+    """
+    card = get_rate_card()
+    rates = card.country(country)
+    meta_ai_cost = float(rates.meta_costs.get('ai', 0.0) or 0.0)
+    tier_markup = float(tier_ai_markup or 0.0)
+    models, complexities, raw_costs, model_markups = _ai_price_arrays(card.version, rates.ai_pricing_key)
+
+    used_model = (raw_costs > 0) & (model_markups > tier_markup)
+    markups = np.where(used_model, model_markups, tier_markup)
+    final_prices = meta_ai_cost + markups
+
+    table = {}
+    for i, model in enumerate(models):
+        table.setdefault(model, {})[complexities[i]] = {
+            'raw_cost': float(raw_costs[i]),
+            'final_price': float(final_prices[i]),
+            'markup': float(markups[i]),
+            'used_model': bool(used_model[i]),
+        }
+    return table
+
+
+# --- What-if margin sweep ---
+
+_SWEEP_VOLUME_KEYS = {
+    'ai': 'ai_volume',
+    'advanced': 'advanced_volume',
+    'basic_marketing': 'basic_marketing_volume',
+    'basic_utility': 'basic_utility_volume',
+}
+_SWEEP_PRICE_KEYS = {
+    'ai': 'ai_price',
+    'advanced': 'advanced_price',
+    'basic_marketing': 'basic_marketing_price',
+    'basic_utility': 'basic_utility_price',
+}
+
+
+def calculate_margin_sweep(
+    country, base_inputs, msg_type, sweep_volumes, platform_fees,
+    sweep_prices=None, sweep_discounts=None
+):
+    """
+    Margin grid over sweep_volumes x prices x platform_fees for one message type,
+    evaluated in a single calculate_pricing_batch pass.
+
+    base_inputs: dict with the other volumes/prices (calculate_pricing keyword names);
+        missing prices fall back to the suggested slab price.
+    sweep_prices: absolute chosen markups for msg_type, or
+    sweep_discounts: fractions off the suggested markup at each volume (0.4 = 40% off).
+    Returns lists ready for JSON; 'margin' and 'revenue' are indexed
+    [volume][price][platform_fee] (the platform fee axis is dropped when only one fee is given).
+    """
+    if msg_type not in _SWEEP_VOLUME_KEYS:
+        raise ValueError(f"Unknown message type: {msg_type}")
+    if (sweep_prices is None) == (sweep_discounts is None):
+        raise ValueError("Provide exactly one of sweep_prices or sweep_discounts")
+    by_discount = sweep_discounts is not None
+    price_axis = np.asarray(sweep_discounts if by_discount else sweep_prices, dtype=float)
+    volume_axis = np.asarray(sweep_volumes, dtype=float)
+    fee_axis = np.atleast_1d(np.asarray(platform_fees, dtype=float))
+
+    vol_grid, price_grid, fee_grid = np.meshgrid(volume_axis, price_axis, fee_axis, indexing='ij')
+    shape = vol_grid.shape
+    n = vol_grid.size
+
+    columns = {}
+    for key, volume_key in _SWEEP_VOLUME_KEYS.items():
+        columns[volume_key] = (
+            vol_grid.ravel() if key == msg_type
+            else np.full(n, float(base_inputs.get(volume_key, 0) or 0))
+        )
+    prices = {}
+    for key, price_key in _SWEEP_PRICE_KEYS.items():
+        base_price = base_inputs.get(price_key)
+        prices[price_key] = np.full(n, np.nan if base_price is None else float(base_price))
+    if by_discount:
+        suggested = _batch_suggested_rates(country, msg_type, vol_grid.ravel())
+        prices[_SWEEP_PRICE_KEYS[msg_type]] = suggested * (1 - price_grid.ravel())
+    else:
+        prices[_SWEEP_PRICE_KEYS[msg_type]] = price_grid.ravel()
+
+    result = calculate_pricing_batch(
+        [country] * n,
+        columns['ai_volume'], columns['advanced_volume'],
+        columns['basic_marketing_volume'], columns['basic_utility_volume'],
+        fee_grid.ravel(),
+        ai_prices=prices['ai_price'], advanced_prices=prices['advanced_price'],
+        basic_marketing_prices=prices['basic_marketing_price'],
+        basic_utility_prices=prices['basic_utility_price'],
+    )
+    margin = result['margin'].reshape(shape)
+    revenue = result['revenue'].reshape(shape)
+    if len(fee_axis) == 1:
+        margin = margin[:, :, 0]
+        revenue = revenue[:, :, 0]
+    return {
+        'country': country,
+        'msg_type': msg_type,
+        'volumes': volume_axis.tolist(),
+        'prices': price_axis.tolist(),
+        'price_axis': 'discount' if by_discount else 'price',
+        'platform_fees': fee_axis.tolist(),
+        'margin': np.round(margin, 3).tolist(),
+        'revenue': revenue.tolist(),
+    }
+
+# --- Target-margin price solver ---
+
+def solve_prices_for_target_margin(
+    country, ai_volume, advanced_volume, basic_marketing_volume, basic_utility_volume, platform_fee,
+    target_margin_pct, ai_price=None, advanced_price=None, basic_marketing_price=None, basic_utility_price=None
+):
+    """
+    Closed-form inverse of the calculate_pricing margin formula
+    (revenue + platform_fee - total_costs) / (revenue + platform_fee).
+    Solves for the revenue that hits target_margin_pct (e.g. 30 for 30%) and returns:
+      - uniform_discount: largest fraction all markups can be cut by together
+        (negative means markups must rise by that fraction to reach the target),
+      - uniform_prices: the markups after that discount,
+      - line_floor_prices: lowest markup per line with the other lines unchanged
+        (None when the line has no volume).
+    Missing prices fall back to the suggested slab price, as in calculate_pricing.
+    """
+    target = float(target_margin_pct) / 100
+    if target >= 1:
+        raise ValueError("Target margin must be below 100%")
+    costs = get_rate_card().country(country).meta_costs
+    volumes = {
+        'ai': ai_volume,
+        'advanced': advanced_volume,
+        'basic_marketing': basic_marketing_volume,
+        'basic_utility': basic_utility_volume,
+    }
+    chosen = {
+        'ai': ai_price,
+        'advanced': advanced_price,
+        'basic_marketing': basic_marketing_price,
+        'basic_utility': basic_utility_price,
+    }
+    # Meta cost passed through in the per-message final price (advanced is markup-only)
+    meta = {'ai': costs['ai'], 'advanced': 0, 'basic_marketing': costs['marketing'], 'basic_utility': costs['utility']}
+    prices = {
+        t: chosen[t] if chosen[t] is not None else get_suggested_price(country, t, volumes[t])
+        for t in volumes
+    }
+
+    pass_through = sum(meta[t] * volumes[t] for t in volumes)
+    markup_revenue = sum(prices[t] * volumes[t] for t in volumes)
+    revenue = pass_through + markup_revenue
+    total_costs = (basic_marketing_volume * costs['marketing']) + (basic_utility_volume * costs['utility']) + costs['ai'] * ai_volume
+
+    denom = revenue + platform_fee
+    current_margin = (denom - total_costs) / denom * 100 if denom > 0 else 0
+    # revenue + platform_fee needed so that margin == target
+    required_total = total_costs / (1 - target)
+    required_markup_revenue = required_total - platform_fee - pass_through
+
+    if markup_revenue > 0:
+        uniform_discount = min(1.0, 1 - required_markup_revenue / markup_revenue)
+    else:
+        uniform_discount = 1.0 if required_markup_revenue <= 0 else None
+    uniform_prices = (
+        {t: prices[t] * (1 - uniform_discount) for t in prices} if uniform_discount is not None else None
+    )
+
+    line_floor_prices = {}
+    for t in volumes:
+        if not volumes[t]:
+            line_floor_prices[t] = None
+            continue
+        other_markup = markup_revenue - prices[t] * volumes[t]
+        line_floor_prices[t] = max(0.0, (required_markup_revenue - other_markup) / volumes[t])
+
+    return {
+        'target_margin': float(target_margin_pct),
+        'current_margin': current_margin,
+        'required_revenue': required_total,
+        'prices': prices,
+        'uniform_discount': uniform_discount,
+        'uniform_prices': uniform_prices,
+        'line_floor_prices': line_floor_prices,
+    }
+
 def _calculate_set_mandays(num_apis, num_journeys):
     """
     Helper for set logic: For each set where either APIs or journeys is at least 4 and the other is > 0, count 5 mandays and subtract up to 4 from each. Returns (mandays, remaining_apis, remaining_journeys).
@@ -311,7 +633,7 @@ def _scale_up_block_days(value, included, rule, label):
     }
 
 
-def _compute_text_implementation_mandays(inputs):
+def _build_text_implementation_mandays(inputs):
     if not channel_includes_text_dev(inputs):
         return {
             "bot_ui": 0.0,
@@ -441,6 +763,82 @@ def _compute_text_implementation_mandays(inputs):
     }
 
 
+# --- Manday breakdown memoization ---
+# One results render computes the same text/voice breakdown several times
+# (cost, totals, breakdown, SOW). The builders only read the keys below, so a
+# fingerprint of those values fully determines the result. Missing keys and
+# None are treated the same by the builders, so both fingerprint as None.
+
+MANDAY_CACHE_SIZE = 512
+
+TEXT_EFFORT_INPUT_KEYS = (
+    'channel_type',
+    'one_time_dev_profile',
+    'num_journeys_price',
+    'num_apis_price',
+    'num_logical_steps_price',
+    'wa_static_flows',
+    'wa_dynamic_flows',
+    'num_wa_static_screens',
+    'num_wa_dynamic_screens',
+    'num_wa_screens_price',
+    'num_additional_text_languages',
+)
+
+VOICE_EFFORT_INPUT_KEYS = (
+    'channel_type',
+    'country',
+    'voice_partner',
+    'voice_one_time_dev_profile',
+    'num_voice_apis',
+    'num_additional_voice_languages',
+    'voice_chat_ai_handover',
+    'agent_handover_pstn',
+    'whatsapp_voice_platform',
+)
+
+
+def _effort_fingerprint(inputs, keys):
+    """Hashable (key, value) tuple of the effort-relevant inputs, or None if a value is unhashable."""
+    fingerprint = tuple((key, inputs.get(key)) for key in keys)
+    try:
+        hash(fingerprint)
+    except TypeError:
+        return None
+    return fingerprint
+
+
+@lru_cache(maxsize=MANDAY_CACHE_SIZE)
+def _cached_text_implementation_mandays(fingerprint):
+    return _build_text_implementation_mandays(dict(fingerprint))
+
+
+@lru_cache(maxsize=MANDAY_CACHE_SIZE)
+def _cached_voice_implementation_mandays(fingerprint):
+    return _build_voice_implementation_mandays(dict(fingerprint))
+
+
+def _compute_text_implementation_mandays(inputs):
+    fingerprint = _effort_fingerprint(inputs, TEXT_EFFORT_INPUT_KEYS)
+    if fingerprint is None:
+        return _build_text_implementation_mandays(inputs)
+    # Callers may mutate effort_lines; hand out a copy of the cached result
+    return copy.deepcopy(_cached_text_implementation_mandays(fingerprint))
+
+
+def _compute_voice_implementation_mandays(inputs):
+    fingerprint = _effort_fingerprint(inputs, VOICE_EFFORT_INPUT_KEYS)
+    if fingerprint is None:
+        return _build_voice_implementation_mandays(inputs)
+    return copy.deepcopy(_cached_voice_implementation_mandays(fingerprint))
+
+
+def clear_manday_caches():
+    """Drop memoized breakdowns (e.g. after editing effort profiles at runtime)."""
+    _cached_text_implementation_mandays.cache_clear()
+    _cached_voice_implementation_mandays.cache_clear()
+
+
 # --- refactored calculate_total_mandays ---
 def calculate_total_mandays(inputs):
     """Calculate total mandays for text one-time development."""
@@ -494,31 +892,19 @@ def calculate_total_manday_cost(inputs, manday_rates=None):
     """
     country = inputs.get('country', 'India').strip()
     dev_location = (inputs.get('dev_location') or 'India').strip()
-    rates = COUNTRY_MANDAY_RATES.get(country, COUNTRY_MANDAY_RATES['APAC'])
-    # India/APAC/etc. use flat rates; LATAM selects delivery location keys on the rate dict.
-    if country == 'India':
-        bot_ui_rate = rates['bot_ui'][dev_location] if isinstance(rates['bot_ui'], dict) else rates['bot_ui']
-        custom_ai_rate = rates['custom_ai'][dev_location] if isinstance(rates['custom_ai'], dict) else rates['custom_ai']
-        currency = rates['currency']
-    else:
-        bot_ui_rate = rates['bot_ui']
-        custom_ai_rate = rates['custom_ai']
-        currency = rates['currency']
+    rates = get_rate_card().country(country)
+    # India/APAC/etc. use flat rates; LATAM selects delivery location keys (resolved in the rate card).
+    currency = rates.currency
     if os.environ.get('RAILWAY_ENVIRONMENT') != 'production' or os.environ.get('APP_VERBOSE', '').lower() in ('1', 'true', 'yes'):
         print(f"DEBUG: [calculator.py] dev_cost_currency = {currency}, country = '{country}', dev_location = '{dev_location}'", file=sys.stderr, flush=True)
     breakdown = calculate_total_mandays_breakdown(inputs)
+    default_bot_ui_rate, default_custom_ai_rate = rates.manday_rates(dev_location)
     if manday_rates:
-        user_bot_ui_rate = manday_rates.get('bot_ui', rates['bot_ui'][dev_location] if country == 'LATAM' else rates['bot_ui'])
-        user_custom_ai_rate = manday_rates.get('custom_ai', rates['custom_ai'][dev_location] if country == 'LATAM' else rates['custom_ai'])
+        user_bot_ui_rate = manday_rates.get('bot_ui', default_bot_ui_rate)
+        user_custom_ai_rate = manday_rates.get('custom_ai', default_custom_ai_rate)
     else:
-        if country == 'LATAM':
-            user_bot_ui_rate = rates['bot_ui'][dev_location]
-            user_custom_ai_rate = rates['custom_ai'][dev_location]
-        else:
-            user_bot_ui_rate = rates['bot_ui']
-            user_custom_ai_rate = rates['custom_ai']
-    default_bot_ui_rate = rates['bot_ui'][dev_location] if country == 'LATAM' else rates['bot_ui']
-    default_custom_ai_rate = rates['custom_ai'][dev_location] if country == 'LATAM' else rates['custom_ai']
+        user_bot_ui_rate = default_bot_ui_rate
+        user_custom_ai_rate = default_custom_ai_rate
     # currency = rates['currency']  # This will be 'USD' for Rest of the World
 
     activity_mandays = {
@@ -574,11 +960,10 @@ def get_committed_amount_rates(country, committed_amount):
     committed_amount: float (in INR or USD as per country)
     Returns: dict with keys 'marketing', 'utility', 'advanced', 'ai'
     """
-    slabs = committed_amount_slabs.get(country, committed_amount_slabs['APAC'])
-    for lower, upper, rates in slabs:
-        if lower <= committed_amount < upper:
-            return rates
-    return slabs[0][2]  # fallback to first slab
+    rates = find_committed_slab_rates(country, committed_amount)
+    if rates is None:
+        rates = get_committed_slab_index(country)['rates'][0]  # fallback to first slab
+    return rates
 
 # =============================================================================
 # Voice Channel Helpers
@@ -609,7 +994,7 @@ def _voice_platform_integration_mandays(inputs):
     return extra, lines
 
 
-def _compute_voice_implementation_mandays(inputs):
+def _build_voice_implementation_mandays(inputs):
     """Profile-based voice one-time effort (GTM voice sheet). Leverage uses partner pricing separately."""
     if not channel_includes_voice_dev(inputs):
         return {"total": 0.0, "effort_lines": [], "implementation_profile_id": ""}
@@ -709,6 +1094,28 @@ def _parse_float(val):
     except Exception:
         return 0.0
 
+VOICE_RATE_OVERRIDE_KEYS = (
+    'vr_pstn_in_bundled',
+    'vr_pstn_in_overage',
+    'vr_pstn_out_bundled',
+    'vr_pstn_out_overage',
+    'vr_pstn_manual_bundled',
+    'vr_pstn_manual_overage',
+    'vr_wa_out_per_min',
+    'vr_wa_in_per_min',
+)
+
+
+def _voice_rate_overrides(inputs):
+    """User override rates from the prices step; 0 (not set / invalid) means use the configured rate."""
+    overrides = {}
+    for key in VOICE_RATE_OVERRIDE_KEYS:
+        try:
+            overrides[key] = float(inputs.get(key, 0) or 0)
+        except Exception:
+            overrides[key] = 0
+    return overrides
+
 def calculate_voice_calling_costs(inputs, country='India'):
     """
     Calculate PSTN and WhatsApp voice calling costs as per configured rates.
@@ -723,38 +1130,15 @@ def calculate_voice_calling_costs(inputs, country='India'):
         'total': 0.0,
     }
     # Optional user override rates for PSTN/WhatsApp
-    try:
-        pstn_in_bundled_rate = float(inputs.get('vr_pstn_in_bundled', 0) or 0)
-    except Exception:
-        pstn_in_bundled_rate = 0
-    try:
-        pstn_in_overage_rate = float(inputs.get('vr_pstn_in_overage', 0) or 0)
-    except Exception:
-        pstn_in_overage_rate = 0
-    try:
-        pstn_out_bundled_rate = float(inputs.get('vr_pstn_out_bundled', 0) or 0)
-    except Exception:
-        pstn_out_bundled_rate = 0
-    try:
-        pstn_out_overage_rate = float(inputs.get('vr_pstn_out_overage', 0) or 0)
-    except Exception:
-        pstn_out_overage_rate = 0
-    try:
-        pstn_manual_bundled_rate = float(inputs.get('vr_pstn_manual_bundled', 0) or 0)
-    except Exception:
-        pstn_manual_bundled_rate = 0
-    try:
-        pstn_manual_overage_rate = float(inputs.get('vr_pstn_manual_overage', 0) or 0)
-    except Exception:
-        pstn_manual_overage_rate = 0
-    try:
-        wa_out_rate_override = float(inputs.get('vr_wa_out_per_min', 0) or 0)
-    except Exception:
-        wa_out_rate_override = 0
-    try:
-        wa_in_rate_override = float(inputs.get('vr_wa_in_per_min', 0) or 0)
-    except Exception:
-        wa_in_rate_override = 0
+    overrides = _voice_rate_overrides(inputs)
+    pstn_in_bundled_rate = overrides['vr_pstn_in_bundled']
+    pstn_in_overage_rate = overrides['vr_pstn_in_overage']
+    pstn_out_bundled_rate = overrides['vr_pstn_out_bundled']
+    pstn_out_overage_rate = overrides['vr_pstn_out_overage']
+    pstn_manual_bundled_rate = overrides['vr_pstn_manual_bundled']
+    pstn_manual_overage_rate = overrides['vr_pstn_manual_overage']
+    wa_out_rate_override = overrides['vr_wa_out_per_min']
+    wa_in_rate_override = overrides['vr_wa_in_per_min']
 
     # PSTN bundled vs overage (Knowlarity)
     pstn_rates = get_pstn_rates(country, inputs.get('region'))
@@ -797,15 +1181,15 @@ def calculate_voice_calling_costs(inputs, country='India'):
     region = inputs.get('region')
     wa_voice_ai_enabled = inputs.get('voice_ai_enabled', 'No') == 'Yes'
     wa_ai_addon = 0.0
-    if total_wa_min > 0:
-        tier = get_whatsapp_voice_tier(country, total_wa_min, region=region)
-        if wa_voice_ai_enabled:
-            wa_ai_addon = float(tier.get('voice_ai_addon_per_min') or 0)
+    # One tier lookup serves the AI add-on and both per-minute rates
+    wa_tier = get_whatsapp_voice_tier(country, total_wa_min, region=region)
+    if total_wa_min > 0 and wa_voice_ai_enabled:
+        wa_ai_addon = float(wa_tier.get('voice_ai_addon_per_min') or 0)
     if wa_out_min > 0:
-        outbound_rate = wa_out_rate_override or (get_whatsapp_voice_rate(country, total_wa_min, 'outbound', region=region) + wa_ai_addon)
+        outbound_rate = wa_out_rate_override or (wa_tier['outbound'] + wa_ai_addon)
         costs['whatsapp_voice_outbound'] = wa_out_min * outbound_rate
     if wa_in_min > 0:
-        inbound_rate = wa_in_rate_override or (get_whatsapp_voice_rate(country, total_wa_min, 'inbound', region=region) + wa_ai_addon)
+        inbound_rate = wa_in_rate_override or (wa_tier['inbound'] + wa_ai_addon)
         costs['whatsapp_voice_inbound'] = wa_in_min * inbound_rate
     costs['total'] = (
         costs['pstn_inbound_ai']
@@ -816,6 +1200,119 @@ def calculate_voice_calling_costs(inputs, country='India'):
     )
     return costs
 
+# --- Batch (vectorized) voice calling costs ---
+
+VOICE_MINUTE_COLUMNS = (
+    'pstn_inbound_ai_minutes',
+    'pstn_inbound_committed',
+    'pstn_outbound_ai_minutes',
+    'pstn_outbound_committed',
+    'pstn_manual_minutes',
+    'pstn_manual_committed',
+    'whatsapp_voice_outbound_minutes',
+    'whatsapp_voice_inbound_minutes',
+)
+
+
+@lru_cache(maxsize=64)
+def _wa_voice_tier_arrays(market):
+    """Tier columns for one WhatsApp voice market (sorted, from the tier index)."""
+    entry = get_wa_voice_tier_index(market)
+    tiers = entry['tiers']
+    return {
+        'min_minutes': np.array(entry['min_minutes'], dtype=float),
+        'outbound': np.array([t['outbound'] for t in tiers], dtype=float),
+        'inbound': np.array([t['inbound'] for t in tiers], dtype=float),
+        'voice_ai_addon_per_min': np.array([float(t.get('voice_ai_addon_per_min') or 0) for t in tiers]),
+    }
+
+
+def _batch_wa_voice_tier_index(tiers, minutes):
+    """Vectorized get_whatsapp_voice_tier: row index of the tier whose range starts at or below minutes."""
+    idx = np.searchsorted(tiers['min_minutes'], minutes, side='right') - 1
+    return np.maximum(idx, 0)
+
+
+def calculate_voice_calling_costs_batch(columns, inputs=None, country='India'):
+    """
+    Vectorized calculate_voice_calling_costs over many minute-mix scenarios for one customer.
+    columns: dict of equal-length arrays keyed by VOICE_MINUTE_COLUMNS (missing columns are 0).
+    inputs: settings shared by every row (region, voice_ai_enabled, vr_* override rates).
+    Returns a dict of arrays with the same keys as the scalar function.
+    """
+    inputs = inputs or {}
+    lengths = {len(np.atleast_1d(columns[key])) for key in VOICE_MINUTE_COLUMNS if key in columns}
+    if len(lengths) > 1:
+        raise ValueError("All minute columns must have the same length")
+    n = lengths.pop() if lengths else 0
+    cols = {
+        key: np.asarray(columns[key], dtype=float) if key in columns else np.zeros(n)
+        for key in VOICE_MINUTE_COLUMNS
+    }
+    overrides = _voice_rate_overrides(inputs)
+    region = inputs.get('region')
+    ai_enabled = inputs.get('voice_ai_enabled', 'No') == 'Yes'
+    tiers = _wa_voice_tier_arrays(resolve_wa_voice_market(country, region))
+
+    def _pstn_line(minutes, committed, base_rate, addon, bundled_override, overage_override):
+        bundled = np.minimum(minutes, committed)
+        overage = np.maximum(0.0, minutes - committed)
+        bundled_rate = bundled_override or (base_rate + addon)
+        overage_rate = overage_override or (base_rate + addon)
+        return np.where(minutes > 0, bundled * bundled_rate + overage * overage_rate, 0.0)
+
+    # PSTN bundled vs overage (Knowlarity); AI add-on from the WA tier on total PSTN minutes
+    pstn_rates = get_pstn_rates(country, region)
+    inbound_min = cols['pstn_inbound_ai_minutes']
+    outbound_min = cols['pstn_outbound_ai_minutes']
+    manual_min = cols['pstn_manual_minutes']
+    total_pstn_min = inbound_min + outbound_min + manual_min
+    pstn_ai_addon = np.zeros(n)
+    if pstn_rates and ai_enabled:
+        addon = tiers['voice_ai_addon_per_min'][_batch_wa_voice_tier_index(tiers, total_pstn_min)]
+        pstn_ai_addon = np.where(total_pstn_min > 0, addon, 0.0)
+    pstn_base = pstn_rates or {'inbound': 0.0, 'outbound': 0.0, 'manual_c2c': 0.0}
+    pstn_inbound_ai = _pstn_line(
+        inbound_min, cols['pstn_inbound_committed'], pstn_base['inbound'], pstn_ai_addon,
+        overrides['vr_pstn_in_bundled'], overrides['vr_pstn_in_overage'],
+    )
+    pstn_outbound_ai = _pstn_line(
+        outbound_min, cols['pstn_outbound_committed'], pstn_base['outbound'], pstn_ai_addon,
+        overrides['vr_pstn_out_bundled'], overrides['vr_pstn_out_overage'],
+    )
+    pstn_manual_c2c = _pstn_line(
+        manual_min, cols['pstn_manual_committed'], pstn_base['manual_c2c'], pstn_ai_addon,
+        overrides['vr_pstn_manual_bundled'], overrides['vr_pstn_manual_overage'],
+    )
+
+    # WhatsApp Voice: one tier per row on total WA minutes
+    wa_out_min = cols['whatsapp_voice_outbound_minutes']
+    wa_in_min = cols['whatsapp_voice_inbound_minutes']
+    total_wa_min = wa_out_min + wa_in_min
+    wa_idx = _batch_wa_voice_tier_index(tiers, total_wa_min)
+    wa_ai_addon = np.zeros(n)
+    if ai_enabled:
+        wa_ai_addon = np.where(total_wa_min > 0, tiers['voice_ai_addon_per_min'][wa_idx], 0.0)
+    outbound_rate = overrides['vr_wa_out_per_min'] or (tiers['outbound'][wa_idx] + wa_ai_addon)
+    inbound_rate = overrides['vr_wa_in_per_min'] or (tiers['inbound'][wa_idx] + wa_ai_addon)
+    whatsapp_voice_outbound = np.where(wa_out_min > 0, wa_out_min * outbound_rate, 0.0)
+    whatsapp_voice_inbound = np.where(wa_in_min > 0, wa_in_min * inbound_rate, 0.0)
+
+    return {
+        'pstn_inbound_ai': pstn_inbound_ai,
+        'pstn_outbound_ai': pstn_outbound_ai,
+        'pstn_manual_c2c': pstn_manual_c2c,
+        'whatsapp_voice_outbound': whatsapp_voice_outbound,
+        'whatsapp_voice_inbound': whatsapp_voice_inbound,
+        'total': (
+            pstn_inbound_ai
+            + pstn_outbound_ai
+            + pstn_manual_c2c
+            + whatsapp_voice_outbound
+            + whatsapp_voice_inbound
+        ),
+    }
+
 def calculate_voice_pricing(inputs, country='India'):
     """
     High-level aggregator for voice pricing: development, platform, calling.
@@ -864,13 +1361,8 @@ def calculate_voice_pricing(inputs, country='India'):
     voice_breakdown = calculate_voice_dev_mandays_breakdown(inputs)
     voice_mandays = float(voice_breakdown.get('total', 0) or 0)
     # Use custom_ai rate for voice work when available, else bot_ui
-    rates = COUNTRY_MANDAY_RATES.get(country, COUNTRY_MANDAY_RATES['APAC'])
-    if isinstance(rates.get('custom_ai'), dict):
-        # Country like LATAM has per dev_location dict; default to country key or any
-        dev_location = (inputs.get('dev_location') or 'India').strip()
-        custom_ai_rate = rates['custom_ai'].get(dev_location, list(rates['custom_ai'].values())[0])
-    else:
-        custom_ai_rate = rates.get('custom_ai', rates.get('bot_ui', 0))
+    dev_location = (inputs.get('dev_location') or 'India').strip()
+    _, custom_ai_rate = get_rate_card().country(country).manday_rates(dev_location)
     voice_dev_cost = voice_mandays * float(custom_ai_rate or 0)
     total_voice_cost = voice_dev_cost + voice_platform_fee + calling_costs['total']
     return {
@@ -883,3 +1375,115 @@ def calculate_voice_pricing(inputs, country='India'):
         'voice_effort_lines': voice_breakdown.get('effort_lines', []),
         'voice_implementation_profile_id': voice_breakdown.get('implementation_profile_id', ''),
     }
+
+
+# --- Volume uncertainty (Monte Carlo) ---
+
+SIMULATION_DEFAULT_DRAWS = 100000
+SIMULATION_PERCENTILES = (10, 50, 90)
+# Only forecast minutes are uncertain; *_committed minutes are contracted deal terms and pass through as-is
+SIMULATED_VOICE_MINUTE_KEYS = tuple(key for key in VOICE_MINUTE_COLUMNS if key.endswith('_minutes'))
+
+
+def _sample_volumes(rng, base, spec, n):
+    """
+    n draws around a base volume.
+    spec: {'type': 'uniform', 'spread': 0.2} for base * U(1 - 0.2, 1 + 0.2), or
+          {'type': 'lognormal', 'sigma': 0.3} for a mean-preserving lognormal around base.
+    """
+    base = float(base or 0)
+    kind = (spec or {}).get('type', 'uniform')
+    if base <= 0:
+        return np.zeros(n)
+    if kind == 'uniform':
+        spread = float(spec.get('spread', 0.0))
+        return base * rng.uniform(1 - spread, 1 + spread, n).clip(min=0)
+    if kind == 'lognormal':
+        sigma = float(spec.get('sigma', 0.0))
+        return base * rng.lognormal(-0.5 * sigma * sigma, sigma, n)
+    raise ValueError(f"Unknown distribution type: {kind}")
+
+
+def _percentiles(values):
+    points = np.percentile(values, SIMULATION_PERCENTILES)
+    return {f"p{p}": float(v) for p, v in zip(SIMULATION_PERCENTILES, points)}
+
+
+def simulate_volume_uncertainty(
+    country, volumes, platform_fee, distribution, prices=None, committed_amount=0,
+    voice_inputs=None, draws=SIMULATION_DEFAULT_DRAWS, seed=None
+):
+    """
+    Monte Carlo view of calculate_pricing (and voice calling costs) when forecast volumes are uncertain.
+
+    volumes: {'ai_volume', 'advanced_volume', 'basic_marketing_volume', 'basic_utility_volume'}.
+    distribution: default spec for every volume (see _sample_volumes); per-key specs may be
+        given under distribution['per_key'][<volume or minute key>].
+    prices: chosen markups keyed like calculate_pricing (missing -> suggested slab price).
+    committed_amount: bundle to measure overage against; 0 picks the nearest programmed bundle
+        for the expected usage, as calculate_pricing_simulation does.
+    voice_inputs: calculate_voice_calling_costs inputs; its SIMULATED_VOICE_MINUTE_KEYS are sampled too,
+        committed minutes stay fixed.
+    Returns P10/P50/P90 for revenue, margin (percent) and bundle overage.
+    """
+    rng = np.random.default_rng(seed)
+    prices = prices or {}
+    per_key = (distribution or {}).get('per_key') or {}
+
+    def _spec(key):
+        return per_key.get(key, distribution)
+
+    sampled = {
+        key: _sample_volumes(rng, volumes.get(key), _spec(key), draws)
+        for key in _SWEEP_VOLUME_KEYS.values()
+    }
+    price_columns = {
+        price_key: None if prices.get(price_key) is None else np.full(draws, float(prices[price_key]))
+        for price_key in _SWEEP_PRICE_KEYS.values()
+    }
+    result = calculate_pricing_batch(
+        np.full(draws, country, dtype=object),
+        sampled['ai_volume'], sampled['advanced_volume'],
+        sampled['basic_marketing_volume'], sampled['basic_utility_volume'],
+        float(platform_fee or 0),
+        ai_prices=price_columns['ai_price'], advanced_prices=price_columns['advanced_price'],
+        basic_marketing_prices=price_columns['basic_marketing_price'],
+        basic_utility_prices=price_columns['basic_utility_price'],
+    )
+
+    # Bundle route: usage valued at chosen markups vs the committed amount
+    markups = result['chosen_prices']
+    usage = sum(markups[msg_type] * sampled[volume_key] for msg_type, volume_key in _SWEEP_VOLUME_KEYS.items())
+    if not committed_amount:
+        expected_usage = float(np.mean(usage))
+        nearest_lower, nearest_upper = nearest_programmed_bundles(country, expected_usage)
+        committed_amount = (
+            nearest_lower if abs(expected_usage - nearest_lower) <= abs(expected_usage - nearest_upper)
+            else nearest_upper
+        )
+    overage = np.maximum(0.0, usage - float(committed_amount))
+
+    revenue = result['revenue']
+    summary = {
+        'draws': draws,
+        'committed_amount': float(committed_amount),
+        'revenue': _percentiles(revenue),
+        'margin': _percentiles(result['margin']),
+        'bundle_overage': _percentiles(overage),
+        'overage_probability': float(np.mean(overage > 0)),
+    }
+
+    if voice_inputs:
+        minute_columns = {
+            key: (
+                _sample_volumes(rng, _parse_float(voice_inputs.get(key, 0)), _spec(key), draws)
+                if key in SIMULATED_VOICE_MINUTE_KEYS
+                else np.full(draws, _parse_float(voice_inputs.get(key, 0)))
+            )
+            for key in VOICE_MINUTE_COLUMNS
+        }
+        calling = calculate_voice_calling_costs_batch(minute_columns, voice_inputs, country)
+        summary['voice_calling_costs'] = _percentiles(calling['total'])
+        summary['total_revenue'] = _percentiles(revenue + calling['total'])
+    return summary
+
@@ -0,0 +1,48 @@
+"""Add analytics_daily_rollups and the rollup watermark
+
+Revision ID: add_analytics_rollups
+Revises: add_user_calc_counts
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_analytics_rollups'
+down_revision = 'add_user_calc_counts'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'analytics_daily_rollups',
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('country', sa.String(length=64), primary_key=True),
+        sa.Column('region', sa.String(length=64), primary_key=True),
+        sa.Column('calculation_route', sa.String(length=16), primary_key=True),
+        sa.Column('channel_type', sa.String(length=32), primary_key=True),
+        sa.Column('metric', sa.String(length=48), primary_key=True),
+        sa.Column('value_count', sa.Integer(), nullable=False),
+        sa.Column('value_sum', sa.Float(), nullable=False),
+        sa.Column('value_sum_sq', sa.Float(), nullable=False),
+        sa.Column('value_min', sa.Float(), nullable=True),
+        sa.Column('value_max', sa.Float(), nullable=True),
+        sa.Column('sketch', sa.Text(), nullable=True),
+    )
+    op.create_table(
+        'analytics_rollup_state',
+        sa.Column('name', sa.String(length=32), primary_key=True),
+        sa.Column('last_analytics_id', sa.Integer(), nullable=False),
+        sa.Column('refreshed_at', sa.DateTime(), nullable=True),
+    )
+    # Watermark starts at 0: the first refresh (`flask refresh-rollups` or the daily
+    # script, never a dashboard request) backfills history in batches.
+    op.execute("INSERT INTO analytics_rollup_state (name, last_analytics_id) VALUES ('daily', 0)")
+
+
+def downgrade():
+    op.drop_table('analytics_rollup_state')
+    op.drop_table('analytics_daily_rollups')
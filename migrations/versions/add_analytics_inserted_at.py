@@ -0,0 +1,31 @@
+"""Add database-assigned inserted_at to Analytics for the rollup watermark
+
+Revision ID: add_analytics_inserted_at
+Revises: add_hot_lookup_indexes
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+# Keep revision id short enough for existing alembic_version VARCHAR(32)
+revision = 'add_analytics_inserted_at'
+down_revision = 'add_hot_lookup_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows get the upgrade time, so they count as settled five minutes later
+    with op.batch_alter_table('analytics', schema=None) as batch_op:
+        batch_op.add_column(sa.Column(
+            'inserted_at', sa.DateTime(), nullable=True,
+            server_default=sa.text("TIMEZONE('utc', CURRENT_TIMESTAMP)"),
+        ))
+
+
+def downgrade():
+    with op.batch_alter_table('analytics', schema=None) as batch_op:
+        batch_op.drop_column('inserted_at')
@@ -0,0 +1,41 @@
+"""Add indexes for hot analytics/funnel_events lookups
+
+Revision ID: add_hot_lookup_indexes
+Revises: add_analytics_rollups
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_hot_lookup_indexes'
+down_revision = 'add_analytics_rollups'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_analytics_calculation_id_timestamp', 'analytics', ['calculation_id', 'timestamp']),
+    ('ix_analytics_user_email_timestamp', 'analytics', ['user_email', sa.text('timestamp DESC')]),
+    ('ix_analytics_country_region', 'analytics', ['country', 'region']),
+    ('ix_analytics_timestamp', 'analytics', ['timestamp']),
+    ('ix_funnel_events_calculation_id_step', 'funnel_events', ['calculation_id', 'step']),
+    ('ix_funnel_events_timestamp', 'funnel_events', ['timestamp']),
+    ('ix_analytics_daily_rollups_metric_day', 'analytics_daily_rollups', ['metric', 'day']),
+]
+
+
+def upgrade():
+    # CONCURRENTLY on PostgreSQL so the live app keeps writing analytics rows while the
+    # indexes build; it cannot run inside a transaction, hence the autocommit block.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
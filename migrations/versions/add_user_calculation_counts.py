@@ -0,0 +1,35 @@
+"""Add user_calculation_counts aggregate for top-user counts
+
+Revision ID: add_user_calc_counts
+Revises: add_funnel_events
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_user_calc_counts'
+down_revision = 'add_funnel_events'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'user_calculation_counts',
+        sa.Column('user_name', sa.String(length=128), primary_key=True),
+        sa.Column('calculation_count', sa.Integer(), nullable=False),
+    )
+    # Backfill from existing analytics rows (same filter as the old Counter: non-empty names)
+    op.execute(
+        "INSERT INTO user_calculation_counts (user_name, calculation_count) "
+        "SELECT user_name, COUNT(*) FROM analytics "
+        "WHERE user_name IS NOT NULL AND user_name <> '' "
+        "GROUP BY user_name"
+    )
+
+
+def downgrade():
+    op.drop_table('user_calculation_counts')
@@ -9,6 +9,12 @@
 # 2. COMMITTED AMOUNT/BUNDLE ROUTE: User enters committed amount, uses committed_amount_slabs
 # =============================================================================
 
+import hashlib
+import json
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from types import MappingProxyType
+
 # =============================================================================
 # VOLUMES ROUTE CONFIGURATIONS
 # =============================================================================
@@ -110,6 +116,59 @@ committed_amount_slabs = {
     ],
 }
 
+# --- Committed Amount Slab Index (derived, built once at import) ---
+# USAGE: All slab lookups (rate for amount/volume, programmed bundle search) go through
+# these helpers so they are O(log n) via bisect instead of walking the slab list.
+# Slabs are assumed non-overlapping; lookup semantics match the original scans
+# (lower <= amount < upper).
+def _build_committed_slab_index(slabs_by_country):
+    index = {}
+    for country, slabs in slabs_by_country.items():
+        ordered = sorted(slabs, key=lambda slab: slab[0])
+        index[country] = {
+            'lowers': tuple(slab[0] for slab in ordered),
+            'uppers': tuple(slab[1] for slab in ordered),
+            'rates': tuple(slab[2] for slab in ordered),
+            # Every lower and upper bound, de-duplicated and sorted
+            'bundles': tuple(sorted({bound for slab in ordered for bound in slab[:2]})),
+        }
+    return index
+
+
+COMMITTED_SLAB_INDEX = _build_committed_slab_index(committed_amount_slabs)
+
+
+def get_committed_slab_index(country):
+    """Index entry for a country, falling back to APAC like committed_amount_slabs.get(country, APAC)."""
+    return COMMITTED_SLAB_INDEX.get(country, COMMITTED_SLAB_INDEX['APAC'])
+
+
+def find_committed_slab_rates(country, amount):
+    """Rates dict of the slab with lower <= amount < upper, or None if no slab contains amount."""
+    entry = get_committed_slab_index(country)
+    i = bisect_right(entry['lowers'], amount) - 1
+    if i >= 0 and amount < entry['uppers'][i]:
+        return entry['rates'][i]
+    return None
+
+
+def get_programmed_bundles(country):
+    """Sorted programmed bundle amounts (all slab boundaries) for a country."""
+    return get_committed_slab_index(country)['bundles']
+
+
+def nearest_programmed_bundles(country, amount):
+    """
+    (nearest_lower, nearest_upper) programmed bundles around amount:
+    largest bundle <= amount (else the smallest) and smallest bundle >= amount (else the largest).
+    """
+    bundles = get_programmed_bundles(country)
+    i = bisect_right(bundles, amount)
+    nearest_lower = bundles[i - 1] if i > 0 else bundles[0]
+    j = bisect_left(bundles, amount)
+    nearest_upper = bundles[j] if j < len(bundles) else bundles[-1]
+    return nearest_lower, nearest_upper
+
 # =============================================================================
 # DEVELOPMENT COST CONFIGURATIONS (Used by both routes)
 # =============================================================================
@@ -838,6 +897,7 @@ WA_VOICE_MARKET_BY_COUNTRY = {
     'APAC': 'Rest of Asia Pacific',
 }
 
+@lru_cache(maxsize=256)
 def resolve_wa_voice_market(country, region=None):
     if country == 'India':
         return 'India'
@@ -846,6 +906,50 @@ def resolve_wa_voice_market(country, region=None):
         return WA_VOICE_MARKET_BY_REGION[region_key]
     return WA_VOICE_MARKET_BY_COUNTRY.get(country, 'Rest of Western Europe')
 
+# --- WhatsApp Voice Tier Index (derived, built once at import) ---
+# USAGE: get_whatsapp_voice_tier() bisects over min_minutes; calculator's batch
+# voice engine reads the same sorted tiers. Tiers are per whole minute, so each
+# tier must start at or before the previous max + 1 and after the previous max;
+# the first starts at 0 and the last is open-ended. Anything else fails at import.
+def _validate_wa_voice_tiers(market, tiers):
+    if not tiers:
+        raise ValueError(f"WhatsApp voice market {market!r} has no tiers")
+    if tiers[0]['min_minutes'] > 0:
+        raise ValueError(f"WhatsApp voice market {market!r}: first tier starts at {tiers[0]['min_minutes']}, not 0")
+    for prev, tier in zip(tiers, tiers[1:]):
+        if tier['min_minutes'] <= prev['max_minutes']:
+            raise ValueError(
+                f"WhatsApp voice market {market!r}: tier starting at {tier['min_minutes']} "
+                f"overlaps tier ending at {prev['max_minutes']}"
+            )
+        if tier['min_minutes'] > prev['max_minutes'] + 1:
+            raise ValueError(
+                f"WhatsApp voice market {market!r}: gap between {prev['max_minutes']} "
+                f"and {tier['min_minutes']} minutes"
+            )
+    if tiers[-1]['max_minutes'] != float('inf'):
+        raise ValueError(f"WhatsApp voice market {market!r}: last tier must be open-ended")
+
+
+def _build_wa_voice_tier_index(charges_by_market):
+    index = {}
+    for market, tiers in charges_by_market.items():
+        ordered = sorted(tiers, key=lambda tier: tier['min_minutes'])
+        _validate_wa_voice_tiers(market, ordered)
+        index[market] = {
+            'min_minutes': tuple(tier['min_minutes'] for tier in ordered),
+            'tiers': tuple(ordered),
+        }
+    return index
+
+
+WA_VOICE_TIER_INDEX = _build_wa_voice_tier_index(WHATSAPP_VOICE_CHARGES)
+
+
+def get_wa_voice_tier_index(market):
+    """Sorted tiers for a market, falling back to India like WHATSAPP_VOICE_CHARGES.get(market, India)."""
+    return WA_VOICE_TIER_INDEX.get(market, WA_VOICE_TIER_INDEX['India'])
+
 def get_pstn_rates(country, region=None):
     if country == 'India':
         return PSTN_CALLING_CHARGES_BY_REGION['India']
@@ -854,12 +958,10 @@ def get_pstn_rates(country, region=None):
     return None
 
 def get_whatsapp_voice_tier(country, minutes, region=None):
-    market = resolve_wa_voice_market(country, region)
-    tiers = WHATSAPP_VOICE_CHARGES.get(market, WHATSAPP_VOICE_CHARGES['India'])
-    for tier in tiers:
-        if tier['min_minutes'] <= minutes <= tier['max_minutes']:
-            return tier
-    return tiers[-1]
+    entry = get_wa_voice_tier_index(resolve_wa_voice_market(country, region))
+    # Tier i covers [min_minutes[i], min_minutes[i + 1]); below the first tier uses the first
+    i = bisect_right(entry['min_minutes'], minutes) - 1
+    return entry['tiers'][max(i, 0)]
 
 def get_whatsapp_voice_rate(country, minutes, call_type='outbound', region=None):
     tier = get_whatsapp_voice_tier(country, minutes, region=region)
@@ -1068,12 +1170,19 @@ def get_ai_model_cost(pricing_key: str, model: str, complexity: str) -> float:
     """
     if not model or model == 'None':
         return 0.0
-    models = AI_AGENT_PRICING.get(pricing_key, {})
-    model = AI_AGENT_MODEL_LEGACY_ALIASES.get(model, model)
-    model_data = models.get(model)
-    if not model_data:
+    return get_rate_card().ai_model_cost(pricing_key, model, complexity)
+
+
+def _ai_model_markup(raw_cost: float, threshold: float, multiplier: float) -> float:
+    """
+    Model-based markup: above threshold → raw cost × multiplier; at/below → flat threshold
+    (1 INR or USD equivalent), not the raw fractional token cost.
+    """
+    if raw_cost <= 0:
         return 0.0
-    return float(model_data.get(complexity, 0.0) or 0.0)
+    if raw_cost <= threshold:
+        return threshold
+    return raw_cost * multiplier
 
 
 def compute_ai_price_components(country: str, model: str, complexity: str, tier_ai_markup: float):
@@ -1094,24 +1203,12 @@ def compute_ai_price_components(country: str, model: str, complexity: str, tier_
             - 'used_model': True if model pricing overrode the tier logic
     """
     # Base channel AI meta cost (e.g., Meta's per-message AI fee)
-    costs = meta_costs_table.get(country, meta_costs_table['APAC'])
-    meta_ai_cost = float(costs.get('ai', 0.0) or 0.0)
-
-    pricing_key = get_ai_pricing_key(country)
-    settings = AI_AGENT_SETTINGS.get(pricing_key, AI_AGENT_SETTINGS['International'])
-    threshold = float(settings.get('threshold', 0.0) or 0.0)
-    multiplier = float(settings.get('multiplier', 1.0) or 1.0)
+    card = get_rate_card()
+    rates = card.country(country)
+    meta_ai_cost = float(rates.meta_costs.get('ai', 0.0) or 0.0)
 
-    raw_cost = get_ai_model_cost(pricing_key, model, complexity)
-
-    # Model-based markup: above threshold → raw cost × multiplier; at/below → flat threshold
-    # (1 INR or USD equivalent), not the raw fractional token cost.
-    if raw_cost <= 0:
-        model_markup = 0.0
-    elif raw_cost <= threshold:
-        model_markup = threshold
-    else:
-        model_markup = raw_cost * multiplier
+    # Raw cost and model markup are precomputed per (pricing key, model, complexity)
+    raw_cost, model_markup = card.ai_price_matrix.get((rates.ai_pricing_key, model, complexity), (0.0, 0.0))
 
     if raw_cost > 0 and model_markup > float(tier_ai_markup or 0.0):
         final_price = meta_ai_cost + model_markup
@@ -1128,3 +1225,177 @@ def compute_ai_price_components(country: str, model: str, complexity: str, tier_
         'markup': float(tier_ai_markup or 0.0),
         'used_model': False,
     }
+
+
+# =============================================================================
+# RATE CARD SNAPSHOT (derived, read-only)
+# =============================================================================
+# USAGE: calculator.py / app.py hot paths read per-country values from the
+# snapshot instead of re-resolving APAC fallbacks, LATAM dev-location dicts
+# and legacy AI model aliases on every request.
+# The snapshot is compiled once per config version (a hash of the source
+# tables above); call refresh_rate_card() after mutating those tables.
+
+def _frozen(mapping):
+    return MappingProxyType(dict(mapping))
+
+
+class _FrozenRecord:
+    """Base for immutable, slot-backed snapshot records."""
+    __slots__ = ()
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            object.__setattr__(self, name, values[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+
+class CountryRates(_FrozenRecord):
+    """
+    Per-country rates with every fallback already applied.
+    bot_ui_rates / custom_ai_rates map dev location -> rate; flat-rate countries
+    carry the same rate for every location.
+    """
+    __slots__ = (
+        'country',
+        'currency',
+        'meta_costs',
+        'platform_guidance',
+        'bot_ui_rates',
+        'custom_ai_rates',
+        'default_bot_ui',
+        'default_custom_ai',
+        'ai_pricing_key',
+    )
+
+    def manday_rates(self, dev_location):
+        """(bot_ui, custom_ai) manday rates for a delivery location; unknown locations get the first configured rate."""
+        return (
+            self.bot_ui_rates.get(dev_location, self.default_bot_ui),
+            self.custom_ai_rates.get(dev_location, self.default_custom_ai),
+        )
+
+
+class RateCard(_FrozenRecord):
+    """Immutable snapshot of the pricing tables, keyed by version."""
+    __slots__ = ('version', 'countries', 'ai_model_costs', 'ai_settings', 'ai_price_matrix', 'min_platform_fees')
+
+    def country(self, country):
+        """CountryRates for a country, falling back to APAC like the source tables."""
+        return self.countries.get(country) or self.countries['APAC']
+
+    def ai_model_cost(self, pricing_key, model, complexity):
+        """Raw vendor cost per call with legacy aliases resolved; 0.0 if unknown."""
+        model_data = self.ai_model_costs.get(pricing_key, {}).get(model)
+        if not model_data:
+            return 0.0
+        return model_data.get(complexity, 0.0)
+
+
+def _rate_card_sources():
+    return {
+        'meta_costs_table': meta_costs_table,
+        'COUNTRY_MANDAY_RATES': COUNTRY_MANDAY_RATES,
+        'PLATFORM_PRICING_GUIDANCE': PLATFORM_PRICING_GUIDANCE,
+        'AI_AGENT_PRICING': AI_AGENT_PRICING,
+        'AI_AGENT_MODEL_LEGACY_ALIASES': AI_AGENT_MODEL_LEGACY_ALIASES,
+        'AI_AGENT_SETTINGS': AI_AGENT_SETTINGS,
+    }
+
+
+def rate_card_version():
+    """Content hash of the source pricing tables."""
+    payload = json.dumps(_rate_card_sources(), sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+
+def _resolve_manday_rates(rates, dev_locations):
+    """Expand a flat or per-dev-location rate into {dev_location: float} plus the unknown-location default."""
+    if isinstance(rates, dict):
+        resolved = {loc: float(rate or 0.0) for loc, rate in rates.items()}
+        # Unknown dev locations fall back to the first configured rate, as the voice cost path always has
+        return _frozen(resolved), next(iter(resolved.values()), 0.0)
+    flat = float(rates or 0.0)
+    return _frozen({loc: flat for loc in dev_locations}), flat
+
+
+def build_rate_card():
+    """Compile the source pricing tables into a RateCard snapshot."""
+    dev_locations = set()
+    for rates in COUNTRY_MANDAY_RATES.values():
+        for kind in ('bot_ui', 'custom_ai'):
+            if isinstance(rates.get(kind), dict):
+                dev_locations.update(rates[kind].keys())
+
+    names = set(meta_costs_table) | set(COUNTRY_MANDAY_RATES) | set(PLATFORM_PRICING_GUIDANCE)
+    countries = {}
+    for name in names:
+        manday = COUNTRY_MANDAY_RATES.get(name, COUNTRY_MANDAY_RATES['APAC'])
+        bot_ui_rates, default_bot_ui = _resolve_manday_rates(manday.get('bot_ui', 0.0), dev_locations)
+        custom_ai_rates, default_custom_ai = _resolve_manday_rates(manday.get('custom_ai', 0.0), dev_locations)
+        countries[name] = CountryRates(
+            country=name,
+            currency=manday.get('currency', 'USD'),
+            meta_costs=_frozen(meta_costs_table.get(name, meta_costs_table['APAC'])),
+            platform_guidance=_frozen(PLATFORM_PRICING_GUIDANCE.get(name, PLATFORM_PRICING_GUIDANCE['APAC'])),
+            bot_ui_rates=bot_ui_rates,
+            custom_ai_rates=custom_ai_rates,
+            default_bot_ui=default_bot_ui,
+            default_custom_ai=default_custom_ai,
+            ai_pricing_key=get_ai_pricing_key(name),
+        )
+
+    ai_model_costs = {}
+    for pricing_key, models in AI_AGENT_PRICING.items():
+        resolved = {
+            model: _frozen({c: float(v or 0.0) for c, v in data.items()})
+            for model, data in models.items()
+        }
+        for alias, target in AI_AGENT_MODEL_LEGACY_ALIASES.items():
+            if target in resolved:
+                resolved[alias] = resolved[target]
+        ai_model_costs[pricing_key] = _frozen(resolved)
+
+    ai_settings = _frozen({k: _frozen(v) for k, v in AI_AGENT_SETTINGS.items()})
+    # (pricing key, model, complexity) -> (raw_cost, model_markup); aliases included
+    ai_price_matrix = {}
+    for pricing_key, models in ai_model_costs.items():
+        settings = ai_settings.get(pricing_key, ai_settings['International'])
+        threshold = float(settings.get('threshold', 0.0) or 0.0)
+        multiplier = float(settings.get('multiplier', 1.0) or 1.0)
+        for model, complexities in models.items():
+            for complexity, raw_cost in complexities.items():
+                ai_price_matrix[(pricing_key, model, complexity)] = (
+                    raw_cost,
+                    _ai_model_markup(raw_cost, threshold, multiplier),
+                )
+
+    return RateCard(
+        version=rate_card_version(),
+        countries=_frozen(countries),
+        ai_model_costs=_frozen(ai_model_costs),
+        ai_settings=ai_settings,
+        ai_price_matrix=_frozen(ai_price_matrix),
+        min_platform_fees=_frozen({c: data['minimum'] for c, data in PLATFORM_PRICING_GUIDANCE.items()}),
+    )
+
+
+_RATE_CARD = build_rate_card()
+
+
+def get_rate_card():
+    """Current RateCard snapshot."""
+    return _RATE_CARD
+
+
+def refresh_rate_card():
+    """Rebuild the snapshot if the source tables changed; returns the current snapshot."""
+    global _RATE_CARD
+    if rate_card_version() != _RATE_CARD.version:
+        _RATE_CARD = build_rate_card()
+    return _RATE_CARD
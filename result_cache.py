@@ -0,0 +1,95 @@
+# result_cache.py
+
+# --- Per-calculation result cache ---
+# Results-page refreshes, back navigation and the SOW pages re-run the pricing
+# simulation and manday costing for inputs that have not changed. Entries are
+# keyed on (calculation_id, kind, canonical hash of inputs + pricing_inputs) and
+# tagged with the rate-card version; a new rate-card version empties the cache.
+
+import copy
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+
+def canonical_hash(*parts):
+    """Stable sha256 of JSON-able parts (dict key order and int/float spelling do not matter)."""
+    def _normalize(value):
+        if isinstance(value, dict):
+            return {str(k): _normalize(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [_normalize(v) for v in value]
+        if isinstance(value, bool) or value is None or isinstance(value, str):
+            return value
+        if isinstance(value, (int, float)):
+            return float(value)
+        return str(value)
+
+    payload = json.dumps([_normalize(p) for p in parts], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """Bounded LRU of computed results; values are deep-copied in and out."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _check_version(self, version):
+        # Caller holds the lock
+        if version != self.version:
+            self._entries.clear()
+            self.version = version
+
+    def key(self, calculation_id, kind, inputs, pricing_inputs=None):
+        return (calculation_id or '', kind, canonical_hash(inputs or {}, pricing_inputs or {}))
+
+    def get(self, key, version):
+        """Cached value for key under this rate-card version, else None."""
+        with self._lock:
+            self._check_version(version)
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(value)
+
+    def put(self, key, version, value):
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, version, compute):
+        """Return the cached value or compute(), store and return it."""
+        value = self.get(key, version)
+        if value is None:
+            value = compute()
+            self.put(key, version, value)
+        return value
+
+    def discard_calculation(self, calculation_id):
+        """Drop every entry for one calculation (e.g. on Start Over)."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == calculation_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
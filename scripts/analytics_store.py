@@ -0,0 +1,152 @@
+"""
+Append-only, month-partitioned Parquet store for the daily analytics export.
+
+Layout: <root>/<table>/month=YYYY-MM/part-<first id>-<last id>.parquet
+
+Each incremental export appends one part per month it touches, then records
+the batch's last id in <root>/<table>/_high_water_mark.json. The mark is only
+written after every part of the batch is on disk, so a crash can at worst
+re-fetch rows that were already stored; readers drop duplicate ids. Months that
+collect many small parts are compacted into one. Readers load only the
+columns they ask for.
+
+Rows changed after they were stored (flags set later) are re-fetched and
+written over their stored copies with replace(); clear() empties the store when
+rows were deleted upstream, so the next export rebuilds it.
+"""
+
+import glob
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+COMPACT_AFTER = 8  # parts per month before they are merged into one
+
+
+class MonthlyParquetStore:
+    """Rows of one table, partitioned by the month of `time_column`, keyed by a monotonic `id_column`."""
+
+    def __init__(self, root, table, time_column='timestamp', id_column='id'):
+        self.directory = os.path.join(root, table)
+        self.time_column = time_column
+        self.id_column = id_column
+
+    # --- Writing ---
+    def _parts(self, month='*'):
+        return sorted(glob.glob(os.path.join(self.directory, f'month={month}', 'part-*.parquet')))
+
+    @property
+    def _mark_path(self):
+        return os.path.join(self.directory, '_high_water_mark.json')
+
+    def high_water_mark(self):
+        """Largest id already stored (0 for an empty store)."""
+        try:
+            with open(self._mark_path, 'r', encoding='utf-8') as f:
+                return int(json.load(f)['last_id'])
+        except FileNotFoundError:
+            return 0
+
+    def _set_high_water_mark(self, last_id):
+        tmp_path = f'{self._mark_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'last_id': int(last_id)}, f)
+        os.replace(tmp_path, self._mark_path)
+
+    def _write_part(self, month, frame):
+        month_dir = os.path.join(self.directory, f'month={month}')
+        os.makedirs(month_dir, exist_ok=True)
+        ids = frame[self.id_column]
+        path = os.path.join(month_dir, f'part-{int(ids.min()):012d}-{int(ids.max()):012d}.parquet')
+        tmp_path = f'{path}.tmp'
+        frame.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        return path
+
+    def append(self, frame):
+        """Store a typed batch of rows (ids above the high-water mark). Returns months touched."""
+        if frame.empty:
+            return []
+        months = frame[self.time_column].dt.strftime('%Y-%m').fillna('unknown')
+        touched = []
+        for month, part in frame.groupby(months, sort=True):
+            self._write_part(month, part)
+            touched.append(month)
+        self._set_high_water_mark(max(self.high_water_mark(), frame[self.id_column].max()))
+        for month in touched:
+            if len(self._parts(month)) > COMPACT_AFTER:
+                self.compact(month)
+        return touched
+
+    def replace(self, frame):
+        """Rewrite the months `frame` touches so its rows supersede the stored copies (same ids)."""
+        if frame.empty:
+            return []
+        months = frame[self.time_column].dt.strftime('%Y-%m').fillna('unknown')
+        touched = []
+        for month, rows in frame.groupby(months, sort=True):
+            parts = self._parts(month)
+            stored = [pd.read_parquet(path) for path in parts]
+            stored = [f[~f[self.id_column].isin(rows[self.id_column])] for f in stored]
+            merged = pd.concat([f for f in stored if not f.empty] + [rows], ignore_index=True)
+            merged = merged.drop_duplicates(self.id_column, keep='last').sort_values(self.id_column)
+            path = self._write_part(month, merged)
+            for old in parts:
+                if old != path:
+                    os.remove(old)
+            touched.append(month)
+        return touched
+
+    def clear(self):
+        """Remove every stored part and the high-water mark."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def row_count(self):
+        """Distinct ids stored (reads only the id column)."""
+        ids = [pd.read_parquet(path, columns=[self.id_column])[self.id_column] for path in self._parts()]
+        return int(pd.concat(ids).nunique()) if ids else 0
+
+    def compact(self, month):
+        """Merge one month's parts into a single file (new file first, then drop the old ones)."""
+        parts = self._parts(month)
+        if len(parts) < 2:
+            return
+        frame = pd.concat([pd.read_parquet(path) for path in parts], ignore_index=True)
+        frame = frame.drop_duplicates(self.id_column).sort_values(self.id_column)
+        merged = self._write_part(month, frame)
+        for path in parts:
+            if path != merged:
+                os.remove(path)
+
+    # --- Reading ---
+    def load(self, columns=None):
+        """
+        DataFrame of the stored rows (only `columns`, when given), newest first like the
+        old CSV export. Empty strings and NULLs read back as NaN, as pd.read_csv does.
+        """
+        frames = []
+        for path in self._parts():
+            available = pq.ParquetFile(path).schema_arrow.names
+            wanted = available if columns is None else [
+                c for c in available if c in columns or c in (self.id_column, self.time_column)
+            ]
+            frames.append(pd.read_parquet(path, columns=wanted))
+        if not frames:
+            return pd.DataFrame(columns=list(columns or []))
+        frame = pd.concat(frames, ignore_index=True).drop_duplicates(self.id_column)
+        frame = frame.sort_values([self.time_column, self.id_column], ascending=False, kind='stable')
+        for name in frame.columns:
+            series = frame[name]
+            if series.dtype == object or pd.api.types.is_string_dtype(series.dtype):
+                values = series.astype(object)
+                frame[name] = values.where(values.notna() & (values != ''), np.nan)
+            elif pd.api.types.is_integer_dtype(series.dtype) and series.dtype != np.int64:
+                frame[name] = series.astype('float64') if series.isna().any() else series.astype('int64')
+        if columns is not None:
+            frame = frame[[c for c in frame.columns if c in columns]]
+        return frame.reset_index(drop=True)
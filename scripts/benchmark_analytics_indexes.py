@@ -0,0 +1,147 @@
+"""
+Benchmark the hot analytics lookups with and without the add_hot_lookup_indexes indexes.
+
+Seeds a scratch `analytics` table (1M rows by default), times each lookup the app
+runs, creates the indexes declared on the models, and times them again.
+
+Usage (from repo root, venv active):
+    python3 scripts/benchmark_analytics_indexes.py                  # scratch SQLite file
+    python3 scripts/benchmark_analytics_indexes.py --rows 200000
+    BENCH_DATABASE_URL=postgresql://... python3 scripts/benchmark_analytics_indexes.py
+
+BENCH_DATABASE_URL must point at a scratch database: the analytics table there is
+dropped and recreated.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import sqlalchemy as sa  # noqa: E402
+
+from app import Analytics  # noqa: E402
+
+COUNTRIES = {
+    'India': ['', 'North', 'South', 'East', 'West'],
+    'MENA': ['', 'UAE', 'KSA'],
+    'LATAM': ['', 'Brazil', 'Mexico'],
+    'Africa': [''],
+    'Europe': [''],
+    'APAC': ['', 'Indonesia'],
+}
+START = datetime(2024, 1, 1)
+
+
+def seed(engine, rows, batch_size=20000):
+    rng = random.Random(42)
+    table = Analytics.__table__
+    users = [f'user{i}@example.com' for i in range(max(rows // 50, 1))]
+    countries = list(COUNTRIES)
+    with engine.begin() as conn:
+        for offset in range(0, rows, batch_size):
+            batch = []
+            for i in range(offset, min(offset + batch_size, rows)):
+                country = rng.choice(countries)
+                batch.append({
+                    'calculation_id': f'calc-{i:08d}',
+                    'timestamp': START + timedelta(seconds=i * 60),
+                    'user_email': rng.choice(users),
+                    'country': country,
+                    'region': rng.choice(COUNTRIES[country]),
+                    'platform_fee': rng.choice([0, 100000, 150000, 200000]),
+                    'calculation_route': rng.choice(['volumes', 'bundle']),
+                    'channel_type': rng.choice(['text_only', 'voice_only', 'text_voice']),
+                })
+            conn.execute(table.insert(), batch)
+    return users
+
+
+def lookups(rows, users):
+    """(label, statement, params) for each hot query, mirroring app.py."""
+    t = Analytics.__table__
+    last = START + timedelta(seconds=rows * 60)
+    return [
+        ('calculation_id -> latest (SOW routes)',
+         sa.select(t).where(t.c.calculation_id == sa.bindparam('cid')).order_by(t.c.timestamp.desc()).limit(1),
+         lambda rng: {'cid': f'calc-{rng.randrange(rows):08d}'}),
+        ('user_email -> latest (profile lookup)',
+         sa.select(t).where(t.c.user_email == sa.bindparam('email')).order_by(t.c.timestamp.desc()).limit(1),
+         lambda rng: {'email': rng.choice(users)}),
+        ('country/region count',
+         sa.select(sa.func.count()).select_from(t).where(t.c.country == sa.bindparam('c'), t.c.region == 'North'),
+         lambda rng: {'c': 'India'}),
+        ('last 7 days count',
+         sa.select(sa.func.count()).select_from(t).where(t.c.timestamp >= sa.bindparam('since')),
+         lambda rng: {'since': last - timedelta(days=7)}),
+    ]
+
+
+def time_queries(engine, queries, repeat):
+    rng = random.Random(7)
+    results = {}
+    with engine.connect() as conn:
+        for label, statement, params in queries:
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                conn.execute(statement, params(rng)).all()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[label] = statistics.median(timings)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    url = os.environ.get('BENCH_DATABASE_URL')
+    path = None
+    if not url:
+        path = os.path.join(tempfile.gettempdir(), 'pricing-calc-index-bench.sqlite')
+        if os.path.exists(path):
+            os.remove(path)
+        url = f'sqlite:///{path}'
+    engine = sa.create_engine(url)
+    table = Analytics.__table__
+    table.drop(engine, checkfirst=True)
+    table.create(engine)
+    for index in table.indexes:
+        index.drop(engine)
+
+    started = time.perf_counter()
+    users = seed(engine, args.rows)
+    print(f"Seeded {args.rows:,} analytics rows in {time.perf_counter() - started:.1f}s ({engine.url.get_backend_name()})")
+    queries = lookups(args.rows, users)
+    before = time_queries(engine, queries, args.repeat)
+
+    started = time.perf_counter()
+    for index in table.indexes:
+        index.create(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql('ANALYZE')
+    print(f"Created {len(table.indexes)} indexes in {time.perf_counter() - started:.1f}s")
+    after = time_queries(engine, queries, args.repeat)
+
+    print(f"\n{'lookup':<40}{'no index (ms)':>15}{'indexed (ms)':>15}{'speedup':>10}")
+    for label, _statement, _params in queries:
+        speedup = before[label] / after[label] if after[label] else float('inf')
+        print(f"{label:<40}{before[label]:>15.2f}{after[label]:>15.2f}{speedup:>9.0f}x")
+    table.drop(engine)
+    engine.dispose()
+    if path:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,17 +8,22 @@ Runs daily at 8 PM IST via cron job
 import os
 import sys
 import psycopg2
-import csv
 import pandas as pd
+import matplotlib
+matplotlib.use('Agg')  # headless cron/worker processes
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
 import warnings
 from datetime import datetime, timedelta
 import json
+import gzip
 import subprocess
 import math
 import time
+import hashlib
+import inspect
+from concurrent.futures import ProcessPoolExecutor
 start_time = time.time()
 print(f"[DEBUG] Script started at: {time.strftime('%Y-%m-%d %H:%M:%S')}")
 
@@ -31,11 +36,82 @@ FUNNEL_CSV_PATH = "funnel_events.csv"
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, PROJECT_ROOT)
 
+# Incremental mode (default) appends only new rows to a month-partitioned Parquet
+# store; ANALYTICS_EXPORT_MODE=full re-exports everything to the CSV files instead.
+STORE_DIR = os.environ.get("ANALYTICS_STORE_DIR", os.path.join(PROJECT_ROOT, "analytics_store"))
+EXPORT_MODE = os.environ.get("ANALYTICS_EXPORT_MODE", "incremental")
+EXPORT_FETCH_SIZE = 50000
+# Stored rows newer than this are re-fetched each run, so flags set after the export
+# (sow_generate_clicked / sow_downloaded) reach the store
+EXPORT_RESYNC_DAYS = int(os.environ.get("ANALYTICS_RESYNC_DAYS", 14))
+# The dashboard reads the summary as per-section artifacts: minified, gzipped JSON named by
+# content hash, listed in <SUMMARY_DIR>/manifest.json (served by /analytics/summary/<section>.json).
+SUMMARY_DIR = os.environ.get("ANALYTICS_SUMMARY_DIR", os.path.join(PROJECT_ROOT, "analytics_summary"))
+SUMMARY_SECTIONS = {
+    'overview': ['total_calculations', 'unique_users', 'total_revenue', 'countries', 'last_updated',
+                 'top_users', 'country_breakdown', 'route_breakdown', 'ai_model_counts_global',
+                 'ai_complexity_counts_global', 'funnel', 'platform_fee_by_country',
+                 'ai_message_by_country', 'country_labels'],
+    'ai_by_country': ['ai_model_counts_by_country', 'ai_complexity_counts_by_country'],
+    'country_stats': ['country_stats'],
+    'region_stats': ['region_stats'],
+}
+try:
+    from analytics_store import MonthlyParquetStore
+except ImportError:  # pyarrow not installed
+    MonthlyParquetStore = None
+
+# Columns each step reads (the Parquet store loads nothing else).
+# Chart sets: name -> input columns; generate_<name>_charts() writes static/<name>_analytics.png
+PRICE_COLUMNS = ['ai_price', 'advanced_price', 'basic_marketing_price', 'basic_utility_price']
+CHART_INPUTS = {
+    'temporal': ['timestamp'],
+    'customer': ['user_name', 'platform_fee'] + PRICE_COLUMNS,
+    'pricing': ['timestamp', 'platform_fee'] + PRICE_COLUMNS,
+    'geographic': ['country', 'platform_fee'],
+    'resource': ['user_name', 'platform_fee', 'bot_ui_mandays', 'custom_ai_mandays',
+                 'bot_ui_manday_rate', 'custom_ai_manday_rate'],
+    'platform': ['calculation_route', 'platform_fee'],
+}
+CHART_COLUMNS = list(dict.fromkeys(c for columns in CHART_INPUTS.values() for c in columns))
+# Kept next to the PNGs in static/; both must persist between runs (the workflow caches them with the store)
+CHART_FINGERPRINTS = '.chart_fingerprints.json'
+SUMMARY_COLUMNS = CHART_COLUMNS + [
+    'region', 'currency', 'ai_agent_model', 'ai_agent_complexity', 'voice_notes_rate', 'committed_amount',
+    'ai_rate_card_price', 'advanced_rate_card_price', 'basic_marketing_rate_card_price',
+    'basic_utility_rate_card_price',
+]
+
+# psycopg2 type OIDs -> pandas dtypes for the Parquet store (anything else is stored as string)
+PG_DTYPES = {
+    16: 'boolean',
+    20: 'Int64', 21: 'Int64', 23: 'Int64',
+    700: 'float64', 701: 'float64', 1700: 'float64',
+    1082: 'datetime64[ns]', 1114: 'datetime64[ns]', 1184: 'datetime64[ns, UTC]',
+}
+
 def log_message(message):
     """Log messages with timestamp"""
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     print(f"[{timestamp}] {message}")
 
+def copy_query_to_csv(cur, query, path):
+    """
+    Stream `query` into `path` as CSV (with header) using server-side COPY ... TO STDOUT.
+    Rows go straight from the connection to disk in chunks, so client memory stays
+    constant regardless of table size. Written to a temp file and renamed into place,
+    so a failed export never leaves a truncated CSV behind.
+    """
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            cur.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER true)", f, size=1 << 20)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
 def export_analytics_to_csv():
     """Export analytics data from PostgreSQL to CSV"""
     try:
@@ -46,20 +122,7 @@ def export_analytics_to_csv():
         cur = conn.cursor()
         
         # Export all data from analytics table
-        cur.execute("SELECT * FROM analytics ORDER BY timestamp DESC")
-        
-        if cur.description is None:
-            log_message("Error: No data found in analytics table")
-            return False
-            
-        columns = [desc[0] for desc in cur.description]
-        
-        # Write to CSV
-        with open(CSV_PATH, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(columns)
-            for row in cur.fetchall():
-                writer.writerow(row)
+        copy_query_to_csv(cur, "SELECT * FROM analytics ORDER BY timestamp DESC", CSV_PATH)
         
         cur.close()
         conn.close()
@@ -91,19 +154,7 @@ def export_funnel_to_csv():
             conn.close()
             return False
 
-        cur.execute("SELECT * FROM funnel_events ORDER BY timestamp DESC")
-        if cur.description is None:
-            log_message("No data found in funnel_events table")
-            cur.close()
-            conn.close()
-            return False
-
-        columns = [desc[0] for desc in cur.description]
-        with open(FUNNEL_CSV_PATH, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(columns)
-            for row in cur.fetchall():
-                writer.writerow(row)
+        copy_query_to_csv(cur, "SELECT * FROM funnel_events ORDER BY timestamp DESC", FUNNEL_CSV_PATH)
 
         cur.close()
         conn.close()
@@ -114,39 +165,187 @@ def export_funnel_to_csv():
         log_message(f"Error exporting funnel CSV: {e}")
         return False
 
+def use_incremental_store():
+    return EXPORT_MODE == "incremental" and MonthlyParquetStore is not None
+
+
+def typed_frame(rows, description):
+    """DataFrame with explicit dtypes from the cursor's column types (no inference)."""
+    df = pd.DataFrame.from_records(rows, columns=[col.name for col in description])
+    for col in description:
+        dtype = PG_DTYPES.get(col.type_code, 'string')
+        if dtype.startswith('datetime64'):
+            df[col.name] = pd.to_datetime(df[col.name], utc=dtype.endswith('UTC]'))
+        else:
+            df[col.name] = df[col.name].astype(dtype)
+    return df
+
+
+def resync_stored_rows(conn, store, table, last_id):
+    """
+    Bring stored rows up to date with the table. Returns the high-water mark to append from:
+    0 (store cleared) when stored ids no longer match the table (rows deleted, e.g. by
+    /reset-analytics, or committed below the mark after it moved), else last_id.
+    """
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT count(*) FROM {table} WHERE id <= %s", (last_id,))
+        table_count = cur.fetchone()[0]
+    stored_count = store.row_count()
+    if table_count != stored_count:
+        log_message(f"{table}: {table_count} rows up to id {last_id} but {stored_count} stored; rebuilding the store")
+        store.clear()
+        return 0
+    with conn.cursor() as cur:
+        cur.execute(
+            f"SELECT * FROM {table} WHERE id <= %s AND timestamp >= now() - make_interval(days => %s) ORDER BY id",
+            (last_id, EXPORT_RESYNC_DAYS),
+        )
+        rows = cur.fetchall()
+        if rows:
+            store.replace(typed_frame(rows, cur.description))
+    log_message(f"Re-synced {len(rows)} {table} rows from the last {EXPORT_RESYNC_DAYS} days")
+    return last_id
+
+
+def export_table_incremental(conn, table):
+    """Append rows of `table` with id above the store's high-water mark. Returns rows added."""
+    store = MonthlyParquetStore(STORE_DIR, table)
+    os.makedirs(store.directory, exist_ok=True)  # marks the table as exported, even when empty
+    last_id = store.high_water_mark()
+    if last_id:
+        last_id = resync_stored_rows(conn, store, table, last_id)
+    added = 0
+    # Named (server-side) cursor: rows arrive in EXPORT_FETCH_SIZE chunks
+    with conn.cursor(name=f"{table}_export") as cur:
+        cur.itersize = EXPORT_FETCH_SIZE
+        cur.execute(f"SELECT * FROM {table} WHERE id > %s ORDER BY id", (last_id,))
+        while True:
+            rows = cur.fetchmany(EXPORT_FETCH_SIZE)
+            if not rows:
+                break
+            store.append(typed_frame(rows, cur.description))
+            added += len(rows)
+    log_message(f"Appended {added} new {table} rows (after id {last_id}) to {store.directory}")
+    return added
+
+
+def export_incremental():
+    """Incremental export of analytics and (if present) funnel_events into the Parquet store."""
+    try:
+        conn = psycopg2.connect(DB_URL)
+        try:
+            export_table_incremental(conn, "analytics")
+            with conn.cursor() as cur:
+                cur.execute("SELECT to_regclass('public.funnel_events');")
+                funnel_exists = cur.fetchone()[0]
+            if funnel_exists:
+                export_table_incremental(conn, "funnel_events")
+        finally:
+            conn.close()
+        return True
+    except Exception as e:
+        log_message(f"Error in incremental export: {e}")
+        return False
+
+
+def load_analytics(columns, table="analytics"):
+    """The exported rows of `table` (only `columns` that exist), from the store or the CSV."""
+    if use_incremental_store():
+        return MonthlyParquetStore(STORE_DIR, table).load(columns)
+    path = CSV_PATH if table == "analytics" else FUNNEL_CSV_PATH
+    df = pd.read_csv(path, usecols=lambda c: c in columns)
+    if 'timestamp' in df.columns:
+        # Parsed once here; chart/summary steps rely on a datetime64 column
+        df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
+    return df
+
+
+def refresh_rollup_tables():
+    """Fold new analytics rows into analytics_daily_rollups (see analytics_rollups.py)."""
+    try:
+        from sqlalchemy import MetaData, Table, create_engine
+        from analytics_rollups import refresh_rollups
+
+        engine = create_engine(DB_URL)
+        metadata = MetaData()
+        tables = [Table(name, metadata, autoload_with=engine)
+                  for name in ('analytics', 'analytics_daily_rollups', 'analytics_rollup_state')]
+        processed = refresh_rollups(engine, *tables)
+        engine.dispose()
+        log_message(f"Folded {processed} new analytics rows into daily rollups")
+        return True
+    except Exception as e:
+        log_message(f"Error refreshing rollups: {e}")
+        return False
+
+def chart_fingerprint(name, frame):
+    """Hash of a chart set's input data and its rendering code; unchanged -> skip re-rendering."""
+    digest = hashlib.sha256()
+    digest.update(inspect.getsource(globals()[f'generate_{name}_charts']).encode('utf-8'))
+    digest.update(json.dumps([list(frame.columns), [str(t) for t in frame.dtypes]]).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(frame, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def render_chart_set(name, frame, static_dir):
+    """Render one chart set (runs in a worker process)."""
+    plt.style.use('default')
+    sns.set_palette("husl")
+    globals()[f'generate_{name}_charts'](frame, static_dir)
+    return name
+
+
 def generate_analytics_charts():
-    """Generate analytics charts and save as images"""
+    """Generate analytics charts and save as images (one worker process per chart set)"""
     try:
         log_message("Generating analytics charts...")
         
         # Load data
-        df = pd.read_csv(CSV_PATH, parse_dates=['timestamp'])
-        log_message(f"Loaded {len(df)} records from {CSV_PATH}")
-        
-        # Set style
-        plt.style.use('default')
-        sns.set_palette("husl")
+        df = load_analytics(CHART_COLUMNS)
+        log_message(f"Loaded {len(df)} records")
         
         # Create static directory if it doesn't exist
         static_dir = os.path.join(PROJECT_ROOT, 'static')
         os.makedirs(static_dir, exist_ok=True)
         
-        # Generate charts
-        charts = [
-            ('temporal', generate_temporal_charts, df),
-            ('customer', generate_customer_charts, df),
-            ('pricing', generate_pricing_charts, df),
-            ('geographic', generate_geographic_charts, df),
-            ('resource', generate_resource_charts, df),
-            ('platform', generate_platform_charts, df)
-        ]
+        # Skip chart sets whose inputs (and code) are unchanged since the last run
+        fingerprint_path = os.path.join(static_dir, CHART_FINGERPRINTS)
+        try:
+            with open(fingerprint_path, 'r') as f:
+                previous = json.load(f)
+        except (OSError, ValueError):
+            previous = {}
+        pending = {}
+        fingerprints = {}
+        for chart_name, columns in CHART_INPUTS.items():
+            frame = df[[c for c in columns if c in df.columns]].copy()
+            fingerprints[chart_name] = chart_fingerprint(chart_name, frame)
+            output = os.path.join(static_dir, f'{chart_name}_analytics.png')
+            if previous.get(chart_name) == fingerprints[chart_name] and os.path.exists(output):
+                log_message(f"Skipped {chart_name} charts (input unchanged)")
+            else:
+                pending[chart_name] = frame
+        
+        rendered = {}
+        if pending:
+            with ProcessPoolExecutor(max_workers=min(len(pending), os.cpu_count() or 1)) as pool:
+                futures = {
+                    chart_name: pool.submit(render_chart_set, chart_name, frame, static_dir)
+                    for chart_name, frame in pending.items()
+                }
+                for chart_name, future in futures.items():
+                    try:
+                        future.result()
+                        rendered[chart_name] = fingerprints[chart_name]
+                        log_message(f"Generated {chart_name} charts")
+                    except Exception as e:
+                        log_message(f"Error generating {chart_name} charts: {e}")
         
-        for chart_name, chart_func, data in charts:
-            try:
-                chart_func(data, static_dir)
-                log_message(f"Generated {chart_name} charts")
-            except Exception as e:
-                log_message(f"Error generating {chart_name} charts: {e}")
+        # Failed sets keep no fingerprint so they are retried next run
+        kept = {k: v for k, v in previous.items() if k in fingerprints and k not in pending}
+        kept.update(rendered)
+        with open(fingerprint_path, 'w') as f:
+            json.dump(kept, f, indent=2)
         
         return True
         
@@ -156,8 +355,6 @@ def generate_analytics_charts():
 
 def generate_temporal_charts(df, static_dir):
     """Generate temporal analytics charts"""
-    # Ensure timestamp is datetime
-    df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
     fig, axes = plt.subplots(2, 1, figsize=(12, 10))
     
     # Hourly distribution
@@ -218,8 +415,6 @@ def generate_customer_charts(df, static_dir):
 
 def generate_pricing_charts(df, static_dir):
     """Generate pricing strategy charts"""
-    # Ensure timestamp is datetime
-    df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
     fig, axes = plt.subplots(2, 1, figsize=(12, 10))
     
     # Weekly revenue
@@ -319,272 +514,280 @@ def generate_platform_charts(df, static_dir):
     plt.savefig(os.path.join(static_dir, 'platform_analytics.png'), dpi=300, bbox_inches='tight')
     plt.close()
 
+
+# --- Summary engine ---
+# update_analytics_summary() builds every per-country/per-region figure from a handful
+# of frame-wide groupbys instead of looping over groups. Averages and the sums the old
+# code took with Series.sum() are taken over each group's rows with numpy (pairwise
+# summation, as Series.mean/sum do), because groupby's compensated sum can differ in the
+# last bit; that keeps analytics_summary.json byte-identical. Sums the old code already
+# took with groupby/resample use groupby.
+
+# Rate card (list) manday prices for each country (from pricing_config.py)
+LIST_PRICES = {
+    'India': {'bot_ui': 20000, 'custom_ai': 30000},
+    'LATAM': {'bot_ui': 580, 'custom_ai': 750},
+    'MENA': {'bot_ui': 300, 'custom_ai': 500},
+    'Africa': {'bot_ui': 300, 'custom_ai': 420},
+    'Europe': {'bot_ui': 300, 'custom_ai': 420},
+    'Rest of the World': {'bot_ui': 300, 'custom_ai': 420},
+}
+MESSAGE_TYPES = ['ai', 'advanced', 'basic_marketing', 'basic_utility']
+STAT_COLUMNS = PRICE_COLUMNS + [
+    'platform_fee', 'voice_notes_rate', 'committed_amount', 'bot_ui_manday_rate', 'custom_ai_manday_rate',
+]
+WEEKDAY_ORDER = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+ZERO_STAT = {'average': 0, 'min': 0, 'max': 0, 'median': 0}
+
+
+def list_price_frame(countries):
+    """Lookup frame (country x message type) of the highest slab price, 0.0 without slabs."""
+    from pricing_config import committed_amount_slabs
+    rows = {}
+    for country in countries:
+        slabs = committed_amount_slabs.get(country, committed_amount_slabs.get('Rest of the World', []))
+        rows[country] = [max([0.0] + [slab[2].get(msg_type, 0.0) for slab in slabs]) for msg_type in MESSAGE_TYPES]
+    return pd.DataFrame.from_dict(rows, orient='index', columns=MESSAGE_TYPES, dtype='float64')
+
+
+def numeric_values(df, column):
+    """Column as a float64 array, non-numeric values as NaN."""
+    return pd.to_numeric(df[column], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+
+def pairwise_sum(values, positions):
+    """Series.sum() over values[positions] (NaN skipped)."""
+    segment = values[positions]
+    return np.where(np.isnan(segment), 0.0, segment).sum()
+
+
+def pairwise_mean(values, positions):
+    """Series.dropna().mean() over values[positions]; NaN when nothing is left."""
+    segment = values[positions]
+    segment = segment[~np.isnan(segment)]
+    return segment.sum() / len(segment) if len(segment) else np.nan
+
+
+def discount_ratios(df):
+    """{summary key: (rate card - price) / rate card per row}, NaN where either is missing or the rate card is 0."""
+    ratios = {}
+    for msg_type in MESSAGE_TYPES:
+        actual, rate_card = f'{msg_type}_price', f'{msg_type}_rate_card_price'
+        if actual not in df.columns or rate_card not in df.columns:
+            ratios[f'{msg_type}_message'] = np.full(len(df), np.nan)
+            continue
+        price, rate = numeric_values(df, actual), numeric_values(df, rate_card)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratios[f'{msg_type}_message'] = np.where(rate != 0, (rate - price) / rate, np.nan)
+    return ratios
+
+
+def group_stats(df, keys, ratios, list_prices):
+    """
+    {group key: stats block} for df.groupby(keys): one named-aggregation groupby for
+    count/min/max/median/currency, averages and discounts over each group's rows.
+    """
+    columns = [c for c in STAT_COLUMNS if c in df.columns]
+    frame = pd.DataFrame({c: numeric_values(df, c) for c in columns}, index=df.index)
+    frame[keys] = df[keys]
+    aggregations = {'rows': (keys if isinstance(keys, str) else keys[0], 'size')}
+    for c in columns:
+        aggregations.update({
+            f'{c}_count': (c, 'count'), f'{c}_min': (c, 'min'), f'{c}_max': (c, 'max'), f'{c}_median': (c, 'median'),
+        })
+    if 'currency' in df.columns:
+        frame['currency'] = df['currency']
+        aggregations['currency'] = ('currency', 'first')  # first non-null
+    grouped = frame.groupby(keys, sort=True)
+    table = grouped.agg(**aggregations)
+    arrays = {c: frame[c].to_numpy() for c in columns}
+
+    blocks = {}
+    for key, positions in grouped.indices.items():
+        row = table.loc[key]
+        country = key if isinstance(keys, str) else key[0]
+
+        def stat(col):
+            if col not in arrays or row[f'{col}_count'] == 0:
+                return dict(ZERO_STAT)
+            return {
+                'average': float(pairwise_mean(arrays[col], positions)),
+                'min': float(row[f'{col}_min']),
+                'max': float(row[f'{col}_max']),
+                'median': float(row[f'{col}_median']),
+            }
+
+        discounts = {}
+        for name, values in ratios.items():
+            mean = pairwise_mean(values, positions)
+            discounts[name] = 0 if np.isnan(mean) else float(mean * 100)
+        discounts.update(bot_ui_manday_rate=0, custom_ai_manday_rate=0)
+        currency = row['currency'] if 'currency' in table.columns else np.nan
+        list_price = list_prices.loc[country]
+        blocks[key] = {
+            'currency': '' if pd.isna(currency) else currency,
+            'platform_fee': stat('platform_fee'),
+            'ai_message': dict(stat('ai_price'), list=float(list_price['ai'])),
+            'advanced_message': dict(stat('advanced_price'), list=float(list_price['advanced'])),
+            'basic_marketing_message': dict(stat('basic_marketing_price'), list=float(list_price['basic_marketing'])),
+            'basic_utility_message': dict(stat('basic_utility_price'), list=float(list_price['basic_utility'])),
+            'voice_notes_rate': stat('voice_notes_rate'),
+            'committed_amount': stat('committed_amount'),
+            'one_time_dev_cost': stat('bot_ui_manday_rate') if 'bot_ui_manday_rate' in arrays else {},
+            'bot_ui_manday_cost': stat('bot_ui_manday_rate'),
+            'custom_ai_manday_cost': stat('custom_ai_manday_rate'),
+            'discounts': discounts,
+        }
+    return blocks
+
+
+def value_counts_by_country(df, column, limit=None):
+    """
+    (global counts, {country: counts}) of column.astype(str) without '' values, ordered
+    like value_counts() (by count, ties in first-seen order); countries without values are left out.
+    """
+    values = df[column].astype(str).fillna('')
+    keep = (values != '').to_numpy()
+    overall = values[keep].value_counts()
+    if limit:
+        overall = overall.head(limit)
+    sizes = pd.DataFrame({'country': df['country'], 'value': values})[keep].groupby(
+        ['country', 'value'], sort=False
+    ).size()
+    by_country = {}
+    for country in sorted(sizes.index.unique(level=0)):
+        by_country[country] = sizes.xs(country, level=0).sort_values(ascending=False).to_dict()
+    return overall.to_dict(), by_country
+
+
+def _country_slice(series, country):
+    """series.xs(country) for a (country, ...) MultiIndex series; empty when the country has no rows."""
+    if country in series.index.unique(level=0):
+        return series.xs(country, level=0)
+    return series.iloc[:0].droplevel(0)
+
+
+def country_chart_arrays(df, countries):
+    """{country: chart arrays} (weekly revenue, CLV, service usage, manday efficiency, hours, weekdays, routes)."""
+    ts = df['timestamp']
+    country = df['country']
+    fee = df['platform_fee']
+
+    # Weekly revenue like resample('W'): stable time order, weeks end on Sunday
+    ordered = df[['country', 'timestamp', 'platform_fee']].sort_values('timestamp', kind='mergesort', na_position='first')
+    week = ordered['timestamp'].dt.normalize() + pd.to_timedelta(6 - ordered['timestamp'].dt.weekday, unit='D')
+    weekly = ordered.groupby(['country', week.rename('week')])['platform_fee'].sum()
+
+    clv = fee.groupby([country, df['user_name']]).sum()
+    hours = ts.groupby([country, ts.dt.hour.rename('hour')]).size()
+    nat_countries = set(country[ts.isna()].dropna())  # dt.hour is float where a country has NaT
+    weekdays = ts.groupby([country, ts.dt.day_name().rename('weekday')]).size()
+    route_revenue = fee.groupby([country, df['calculation_route']]).sum()
+    route_counts = df.groupby(['country', 'calculation_route'], sort=False).size()
+
+    # Manday efficiency: platform fee per manday for each user
+    fee_values = numeric_values(df, 'platform_fee')
+    mandays = (df['bot_ui_mandays'].fillna(0) + df['custom_ai_mandays'].fillna(0)).to_numpy(dtype='float64')
+    efficiency = {}
+    for (c, user), positions in df.groupby(['country', 'user_name'], sort=True).indices.items():
+        efficiency.setdefault(c, {})[user] = pairwise_sum(fee_values, positions) / (pairwise_sum(mandays, positions) or 1)
+
+    country_positions = df.groupby('country', sort=True).indices
+    arrays = {}
+    for c in countries:
+        weekly_revenue = _country_slice(weekly, c)
+        if len(weekly_revenue):
+            weeks = pd.date_range(weekly_revenue.index.min(), weekly_revenue.index.max(), freq='W-SUN')
+            weekly_revenue = weekly_revenue.reindex(weeks, fill_value=0)
+        clv_series = _country_slice(clv, c).sort_values(ascending=False).head(10)
+        usage = df[PRICE_COLUMNS].iloc[country_positions[c]].sum().sort_values(ascending=False)
+        efficiency_series = pd.Series(efficiency.get(c, {}), dtype='float64').sort_values(ascending=False).head(10)
+        hourly = _country_slice(hours, c)
+        hour_label = (lambda h: str(float(h))) if c in nat_countries else (lambda h: str(int(h)))
+        revenue = _country_slice(route_revenue, c).sort_values(ascending=False)
+        arrays[c] = {
+            'weekly_revenue': weekly_revenue.values.tolist(),
+            'weekly_revenue_labels': [d.strftime('%Y-%m-%d') for d in weekly_revenue.index],
+            'clv': clv_series.values.tolist(),
+            'clv_labels': clv_series.index.tolist(),
+            'service_usage': usage.values.tolist(),
+            'service_labels': usage.index.tolist(),
+            'manday_efficiency': efficiency_series.values.tolist(),
+            'manday_efficiency_labels': efficiency_series.index.tolist(),
+            'hourly_counts': hourly.values.tolist(),
+            'hourly_labels': [hour_label(h) + ':00' for h in hourly.index],
+            'weekday_counts': _country_slice(weekdays, c).reindex(WEEKDAY_ORDER).values.tolist(),
+            'weekday_labels': WEEKDAY_ORDER,
+            'route_revenue': revenue.values.tolist(),
+            'route_labels': revenue.index.tolist(),
+            'route_counts': _country_slice(route_counts, c).sort_values(ascending=False).values.tolist(),
+        }
+    return arrays
+
+
+def manday_rate_averages(df, countries):
+    """{country: {'bot_ui_manday_rate': {...}, 'custom_ai_manday_rate': {...}}} with list (rate card) and average."""
+    positions = df.groupby('country', sort=True).indices
+    rates = {}
+    for c in countries:
+        rates[c] = {}
+        for column, list_key in (('bot_ui_manday_rate', 'bot_ui'), ('custom_ai_manday_rate', 'custom_ai')):
+            average = float(pairwise_mean(numeric_values(df, column), positions[c])) if column in df.columns else 0
+            rates[c][column] = {'list': LIST_PRICES.get(c, {}).get(list_key, average), 'average': average}
+    return rates
+
+
+def build_summary(df):
+    """Dashboard summary (everything but the funnel) from the analytics rows."""
+    summary = {
+        'total_calculations': len(df),
+        'unique_users': df['user_name'].nunique(),
+        'total_revenue': df['platform_fee'].sum(),
+        'countries': df['country'].nunique(),
+        'last_updated': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'top_users': df.groupby('user_name')['platform_fee'].sum().sort_values(ascending=False).head(5).to_dict(),
+        'country_breakdown': df['country'].value_counts().to_dict(),
+        'route_breakdown': df['calculation_route'].value_counts().to_dict()
+    }
+
+    # --- AI model & complexity analytics for v2 dashboard ---
+    for column, key, limit in (('ai_agent_model', 'ai_model_counts', 10), ('ai_agent_complexity', 'ai_complexity_counts', None)):
+        if column in df.columns:
+            summary[f'{key}_global'], summary[f'{key}_by_country'] = value_counts_by_country(df, column, limit)
+        else:
+            summary[f'{key}_global'], summary[f'{key}_by_country'] = {}, {}
+
+    ratios = discount_ratios(df)
+    countries = sorted(df['country'].dropna().unique())
+    list_prices = list_price_frame(countries)
+
+    # Per-country stats
+    country_blocks = group_stats(df, 'country', ratios, list_prices)
+    charts = country_chart_arrays(df, countries)
+    manday_rates = manday_rate_averages(df, countries)
+    country_stats = {}
+    for country in countries:
+        print(f"Building stats for country: {country}")
+        country_stats[country] = {**country_blocks[country], **charts[country], **manday_rates[country]}
+
+    # Per-country, per-region stats
+    region_stats = {}
+    for (country, region), block in group_stats(df, ['country', 'region'], ratios, list_prices).items():
+        region_stats.setdefault(country, {})[region] = block
+
+    summary['country_stats'] = country_stats
+    summary['region_stats'] = region_stats
+    return summary
+
+
 def update_analytics_summary():
     """Update analytics summary data for the dashboard"""
     try:
         log_message("Updating analytics summary...")
         
-        df = pd.read_csv(CSV_PATH, parse_dates=['timestamp'])
+        df = load_analytics(SUMMARY_COLUMNS)
         
-        # Calculate summary statistics
-        summary = {
-            'total_calculations': len(df),
-            'unique_users': df['user_name'].nunique(),
-            'total_revenue': df['platform_fee'].sum(),
-            'countries': df['country'].nunique(),
-            'last_updated': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            'top_users': df.groupby('user_name')['platform_fee'].sum().sort_values(ascending=False).head(5).to_dict(),
-            'country_breakdown': df['country'].value_counts().to_dict(),
-            'route_breakdown': df['calculation_route'].value_counts().to_dict()
-        }
-
-        # --- AI model & complexity analytics for v2 dashboard ---
-        if 'ai_agent_model' in df.columns:
-            model_series = df['ai_agent_model'].astype(str).fillna('')
-            model_series = model_series[model_series != '']
-            summary['ai_model_counts_global'] = model_series.value_counts().head(10).to_dict()
-            ai_model_counts_by_country = {}
-            for country, group in df.groupby('country'):
-                if 'ai_agent_model' not in group.columns:
-                    continue
-                s = group['ai_agent_model'].astype(str).fillna('')
-                s = s[s != '']
-                if not s.empty:
-                    ai_model_counts_by_country[country] = s.value_counts().to_dict()
-            summary['ai_model_counts_by_country'] = ai_model_counts_by_country
-        else:
-            summary['ai_model_counts_global'] = {}
-            summary['ai_model_counts_by_country'] = {}
-
-        if 'ai_agent_complexity' in df.columns:
-            comp_series = df['ai_agent_complexity'].astype(str).fillna('')
-            comp_series = comp_series[comp_series != '']
-            summary['ai_complexity_counts_global'] = comp_series.value_counts().to_dict()
-            ai_complexity_counts_by_country = {}
-            for country, group in df.groupby('country'):
-                if 'ai_agent_complexity' not in group.columns:
-                    continue
-                s = group['ai_agent_complexity'].astype(str).fillna('')
-                s = s[s != '']
-                if not s.empty:
-                    ai_complexity_counts_by_country[country] = s.value_counts().to_dict()
-            summary['ai_complexity_counts_by_country'] = ai_complexity_counts_by_country
-        else:
-            summary['ai_complexity_counts_global'] = {}
-            summary['ai_complexity_counts_by_country'] = {}
-
-        # Per-country stats
-        country_stats = {}
-        region_stats = {}
-        # Define rate card (list) prices for each country (from pricing_config.py)
-        LIST_PRICES = {
-            'India': {'bot_ui': 20000, 'custom_ai': 30000},
-            'LATAM': {'bot_ui': 580, 'custom_ai': 750},
-            'MENA': {'bot_ui': 300, 'custom_ai': 500},
-            'Africa': {'bot_ui': 300, 'custom_ai': 420},
-            'Europe': {'bot_ui': 300, 'custom_ai': 420},
-            'Rest of the World': {'bot_ui': 300, 'custom_ai': 420},
-        }
-        from pricing_config import committed_amount_slabs
-        def get_list_price(country, msg_type):
-            slabs = committed_amount_slabs.get(country, committed_amount_slabs.get('Rest of the World', []))
-            if not slabs:
-                return 0.0
-            # Find the highest price for the message type across all slabs (usually the first slab, lowest committed amount)
-            max_price = 0.0
-            for slab in slabs:
-                price = slab[2].get(msg_type, 0.0)
-                if price > max_price:
-                    max_price = price
-            return max_price
-        for country, group in df.groupby('country'):
-            currency = group['currency'].dropna().iloc[0] if 'currency' in group and not group['currency'].dropna().empty else ''
-            # --- Per-country arrays for charts ---
-            # Weekly revenue
-            group['timestamp'] = pd.to_datetime(group['timestamp'], errors='coerce')
-            weekly_revenue = group.set_index('timestamp')['platform_fee'].resample('W').sum()
-            weekly_revenue_labels = [d.strftime('%Y-%m-%d') for d in weekly_revenue.index]
-            # CLV
-            clv_series = group.groupby('user_name')['platform_fee'].sum().sort_values(ascending=False).head(10)
-            clv = clv_series.values.tolist()
-            clv_labels = clv_series.index.tolist()
-            # Service usage
-            service_cols = ['ai_price', 'advanced_price', 'basic_marketing_price', 'basic_utility_price']
-            service_usage_series = group[service_cols].sum().sort_values(ascending=False)
-            service_usage = service_usage_series.values.tolist()
-            service_labels = service_usage_series.index.tolist()
-            # Manday efficiency
-            group['total_mandays'] = group['bot_ui_mandays'].fillna(0) + group['custom_ai_mandays'].fillna(0)
-            manday_efficiency_series = group.groupby('user_name').apply(lambda x: x['platform_fee'].sum() / (x['total_mandays'].sum() or 1)).sort_values(ascending=False).head(10)
-            manday_efficiency = manday_efficiency_series.values.tolist()
-            manday_efficiency_labels = manday_efficiency_series.index.tolist()
-            # Hourly counts
-            group['hour'] = group['timestamp'].dt.hour
-            hourly_counts_series = group['hour'].value_counts().sort_index()
-            hourly_counts = hourly_counts_series.values.tolist()
-            hourly_labels = [str(h) + ':00' for h in hourly_counts_series.index]
-            # Weekday counts
-            group['weekday'] = group['timestamp'].dt.day_name()
-            weekday_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-            weekday_counts_series = group['weekday'].value_counts().reindex(weekday_order)
-            weekday_counts = weekday_counts_series.values.tolist()
-            weekday_labels = weekday_order
-            # Route revenue
-            route_revenue_series = group.groupby('calculation_route')['platform_fee'].sum().sort_values(ascending=False)
-            route_revenue = route_revenue_series.values.tolist()
-            route_labels = route_revenue_series.index.tolist()
-            # Route counts
-            route_counts_series = group['calculation_route'].value_counts()
-            route_counts = route_counts_series.values.tolist()
-            # Manday rates (list and average)
-            if country == 'LATAM':
-                list_bot = LIST_PRICES.get(country, {}).get('bot_ui', float(group['bot_ui_manday_rate'].dropna().mean()) if 'bot_ui_manday_rate' in group else 0)
-                list_ai = LIST_PRICES.get(country, {}).get('custom_ai', float(group['custom_ai_manday_rate'].dropna().mean()) if 'custom_ai_manday_rate' in group else 0)
-            else:
-                list_bot = LIST_PRICES.get(country, {}).get('bot_ui', float(group['bot_ui_manday_rate'].dropna().mean()) if 'bot_ui_manday_rate' in group else 0)
-                list_ai = LIST_PRICES.get(country, {}).get('custom_ai', float(group['custom_ai_manday_rate'].dropna().mean()) if 'custom_ai_manday_rate' in group else 0)
-            avg_bot = float(group['bot_ui_manday_rate'].dropna().mean()) if 'bot_ui_manday_rate' in group else 0
-            avg_ai = float(group['custom_ai_manday_rate'].dropna().mean()) if 'custom_ai_manday_rate' in group else 0
-            bot_ui_manday_rate = {
-                'list': list_bot,
-                'average': avg_bot
-            }
-            custom_ai_manday_rate = {
-                'list': list_ai,
-                'average': avg_ai
-            }
-            # Restore stat function for summary stats
-            def stat(col):
-                if col not in group.columns:
-                    return {'average': 0, 'min': 0, 'max': 0, 'median': 0}
-                try:
-                    vals = pd.to_numeric(group[col], errors='coerce').dropna()
-                    if vals.empty:
-                        return {'average': 0, 'min': 0, 'max': 0, 'median': 0}
-                    return {
-                        'average': float(vals.mean()),
-                        'min': float(vals.min()),
-                        'max': float(vals.max()),
-                        'median': float(vals.median())
-                    }
-                except Exception as e:
-                    print(f"Error in stat() for column '{col}' in country '{country}': {e}")
-                    return {'average': 0, 'min': 0, 'max': 0, 'median': 0}
-            # Restore avg_discount function for discount calculations
-            def avg_discount(actual, rate_card):
-                try:
-                    if actual not in group.columns or rate_card not in group.columns:
-                        return 0
-                    vals = group[[actual, rate_card]].dropna()
-                    vals = vals[pd.to_numeric(vals[rate_card], errors='coerce') != 0]
-                    vals[actual] = pd.to_numeric(vals[actual], errors='coerce')
-                    vals[rate_card] = pd.to_numeric(vals[rate_card], errors='coerce')
-                    valid = vals.dropna()
-                    if valid.empty:
-                        return 0
-                    return float(((valid[rate_card] - valid[actual]) / valid[rate_card]).mean() * 100)
-                except Exception as e:
-                    print(f"Error in avg_discount() for columns '{actual}', '{rate_card}' in country '{country}': {e}")
-                    return 0
-            print(f"Building stats for country: {country}")
-            country_stats[country] = {
-                'currency': currency,
-                'platform_fee': stat('platform_fee'),
-                'ai_message': dict(stat('ai_price'), list=get_list_price(country, 'ai')),
-                'advanced_message': dict(stat('advanced_price'), list=get_list_price(country, 'advanced')),
-                'basic_marketing_message': dict(stat('basic_marketing_price'), list=get_list_price(country, 'basic_marketing')),
-                'basic_utility_message': dict(stat('basic_utility_price'), list=get_list_price(country, 'basic_utility')),
-                'voice_notes_rate': stat('voice_notes_rate'),
-                'committed_amount': stat('committed_amount'),
-                'one_time_dev_cost': stat('bot_ui_manday_rate') if 'bot_ui_manday_rate' in group else {},
-                'bot_ui_manday_cost': stat('bot_ui_manday_rate'),
-                'custom_ai_manday_cost': stat('custom_ai_manday_rate'),
-                'discounts': {
-                    'ai_message': avg_discount('ai_price', 'ai_rate_card_price'),
-                    'advanced_message': avg_discount('advanced_price', 'advanced_rate_card_price'),
-                    'basic_marketing_message': avg_discount('basic_marketing_price', 'basic_marketing_rate_card_price'),
-                    'basic_utility_message': avg_discount('basic_utility_price', 'basic_utility_rate_card_price'),
-                    'bot_ui_manday_rate': 0,
-                    'custom_ai_manday_rate': 0,
-                },
-                # --- Per-country arrays for charts ---
-                'weekly_revenue': weekly_revenue.values.tolist(),
-                'weekly_revenue_labels': weekly_revenue_labels,
-                'clv': clv,
-                'clv_labels': clv_labels,
-                'service_usage': service_usage,
-                'service_labels': service_labels,
-                'manday_efficiency': manday_efficiency,
-                'manday_efficiency_labels': manday_efficiency_labels,
-                'hourly_counts': hourly_counts,
-                'hourly_labels': hourly_labels,
-                'weekday_counts': weekday_counts,
-                'weekday_labels': weekday_labels,
-                'route_revenue': route_revenue,
-                'route_labels': route_labels,
-                'route_counts': route_counts,
-                'bot_ui_manday_rate': bot_ui_manday_rate,
-                'custom_ai_manday_rate': custom_ai_manday_rate
-            }
-        # Per-country, per-region stats
-        for (country, region), group in df.groupby(['country', 'region']):
-            currency = group['currency'].dropna().iloc[0] if 'currency' in group and not group['currency'].dropna().empty else ''
-            def stat(col):
-                if col not in group.columns:
-                    return {'average': 0, 'min': 0, 'max': 0, 'median': 0}
-                try:
-                    vals = pd.to_numeric(group[col], errors='coerce').dropna()
-                    if vals.empty:
-                        return {'average': 0, 'min': 0, 'max': 0, 'median': 0}
-                    return {
-                        'average': float(vals.mean()),
-                        'min': float(vals.min()),
-                        'max': float(vals.max()),
-                        'median': float(vals.median())
-                    }
-                except Exception as e:
-                    print(f"Error in stat() for column '{col}' in country '{country}', region '{region}': {e}")
-                    return {'average': 0, 'min': 0, 'max': 0, 'median': 0}
-            def avg_discount(actual, rate_card):
-                try:
-                    if actual not in group.columns or rate_card not in group.columns:
-                        return 0
-                    vals = group[[actual, rate_card]].dropna()
-                    vals = vals[pd.to_numeric(vals[rate_card], errors='coerce') != 0]
-                    vals[actual] = pd.to_numeric(vals[actual], errors='coerce')
-                    vals[rate_card] = pd.to_numeric(vals[rate_card], errors='coerce')
-                    valid = vals.dropna()
-                    if valid.empty:
-                        return 0
-                    return float(((valid[rate_card] - valid[actual]) / valid[rate_card]).mean() * 100)
-                except Exception as e:
-                    print(f"Error in avg_discount() for columns '{actual}', '{rate_card}' in country '{country}', region '{region}': {e}")
-                    return 0
-            if country not in region_stats:
-                region_stats[country] = {}
-            region_stats[country][region] = {
-                'currency': currency,
-                'platform_fee': stat('platform_fee'),
-                'ai_message': dict(stat('ai_price'), list=get_list_price(country, 'ai')),
-                'advanced_message': dict(stat('advanced_price'), list=get_list_price(country, 'advanced')),
-                'basic_marketing_message': dict(stat('basic_marketing_price'), list=get_list_price(country, 'basic_marketing')),
-                'basic_utility_message': dict(stat('basic_utility_price'), list=get_list_price(country, 'basic_utility')),
-                'voice_notes_rate': stat('voice_notes_rate'),
-                'committed_amount': stat('committed_amount'),
-                'one_time_dev_cost': stat('bot_ui_manday_rate') if 'bot_ui_manday_rate' in group else {},
-                'bot_ui_manday_cost': stat('bot_ui_manday_rate'),
-                'custom_ai_manday_cost': stat('custom_ai_manday_rate'),
-                'discounts': {
-                    'ai_message': avg_discount('ai_price', 'ai_rate_card_price'),
-                    'advanced_message': avg_discount('advanced_price', 'advanced_rate_card_price'),
-                    'basic_marketing_message': avg_discount('basic_marketing_price', 'basic_marketing_rate_card_price'),
-                    'basic_utility_message': avg_discount('basic_utility_price', 'basic_utility_rate_card_price'),
-                    'bot_ui_manday_rate': 0,
-                    'custom_ai_manday_rate': 0,
-                },
-            }
-        summary['country_stats'] = country_stats
-        summary['region_stats'] = region_stats
+        summary = build_summary(df)
 
         # --- Funnel analytics (volumes -> prices -> results -> SOW) ---
         funnel_counts = {
@@ -596,8 +799,12 @@ def update_analytics_summary():
         }
         funnel_conversion = {}
         try:
-            if os.path.exists(FUNNEL_CSV_PATH):
-                fdf = pd.read_csv(FUNNEL_CSV_PATH, parse_dates=['timestamp'])
+            funnel_exported = (
+                os.path.isdir(os.path.join(STORE_DIR, "funnel_events")) if use_incremental_store()
+                else os.path.exists(FUNNEL_CSV_PATH)
+            )
+            if funnel_exported:
+                fdf = load_analytics(['timestamp', 'step'], table="funnel_events")
                 if 'step' in fdf.columns:
                     for step in funnel_counts.keys():
                         funnel_counts[step] = int((fdf['step'] == step).sum())
@@ -620,6 +827,7 @@ def update_analytics_summary():
             'counts': funnel_counts,
             'conversion': funnel_conversion,
         }
+        country_stats = summary['country_stats']
         # Add aggregate arrays for Distribution by Country
         summary['platform_fee_by_country'] = [country_stats[c]['platform_fee']['average'] for c in country_stats]
         summary['ai_message_by_country'] = [country_stats[c]['ai_message']['average'] for c in country_stats]
@@ -630,6 +838,8 @@ def update_analytics_summary():
         summary = clean_nans(summary)
         with open(summary_path, 'w') as f:
             json.dump(summary, f, indent=2, default=str)
+        manifest = write_summary_artifacts(summary)
+        log_message(f"Summary artifacts written (version {manifest['version']})")
         
         log_message("Analytics summary updated successfully")
         return True
@@ -638,6 +848,50 @@ def update_analytics_summary():
         log_message(f"Error updating analytics summary: {e}")
         return False
 
+def write_summary_artifacts(summary, directory=None):
+    """
+    Write each SUMMARY_SECTIONS slice of the (NaN-cleaned) summary as
+    <section>.<sha256[:16]>.json.gz, then swap in manifest.json listing them.
+    Files from the previous manifest are kept for requests already in flight;
+    older ones are removed. Returns the manifest.
+    """
+    directory = directory or SUMMARY_DIR
+    os.makedirs(directory, exist_ok=True)
+    manifest_path = os.path.join(directory, 'manifest.json')
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+    except (FileNotFoundError, ValueError):
+        previous = {'sections': {}}
+
+    sections = {}
+    for name, keys in SUMMARY_SECTIONS.items():
+        body = json.dumps({k: summary[k] for k in keys if k in summary},
+                          separators=(',', ':'), ensure_ascii=False, default=str).encode('utf-8')
+        digest = hashlib.sha256(body).hexdigest()[:16]
+        filename = f'{name}.{digest}.json.gz'
+        path = os.path.join(directory, filename)
+        if not os.path.exists(path):
+            with open(f'{path}.tmp', 'wb') as f:
+                f.write(gzip.compress(body, compresslevel=9, mtime=0))
+            os.replace(f'{path}.tmp', path)
+        sections[name] = {'file': filename, 'etag': digest, 'bytes': len(body), 'gzip_bytes': os.path.getsize(path)}
+
+    manifest = {
+        'version': hashlib.sha256(''.join(s['etag'] for s in sections.values()).encode()).hexdigest()[:16],
+        'generated_at': summary.get('last_updated'),
+        'sections': sections,
+    }
+    with open(f'{manifest_path}.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f'{manifest_path}.tmp', manifest_path)
+
+    keep = {s['file'] for s in sections.values()} | {s.get('file') for s in previous.get('sections', {}).values()}
+    for filename in os.listdir(directory):
+        if filename.endswith('.json.gz') and filename not in keep:
+            os.remove(os.path.join(directory, filename))
+    return manifest
+
 def clean_nans(obj):
     if isinstance(obj, float) and (math.isnan(obj) or math.isinf(obj)):
         return None
@@ -656,11 +910,20 @@ def main():
     os.chdir(PROJECT_ROOT)
     
     # Step 1: Export data from PostgreSQL
-    if not export_analytics_to_csv():
-        log_message("Failed to export CSV. Exiting.")
-        sys.exit(1)
-    # Export funnel events (non-fatal if missing)
-    export_funnel_to_csv()
+    if EXPORT_MODE == "incremental" and MonthlyParquetStore is None:
+        log_message("pyarrow is not installed; falling back to full CSV export")
+    if use_incremental_store():
+        if not export_incremental():
+            log_message("Failed incremental export. Exiting.")
+            sys.exit(1)
+    else:
+        if not export_analytics_to_csv():
+            log_message("Failed to export CSV. Exiting.")
+            sys.exit(1)
+        # Export funnel events (non-fatal if missing)
+        export_funnel_to_csv()
+    # Incremental rollups for the /analytics dashboard (non-fatal)
+    refresh_rollup_tables()
     print(f"[DEBUG] After DB export: {time.time() - start_time:.3f} seconds elapsed")
     
     # Step 2: Generate analytics charts
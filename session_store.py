@@ -0,0 +1,260 @@
+# session_store.py
+
+# --- Server-side session storage ---
+# Keeps only an opaque session id in the cookie. The session dict itself lives
+# in a local store (SQLite or one file per session) with TTL eviction, so large
+# quotes (results, inclusions, voice pricing, SOW details) no longer ride along
+# on every request or get truncated by browser cookie limits.
+
+import os
+import re
+import secrets
+import sqlite3
+import tempfile
+import threading
+import time
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+# Opaque ids are secrets.token_urlsafe(32); anything else in the cookie is ignored
+_SID_RE = re.compile(r'^[A-Za-z0-9_-]{32,128}$')
+
+# How often (seconds) a store sweeps expired sessions during normal writes
+CLEANUP_INTERVAL = 300
+
+
+def _new_sid():
+    return secrets.token_urlsafe(32)
+
+
+def _valid_sid(sid):
+    return bool(sid and _SID_RE.match(sid))
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session dict backed by a server-side store; only .sid goes in the cookie."""
+
+    def __init__(self, initial=None, sid=None, new=False, expires_at=0):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.expires_at = expires_at
+        self.modified = False
+
+
+class SQLiteSessionStore:
+    """Sessions in a local SQLite file (shared by all gunicorn workers on the host)."""
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._next_cleanup = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS sessions ('
+            ' sid TEXT PRIMARY KEY,'
+            ' payload TEXT NOT NULL,'
+            ' expires_at REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_sessions_expires_at ON sessions (expires_at)')
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            self._local.conn = conn
+        return conn
+
+    def get(self, sid):
+        """(payload, expires_at) for a live session, else None."""
+        row = self._conn().execute(
+            'SELECT payload, expires_at FROM sessions WHERE sid = ? AND expires_at > ?', (sid, time.time())
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def set(self, sid, payload):
+        conn = self._conn()
+        conn.execute(
+            'INSERT OR REPLACE INTO sessions (sid, payload, expires_at) VALUES (?, ?, ?)',
+            (sid, payload, time.time() + self.ttl),
+        )
+        conn.commit()
+        self._maybe_cleanup()
+
+    def touch(self, sid):
+        conn = self._conn()
+        conn.execute('UPDATE sessions SET expires_at = ? WHERE sid = ?', (time.time() + self.ttl, sid))
+        conn.commit()
+
+    def delete(self, sid):
+        conn = self._conn()
+        conn.execute('DELETE FROM sessions WHERE sid = ?', (sid,))
+        conn.commit()
+
+    def cleanup(self):
+        """Delete expired sessions; returns how many were removed."""
+        conn = self._conn()
+        removed = conn.execute('DELETE FROM sessions WHERE expires_at <= ?', (time.time(),)).rowcount
+        conn.commit()
+        return removed
+
+    def _maybe_cleanup(self):
+        now = time.time()
+        if now >= self._next_cleanup:
+            self._next_cleanup = now + CLEANUP_INTERVAL
+            self.cleanup()
+
+
+class FileSystemSessionStore:
+    """One file per session; expiry is the file's mtime + ttl."""
+
+    def __init__(self, directory, ttl):
+        self.directory = directory
+        self.ttl = ttl
+        self._next_cleanup = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, sid):
+        return os.path.join(self.directory, f"{sid}.session")
+
+    def get(self, sid):
+        """(payload, expires_at) for a live session, else None."""
+        path = self._path(sid)
+        try:
+            expires_at = os.path.getmtime(path) + self.ttl
+            if expires_at <= time.time():
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                return f.read(), expires_at
+        except OSError:
+            return None
+
+    def set(self, sid, payload):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(payload)
+            os.replace(tmp_path, self._path(sid))
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        self._maybe_cleanup()
+
+    def touch(self, sid):
+        try:
+            os.utime(self._path(sid))
+        except OSError:
+            pass
+
+    def delete(self, sid):
+        try:
+            os.remove(self._path(sid))
+        except OSError:
+            pass
+
+    def cleanup(self):
+        """Delete expired session files; returns how many were removed."""
+        removed = 0
+        cutoff = time.time() - self.ttl
+        for name in os.listdir(self.directory):
+            if not name.endswith('.session'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) <= cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def _maybe_cleanup(self):
+        now = time.time()
+        if now >= self._next_cleanup:
+            self._next_cleanup = now + CLEANUP_INTERVAL
+            self.cleanup()
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Flask session interface that stores session data in a SessionStore."""
+
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if _valid_sid(sid):
+            stored = self.store.get(sid)
+            if stored is not None:
+                payload, expires_at = stored
+                try:
+                    return ServerSideSession(self.serializer.loads(payload), sid=sid, expires_at=expires_at)
+                except Exception:
+                    pass
+        return ServerSideSession(sid=_new_sid(), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if not session:
+            # Emptied (e.g. logout) or never used: drop the stored copy and the cookie
+            if not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(
+                    name, domain=domain, path=path, secure=secure, samesite=samesite, httponly=httponly
+                )
+            return
+
+        response.vary.add('Cookie')
+        if session.modified or session.new:
+            self.store.set(session.sid, self.serializer.dumps(dict(session)))
+        elif session.expires_at - time.time() < self.store.ttl / 2:
+            # Sliding expiry without a write on every request (static assets included)
+            self.store.touch(session.sid)
+        if session.new or self.should_set_cookie(app, session):
+            response.set_cookie(
+                name,
+                session.sid,
+                expires=self.get_expiration_time(app, session),
+                httponly=httponly,
+                domain=domain,
+                path=path,
+                secure=secure,
+                samesite=samesite,
+            )
+
+
+def create_session_interface(backend, path, ttl):
+    """
+    Session interface for a backend name: 'sqlite' (path is the database file) or
+    'filesystem' (path is a directory). Returns None for 'cookie' (Flask's default).
+    """
+    backend = (backend or 'cookie').strip().lower()
+    if backend == 'cookie':
+        return None
+    if backend == 'sqlite':
+        return ServerSideSessionInterface(SQLiteSessionStore(path, ttl))
+    if backend == 'filesystem':
+        return ServerSideSessionInterface(FileSystemSessionStore(path, ttl))
+    raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
@@ -0,0 +1,116 @@
+# sow_cache.py
+
+# --- Generated SOW cache ---
+# Users download the SOW for the same calculation again and again. Generated
+# .docx bytes are stored on local disk under a content hash of everything that
+# goes into the document (see key()), so a repeat download is a file response and
+# nothing is rebuilt until an input changes. The directory is bounded in bytes;
+# hits refresh a file's mtime and the least recently used files are evicted first.
+# Files are written to a temp name and renamed, so workers sharing the directory
+# never see a partial document. Responses send an open handle rather than a path:
+# another worker may evict the file at any time, and an open file outlives its unlink.
+
+import io
+import os
+import tempfile
+import threading
+
+from result_cache import canonical_hash
+
+
+class SowArtifactCache:
+    """Size-bounded, least-recently-used directory of generated SOW documents."""
+
+    def __init__(self, directory, max_bytes=200 * 1024 * 1024, suffix='.docx'):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._building = {}  # key -> lock, so one thread builds while the others wait
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(*parts):
+        """Content hash of the document inputs (JSON-able parts)."""
+        return canonical_hash(*parts)
+
+    def path(self, key):
+        return os.path.join(self.directory, f'{key}{self.suffix}')
+
+    def get(self, key):
+        """Path of the cached document, or None; a hit marks it most recently used."""
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def open(self, key):
+        """Open binary handle on the cached document, or None if it is not cached."""
+        path = self.get(key)
+        if path is None:
+            return None
+        try:
+            return open(path, 'rb')
+        except FileNotFoundError:  # evicted since get()
+            return None
+
+    def put(self, key, data):
+        """Store document bytes under key and evict down to max_bytes. Returns the path."""
+        path = self.path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._evict(keep=path)
+        return path
+
+    def get_or_build(self, key, build):
+        """Path of the cached document, calling build() -> bytes only on a miss."""
+        path = self.get(key)
+        if path is not None:
+            self.hits += 1
+            return path
+        with self._lock:
+            key_lock = self._building.setdefault(key, threading.Lock())
+        with key_lock:
+            path = self.get(key)  # built by another thread while we waited
+            if path is None:
+                self.misses += 1
+                path = self.put(key, build())
+            else:
+                self.hits += 1
+        with self._lock:
+            self._building.pop(key, None)
+        return path
+
+    def open_or_build(self, key, build, attempts=3):
+        """Open binary handle on the cached document, rebuilding it if it was evicted
+        before it could be opened; falls back to an in-memory copy after `attempts` tries."""
+        for _attempt in range(attempts):
+            try:
+                return open(self.get_or_build(key, build), 'rb')
+            except FileNotFoundError:
+                continue
+        return io.BytesIO(build())
+
+    def _evict(self, keep):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.suffix) and entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _mtime, size, _path in entries)
+        for _mtime, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -0,0 +1,90 @@
+# sow_jobs.py
+
+# --- Background SOW builds ---
+# Building a large SOW ties up a gunicorn worker for the whole build. The
+# sow_details page now submits a job here and polls it. Jobs run on a small
+# thread pool (max_workers) behind a bounded backlog (max_pending), so SOW
+# builds cannot crowd out calculator requests; submit() raises QueueFull when
+# the backlog is full. A job's id is the SOW cache key, so resubmitting the same
+# document joins the job that is already queued or running instead of building
+# it twice. Finished jobs are forgotten after keep_seconds; the document itself
+# stays in the SOW cache.
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+
+class QueueFull(Exception):
+    """Too many SOW builds are already waiting."""
+
+
+class SowJob:
+    __slots__ = ('id', 'status', 'path', 'error', 'meta', 'created', 'finished')
+
+    def __init__(self, job_id, meta=None):
+        self.id = job_id
+        self.status = QUEUED
+        self.path = None
+        self.error = None
+        self.meta = meta or {}
+        self.created = time.time()
+        self.finished = None
+
+    def to_dict(self):
+        return {'job_id': self.id, 'status': self.status, 'error': self.error}
+
+
+class SowJobQueue:
+    """In-process job runner: bounded thread pool plus a bounded backlog of pending builds."""
+
+    def __init__(self, max_workers=1, max_pending=16, keep_seconds=3600):
+        self.max_pending = max_pending
+        self.keep_seconds = keep_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sow-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, job_id, build, meta=None):
+        """
+        Queue build() -> document path under job_id (or return the live job with that id).
+        Raises QueueFull when max_pending builds are already queued or running.
+        """
+        with self._lock:
+            self._prune()
+            job = self._jobs.get(job_id)
+            if job is not None and job.status != FAILED:
+                return job
+            pending = sum(1 for j in self._jobs.values() if j.status in (QUEUED, RUNNING))
+            if pending >= self.max_pending:
+                raise QueueFull(f"{pending} SOW builds already pending")
+            job = self._jobs[job_id] = SowJob(job_id, meta)
+        self._executor.submit(self._run, job, build)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job, build):
+        job.status = RUNNING
+        try:
+            job.path = build()
+            job.status = DONE
+        except Exception as exc:
+            logger.exception("SOW job %s failed", job.id)
+            job.error = str(exc) or type(exc).__name__
+            job.status = FAILED
+        finally:
+            job.finished = time.time()
+
+    def _prune(self):
+        # Caller holds the lock
+        cutoff = time.time() - self.keep_seconds
+        for job_id in [j.id for j in self._jobs.values() if j.finished is not None and j.finished < cutoff]:
+            del self._jobs[job_id]
@@ -0,0 +1,105 @@
+# sow_template.py
+
+# --- Parsed SOW master template ---
+# Every SOW download used to unzip and XML-parse the master .docx and then
+# rescan every table's cell text for each section it filled. SowTemplate parses
+# the template once per worker (again only if the file changes on disk), indexes
+# its tables by header-row text and by first-cell label per row, and hands each
+# request a deep copy. Lookups on the copy are dict hits against that index.
+
+import copy
+import hashlib
+import os
+import threading
+from collections import defaultdict
+from io import BytesIO
+
+from docx import Document
+
+
+def _row_text(table, row_idx):
+    if row_idx >= len(table.rows):
+        return []
+    return [cell.text.strip() for cell in table.rows[row_idx].cells]
+
+
+class SowTemplate:
+    """The master template, parsed once and cloned per request."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.version = None  # sha256 of the template file
+        self._mtime = None
+        self._document = None
+        self._headers = {}  # header cell text -> table ordinals (row 0)
+        self._labels = {}  # (row index, first cell text) -> table ordinals
+        self._lock = threading.Lock()
+
+    def _load(self):
+        # Caller holds the lock
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime == self._mtime:
+            return
+        with open(self.path, 'rb') as f:
+            raw = f.read()
+        # The index comes from a separate parse: python-docx caches wrappers around
+        # sub-elements (e.g. the body) once they are accessed, and a deep copy of such
+        # a Document edits a different tree than the one it saves. The copied one
+        # stays untouched.
+        indexed = Document(BytesIO(raw))
+        headers, labels = defaultdict(list), defaultdict(list)
+        for ordinal, table in enumerate(indexed.tables):
+            for text in dict.fromkeys(_row_text(table, 0)):
+                headers[text].append(ordinal)
+            for row_idx in range(len(table.rows)):
+                row = _row_text(table, row_idx)
+                if row:
+                    labels[(row_idx, row[0])].append(ordinal)
+        self._document, self._headers, self._labels = Document(BytesIO(raw)), dict(headers), dict(labels)
+        self.version = hashlib.sha256(raw).hexdigest()
+        self._mtime = mtime
+
+    def current_version(self):
+        """sha256 of the template as it is on disk now (parsed if it changed)."""
+        with self._lock:
+            self._load()
+            return self.version
+
+    def new_document(self):
+        """A SowDocument wrapping a fresh deep copy of the template."""
+        with self._lock:
+            self._load()
+            return SowDocument(copy.deepcopy(self._document), self._headers, self._labels)
+
+
+class SowDocument:
+    """
+    One request's copy of the template. Table lookups use the template's index
+    and skip tables that have since been removed from this copy.
+    """
+
+    def __init__(self, doc, headers, labels):
+        self.doc = doc
+        self._tables = doc.tables  # same order as when the index was built
+        self._headers = headers
+        self._labels = labels
+
+    def _attached(self, ordinals):
+        return [self._tables[i] for i in ordinals if self._tables[i]._tbl.getparent() is not None]
+
+    def tables_by_headers(self, headers):
+        """Tables whose first row contains every header."""
+        candidates = None
+        for header in headers:
+            ordinals = set(self._headers.get(header, ()))
+            candidates = ordinals if candidates is None else candidates & ordinals
+        return self._attached(sorted(candidates or ()))
+
+    def table_by_headers(self, headers):
+        matches = self.tables_by_headers(headers)
+        return matches[0] if matches else None
+
+    def table_by_row_label(self, label, row_idx=1):
+        """First table whose row `row_idx` starts with `label`."""
+        matches = self._attached(self._labels.get((row_idx, label), ()))
+        return matches[0] if matches else None
@@ -1,6 +1,21 @@
+import os
+import tempfile
+
 import pytest
 
-from app import app
+# Analytics rows are written synchronously in tests (no writer thread, no atexit flush),
+# and anything that fails to write is journaled to a throwaway directory.
+os.environ.setdefault("ANALYTICS_ASYNC", "0")
+os.environ.setdefault("ANALYTICS_JOURNAL_PATH", os.path.join(tempfile.mkdtemp(), "analytics.jsonl"))
+
+from app import ANALYTICS_WRITER, app  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def analytics_writer():
+    """Stop the analytics writer when the test session ends."""
+    yield ANALYTICS_WRITER
+    ANALYTICS_WRITER.close(timeout=5)
 
 
 @pytest.fixture(scope="session")
@@ -0,0 +1,19 @@
+"""Precomputed AI price table must agree with compute_ai_price_components."""
+
+import pytest
+
+from calculator import calculate_ai_price_table
+from pricing_config import compute_ai_price_components
+
+
+@pytest.mark.parametrize('country', ['India', 'MENA', 'Europe'])
+@pytest.mark.parametrize('tier_markup', [0.0, 0.0105, 1.0, 5.0])
+def test_table_matches_scalar(country, tier_markup):
+    table = calculate_ai_price_table(country, tier_markup)
+    assert table
+    for model, complexities in table.items():
+        for complexity, row in complexities.items():
+            scalar = compute_ai_price_components(country, model, complexity, tier_markup)
+            assert row['final_price'] == scalar['final_price']
+            assert row['markup'] == scalar['markup']
+            assert row['used_model'] == scalar['used_model']
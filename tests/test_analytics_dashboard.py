@@ -0,0 +1,83 @@
+"""The /analytics dashboard aggregations compile to PostgreSQL and keep the template's shape.
+
+Production runs on PostgreSQL (percentile_cont, mode() WITHIN GROUP, corr, FILTER);
+here every query is compiled for that dialect instead of executed.
+"""
+
+import collections
+from datetime import datetime
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Query
+
+import app as app_module
+
+
+class _EmptyAggregateRow:
+    """What a single-row aggregate returns over an empty table: 0 counts, NULL everything else."""
+
+    def __init__(self, names):
+        self._mapping = collections.defaultdict(lambda: None)
+        for name in names:
+            if name in ("total", "calculations") or name.endswith(("count", "_usage", "_triggered")) or "_b" in name:
+                self._mapping[name] = 0
+
+    def __getattr__(self, name):
+        return self._mapping[name]
+
+
+def test_dashboard_queries_compile_for_postgres(monkeypatch, app_ctx):
+    statements = []
+
+    def _compile(query):
+        statements.append(str(query.statement.compile(dialect=postgresql.dialect())))
+
+    monkeypatch.setattr(Query, "all", lambda self: (_compile(self), [])[1])
+    monkeypatch.setattr(
+        Query, "one",
+        lambda self: (_compile(self), _EmptyAggregateRow([c["name"] for c in self.column_descriptions]))[1],
+    )
+    monkeypatch.setattr(app_module, "get_top_users", lambda: [])
+
+    dashboard = app_module.build_analytics_dashboard()
+
+    sql = "\n".join(statements)
+    assert "SELECT * FROM analytics" not in sql
+    assert "percentile_cont" in sql and "mode() WITHIN GROUP" in sql and "corr(" in sql
+    # A fixed number of queries, independent of countries/users
+    assert len(statements) <= 16
+    assert dashboard["calculations"] == 0
+    assert dashboard["discounts"]["ai"]["buckets"] == [0] * 10
+    assert dashboard["platform_fee_stats"] == {"avg": 0, "min": 0, "max": 0, "median": 0}
+    assert dashboard["voice_overview"]["channel_type_counts"] == {"voice_only": 0, "text_voice": 0}
+    for key in ("stats", "stats_by_region", "user_stats", "profile_usage", "account_usage",
+                "modes", "popular_types", "seasonality", "top_users"):
+        assert key in dashboard
+
+
+def test_country_discounts_use_the_rate_card(monkeypatch, app_ctx):
+    """Country aggregates run for real (on SQLite) and manday discounts are taken against the rate card."""
+    engine = sa.create_engine("sqlite://")
+    table = app_module.Analytics.__table__
+    table.create(engine)
+    base = {"timestamp": datetime(2026, 1, 1), "ai_price": 0.8, "ai_rate_card_price": 1.0}
+    with engine.begin() as conn:
+        conn.execute(table.insert(), [
+            dict(base, country="India", bot_ui_manday_rate=18000, custom_ai_manday_rate=24000),
+            dict(base, country="India", bot_ui_manday_rate=0, custom_ai_manday_rate=30000),
+            dict(base, country="LATAM", bot_ui_manday_rate=400, custom_ai_manday_rate=500),
+        ])
+    with engine.connect() as conn:
+        monkeypatch.setattr(Query, "all", lambda self: conn.execute(self.statement).all())
+        rows = app_module._analytics_country_aggregates()
+
+    discounts = {row.country: app_module._country_avg_discount(row) for row in rows}
+    assert discounts["India"]["ai"] == pytest.approx(20.0)
+    assert discounts["India"]["bot_ui_manday"] == pytest.approx(10.0)  # 0 means "not set" and is skipped
+    assert discounts["India"]["custom_ai_manday"] == pytest.approx(10.0)
+    # LATAM rates depend on the dev location, which analytics rows do not record
+    assert discounts["LATAM"]["bot_ui_manday"] == discounts["LATAM"]["custom_ai_manday"] == 0.0
+    assert app_module._user_stats_manday_constants("LATAM") == (1330.0, 665.0)
+    assert app_module._user_stats_manday_constants("Nowhere") == (720.0, 360.0)
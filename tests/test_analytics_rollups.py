@@ -0,0 +1,88 @@
+"""Daily analytics rollups: quantile sketch accuracy and watermark-based incremental refresh."""
+
+import random
+from datetime import datetime
+
+import sqlalchemy as sa
+
+from analytics_rollups import QuantileSketch, RollupAggregate, refresh_rollups
+from app import Analytics, AnalyticsDailyRollup, AnalyticsRollupState
+
+
+def test_sketch_is_exact_when_small_and_close_when_large():
+    sketch = QuantileSketch()
+    for value in (4, 1, 3, 2):
+        sketch.add(value)
+    assert sketch.quantile(0.5) == 2.5  # percentile_cont
+
+    rng = random.Random(7)
+    values = sorted(rng.uniform(0, 1000) for _ in range(20000))
+    left, right = QuantileSketch(), QuantileSketch()
+    for i, value in enumerate(values):
+        (left if i % 2 else right).add(value)
+    merged = QuantileSketch.from_json(left.merge(right).to_json())
+    assert len(merged.centroids) <= merged.compression
+    assert abs(merged.quantile(0.5) - values[len(values) // 2]) < 10
+
+
+def test_refresh_only_processes_rows_above_watermark():
+    engine = sa.create_engine("sqlite://")
+    tables = [Analytics.__table__, AnalyticsDailyRollup.__table__, AnalyticsRollupState.__table__]
+    for table in tables:
+        table.create(engine)
+
+    def insert(*fees):
+        with engine.begin() as conn:
+            conn.execute(Analytics.__table__.insert(), [
+                {"timestamp": datetime(2026, 10, 1, 9), "inserted_at": datetime(2026, 10, 1, 9),
+                 "country": "India", "region": "",
+                 "calculation_route": "volumes", "platform_fee": fee, "ai_price": 1.0}
+                for fee in fees
+            ])
+
+    insert(100, 0, 300)
+    assert refresh_rollups(engine, *tables, batch_size=2) == 3
+    insert(500)
+    assert refresh_rollups(engine, *tables) == 1
+    assert refresh_rollups(engine, *tables) == 0
+
+    rollup = AnalyticsDailyRollup.__table__
+    with engine.connect() as conn:
+        rows = {r.metric: r for r in conn.execute(sa.select(rollup).where(rollup.c.country == "India"))}
+    assert rows["calculations"].value_count == 4
+    fee = RollupAggregate.from_row(rows["platform_fee"]._mapping).stats()
+    assert (fee["count"], fee["min"], fee["max"], fee["median"]) == (3, 100, 500, 300)  # 0 = not set
+
+
+def test_watermark_stops_at_rows_that_have_not_settled():
+    engine = sa.create_engine("sqlite://")
+    tables = [Analytics.__table__, AnalyticsDailyRollup.__table__, AnalyticsRollupState.__table__]
+    for table in tables:
+        table.create(engine)
+    settled = datetime(2026, 10, 1, 12)
+    with engine.begin() as conn:
+        insert = Analytics.__table__.insert()
+        conn.execute(insert, {"timestamp": datetime(2026, 10, 1, 9), "inserted_at": settled, "country": "India"})
+        # Replayed from the writer journal: old request timestamp, but the database inserts it just now
+        conn.execute(insert, {"timestamp": datetime(2026, 10, 1, 9, 30), "country": "India"})
+        conn.execute(insert, {"timestamp": datetime(2026, 10, 1, 10), "inserted_at": settled, "country": "India"})
+
+    assert refresh_rollups(engine, *tables) == 1
+    with engine.connect() as conn:
+        assert conn.execute(sa.select(AnalyticsRollupState.__table__.c.last_analytics_id)).scalar() == 1
+    assert refresh_rollups(engine, *tables, settle_seconds=0) == 2
+
+
+def test_bounded_catch_up_folds_at_most_one_batch():
+    engine = sa.create_engine("sqlite://")
+    tables = [Analytics.__table__, AnalyticsDailyRollup.__table__, AnalyticsRollupState.__table__]
+    for table in tables:
+        table.create(engine)
+    with engine.begin() as conn:
+        conn.execute(Analytics.__table__.insert(), [
+            {"timestamp": datetime(2026, 10, 1, 9), "inserted_at": datetime(2026, 10, 1, 9), "country": "India"}
+            for _ in range(5)
+        ])
+
+    assert refresh_rollups(engine, *tables, batch_size=2, max_batches=1, wait=False) == 2
+    assert refresh_rollups(engine, *tables, batch_size=2) == 3
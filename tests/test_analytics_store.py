@@ -0,0 +1,33 @@
+"""Parquet analytics store: appends past the high-water mark, later updates replace stored rows."""
+
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from analytics_store import MonthlyParquetStore  # noqa: E402
+
+
+def _rows(ids, downloaded=False):
+    return pd.DataFrame({
+        "id": pd.array(ids, dtype="Int64"),
+        "timestamp": pd.to_datetime(["2026-09-30 10:00" if i % 2 else "2026-10-01 10:00" for i in ids]),
+        "sow_downloaded": pd.array([downloaded] * len(ids), dtype="boolean"),
+    })
+
+
+def test_replace_supersedes_stored_rows_and_clear_resets(tmp_path):
+    store = MonthlyParquetStore(str(tmp_path), "analytics")
+    store.append(_rows([1, 2, 3]))
+    store.append(_rows([4]))
+    assert (store.high_water_mark(), store.row_count()) == (4, 4)
+
+    store.replace(_rows([2, 3], downloaded=True))
+    frame = store.load(["id", "sow_downloaded"]).set_index("id")
+    assert store.row_count() == 4
+    assert frame["sow_downloaded"].to_dict() == {1: False, 2: True, 3: True, 4: False}
+
+    store.clear()
+    assert (store.high_water_mark(), store.row_count()) == (0, 0)
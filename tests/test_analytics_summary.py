@@ -0,0 +1,115 @@
+"""The vectorized analytics summary matches per-group pandas exactly (same floats, same ordering)."""
+
+import gzip
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import update_analytics_daily as uad  # noqa: E402
+
+
+def _frame(rows=2000, seed=3):
+    rng = np.random.default_rng(seed)
+
+    def column(scale, missing=0.2):
+        values = rng.random(rows) * scale
+        values[rng.random(rows) < missing] = np.nan
+        return values
+
+    df = pd.DataFrame({
+        "timestamp": pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 90 * 86400, rows), unit="s"),
+        "user_name": rng.choice(["asha", "ben", "chen", "dana"], rows).astype(object),
+        "country": rng.choice(["India", "MENA", "APAC"], rows).astype(object),
+        "region": rng.choice(["", "North", "South"], rows).astype(object),
+        "calculation_route": rng.choice(["volumes", "bundle"], rows).astype(object),
+        "currency": rng.choice(["INR", "USD"], rows).astype(object),
+        "ai_agent_model": rng.choice(["gpt-4o", "gpt-5", ""], rows).astype(object),
+        "ai_agent_complexity": rng.choice(["regular", "complex"], rows).astype(object),
+    })
+    for name in uad.STAT_COLUMNS + ["bot_ui_mandays", "custom_ai_mandays"]:
+        df[name] = column(1000)
+    for msg_type in uad.MESSAGE_TYPES:
+        df[f"{msg_type}_rate_card_price"] = rng.choice([0.0, 2.0, np.nan], rows)
+    return df.sort_values("timestamp", ascending=False, ignore_index=True)
+
+
+def test_summary_matches_per_group_pandas():
+    df = _frame()
+    summary = uad.build_summary(df)
+
+    assert list(summary["country_stats"]) == ["APAC", "India", "MENA"]
+    for country, group in df.groupby("country"):
+        stats = summary["country_stats"][country]
+        fees = group["platform_fee"].dropna()
+        assert stats["platform_fee"] == {
+            "average": float(fees.mean()), "min": float(fees.min()),
+            "max": float(fees.max()), "median": float(fees.median()),
+        }
+        valid = group[["ai_price", "ai_rate_card_price"]].dropna()
+        valid = valid[valid["ai_rate_card_price"] != 0]
+        expected = ((valid["ai_rate_card_price"] - valid["ai_price"]) / valid["ai_rate_card_price"]).mean() * 100
+        assert stats["discounts"]["ai_message"] == float(expected)
+
+        weekly = group.set_index("timestamp")["platform_fee"].resample("W").sum()
+        assert stats["weekly_revenue"] == weekly.values.tolist()
+        assert stats["weekly_revenue_labels"] == [d.strftime("%Y-%m-%d") for d in weekly.index]
+        service = group[uad.PRICE_COLUMNS].sum().sort_values(ascending=False)
+        assert stats["service_usage"] == service.values.tolist()
+        assert stats["hourly_counts"] == group["timestamp"].dt.hour.value_counts().sort_index().values.tolist()
+
+        models = group["ai_agent_model"].astype(str)
+        assert summary["ai_model_counts_by_country"][country] == models[models != ""].value_counts().to_dict()
+
+    region = df[(df["country"] == "India") & (df["region"] == "North")]
+    assert summary["region_stats"]["India"]["North"]["committed_amount"]["average"] == float(
+        region["committed_amount"].dropna().mean()
+    )
+    # APAC has no rate card manday price: list falls back to the average
+    assert summary["country_stats"]["APAC"]["bot_ui_manday_rate"]["list"] == float(
+        df.loc[df["country"] == "APAC", "bot_ui_manday_rate"].dropna().mean()
+    )
+
+
+def test_summary_sections_served_gzipped_with_etag(flask_app, monkeypatch, tmp_path):
+    import app as app_module
+
+    summary = uad.clean_nans(uad.build_summary(_frame(rows=200)))
+    manifest = uad.write_summary_artifacts(summary, str(tmp_path))
+    monkeypatch.setattr(app_module, "ANALYTICS_SUMMARY_DIR", str(tmp_path))
+
+    with flask_app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess["authenticated"] = True
+        response = client.get("/analytics/summary/country_stats.json", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["Content-Encoding"] == "gzip"
+        etag = response.headers["ETag"]
+        assert manifest["sections"]["country_stats"]["etag"] in etag
+
+        assert client.get("/analytics/summary/country_stats.json", headers={
+            "Accept-Encoding": "gzip", "If-None-Match": etag,
+        }).status_code == 304
+        plain = client.get("/analytics/summary/overview.json")
+        assert "Content-Encoding" not in plain.headers
+        assert plain.get_json()["total_calculations"] == 200
+        assert client.get("/analytics/summary/nope.json").status_code == 404
+
+    # Unchanged content keeps its file name and ETag
+    assert uad.write_summary_artifacts(summary, str(tmp_path))["sections"] == manifest["sections"]
+
+
+def test_committed_section_artifacts_match_the_full_summary():
+    """The deployed app serves the tracked analytics_summary/ dir; it must agree with static/analytics_summary.json."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(os.path.join(root, "static", "analytics_summary.json")) as f:
+        full = json.load(f)
+    with open(os.path.join(root, "analytics_summary", "manifest.json")) as f:
+        manifest = json.load(f)
+    for section, keys in uad.SUMMARY_SECTIONS.items():
+        with gzip.open(os.path.join(root, "analytics_summary", manifest["sections"][section]["file"])) as f:
+            assert json.load(f) == {key: full[key] for key in keys if key in full}
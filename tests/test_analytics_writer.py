@@ -0,0 +1,118 @@
+"""Background analytics writer: batched inserts, drain on close, journal spill and replay."""
+
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+import pytest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+
+from analytics_writer import AnalyticsWriter
+
+
+@pytest.fixture()
+def env(tmp_path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'a.db'}"
+    db = SQLAlchemy(app)
+
+    class Event(db.Model):
+        __tablename__ = "events"
+        id = db.Column(db.Integer, primary_key=True)
+        timestamp = db.Column(db.DateTime, nullable=False)
+        step = db.Column(db.String(32), nullable=False)
+        country = db.Column(db.String(64), nullable=True)
+        flagged = db.Column(db.Boolean, nullable=True)
+
+    with app.app_context():
+        db.create_all()
+
+    def count():
+        with app.app_context():
+            return db.session.query(Event).count()
+
+    writer = AnalyticsWriter(app, db, [Event.__table__], str(tmp_path / "journal.jsonl"),
+                             flush_interval=60)
+    # Each process journals to its own file
+    return app, db, Event, writer, count, tmp_path / f"journal.{os.getpid()}.jsonl"
+
+
+def test_rows_are_queued_then_flushed_in_bulk(env):
+    _app, _db, Event, writer, count, _journal = env
+    for i in range(5):
+        row = {"timestamp": datetime.utcnow(), "step": "results"}
+        if i % 2:
+            row["country"] = "India"  # differing column sets are grouped separately
+        writer.enqueue(Event.__table__, row)
+    assert count() == 0
+    writer.flush()
+    assert count() == 5
+
+
+def test_close_drains_queue(env):
+    _app, _db, Event, writer, count, _journal = env
+    writer.enqueue(Event.__table__, {"timestamp": datetime.utcnow(), "step": "volumes"})
+    writer.close(timeout=5)
+    assert count() == 1
+
+
+def test_failed_insert_spills_to_journal_and_replays(env):
+    app, db, Event, writer, count, journal = env
+    with app.app_context():
+        db.drop_all()
+    writer.enqueue(Event.__table__, {"timestamp": datetime.utcnow(), "step": "prices"})
+    writer.flush()
+    assert journal.exists()
+
+    with app.app_context():
+        db.create_all()
+    writer.flush()
+    assert count() == 1
+    assert not journal.exists()
+
+
+def test_keyed_update_runs_after_queued_inserts(env):
+    app, db, Event, writer, _count, _journal = env
+    writer.enqueue(Event.__table__, {"timestamp": datetime(2026, 1, 1), "step": "results", "country": "India"})
+    writer.enqueue(Event.__table__, {"timestamp": datetime(2026, 1, 2), "step": "results", "country": "India"})
+    # Queued behind the inserts; only the latest matching row is flagged
+    writer.enqueue_update(Event.__table__, {"country": "India"}, {"flagged": True}, latest_by="timestamp")
+    writer.flush()
+    with app.app_context():
+        flags = [e.flagged for e in db.session.query(Event).order_by(Event.timestamp)]
+    assert flags == [None, True]
+
+
+def test_bad_row_is_retried_alone_then_dead_lettered(env):
+    app, db, Event, writer, count, journal = env
+    writer.max_attempts = 2
+    now = datetime.utcnow()
+    writer.enqueue(Event.__table__, {"timestamp": now, "step": "results"})
+    writer.enqueue(Event.__table__, {"timestamp": now, "step": None})  # NOT NULL: can never insert
+    writer.flush()
+    assert count() == 1  # the good row of the failed batch still lands
+    assert journal.exists()
+
+    writer.enqueue(Event.__table__, {"timestamp": now, "step": "volumes"})
+    writer.flush()
+    assert count() == 2
+    assert not journal.exists()
+    dead = [json.loads(line) for line in open(writer.dead_letter_path)]
+    assert [(r["values"]["step"], r["attempts"]) for r in dead] == [(None, 2)]
+
+
+def test_journal_of_an_exited_process_is_replayed(env):
+    _app, _db, Event, writer, count, journal = env
+    exited = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                            capture_output=True, text=True, check=True)
+    orphan = journal.with_name(f"journal.{exited.stdout.strip()}.jsonl")
+    orphan.write_text(json.dumps({"table": "events", "values": {
+        "timestamp": {"__datetime__": "2026-01-01T00:00:00"}, "step": "prices"}}) + "\n")
+    live = journal.with_name(f"journal.{os.getppid()}.jsonl")
+    live.write_text("")  # still owned by a running process: left alone
+    writer.flush()
+    assert count() == 1
+    assert not orphan.exists() and live.exists()
@@ -0,0 +1,51 @@
+"""calculate_pricing_batch must reproduce the scalar calculate_pricing results."""
+
+import random
+
+from calculator import calculate_margin_sweep, calculate_pricing, calculate_pricing_batch
+
+
+def test_batch_matches_scalar():
+    rng = random.Random(7)
+    countries = ['India', 'MENA', 'LATAM', 'Africa', 'Europe', 'APAC', 'Rest of the World']
+    rows = []
+    for _ in range(300):
+        rows.append((
+            rng.choice(countries),
+            rng.choice([0, 499, 500, 12000, 2500000]) + rng.randint(0, 50),
+            rng.randint(0, 300000),
+            rng.randint(0, 2000000),
+            rng.randint(0, 20000),
+            rng.choice([0, 100, 1500.5]),
+            rng.choice([None, 0.02, 1.1]),
+            rng.choice([None, 0.4]),
+            rng.choice([None, 0.05]),
+            rng.choice([None, 0.009]),
+        ))
+    cols = list(zip(*rows))
+    batch = calculate_pricing_batch(*cols)
+
+    for i, row in enumerate(rows):
+        scalar = calculate_pricing(*row)
+        for key in ('revenue', 'suggested_revenue', 'channel_cost', 'ai_costs', 'total_costs'):
+            assert batch[key][i] == scalar[key], (key, row)
+        assert f"{batch['margin'][i]:.3f}%" == scalar['margin']
+        assert f"{batch['suggested_margin'][i]:.3f}%" == scalar['suggested_margin']
+
+
+def test_margin_sweep_matches_scalar():
+    base = {'ai_volume': 1000, 'advanced_volume': 500, 'basic_utility_volume': 20000, 'ai_price': 0.9}
+    volumes = [1_000_000, 10_000_000, 50_000_000]
+    discounts = [0.0, 0.2, 0.4]
+    sweep = calculate_margin_sweep('India', base, 'basic_marketing', volumes, [100000], sweep_discounts=discounts)
+    assert len(sweep['margin']) == 3 and len(sweep['margin'][0]) == 3
+
+    for i, volume in enumerate(volumes):
+        suggested = calculate_pricing('India', 1000, 500, volume, 20000, 100000, ai_price=0.9)
+        base_price = suggested['line_items'][2]['suggested_price']
+        for j, discount in enumerate(discounts):
+            scalar = calculate_pricing(
+                'India', 1000, 500, volume, 20000, 100000,
+                ai_price=0.9, basic_marketing_price=base_price * (1 - discount),
+            )
+            assert f"{sweep['margin'][i][j]:.3f}%" == scalar['margin']
@@ -0,0 +1,17 @@
+"""Memoized manday breakdowns: shared across callers, safe to mutate."""
+
+import calculator
+
+
+def test_text_breakdown_is_cached_and_isolated():
+    calculator.clear_manday_caches()
+    inputs = {'channel_type': 'text_only', 'one_time_dev_profile': 'simple_structured_api', 'num_apis_price': '7', 'country': 'India'}
+    first = calculator.calculate_total_mandays_breakdown(inputs)
+    first['effort_lines'].append({'label': 'mutated'})
+    first['implementation_effort_lines'][0]['days'] = -1
+
+    # Non-effort keys don't affect the fingerprint
+    second = calculator.calculate_total_mandays_breakdown(dict(inputs, country='MENA', ai_volume=5))
+    assert {'label': 'mutated'} not in second['effort_lines']
+    assert second['implementation_effort_lines'][0]['days'] >= 0
+    assert calculator._cached_text_implementation_mandays.cache_info().hits >= 1
@@ -0,0 +1,38 @@
+"""RateCard snapshot: resolved fallbacks and immutability."""
+
+import pytest
+
+import pricing_config
+from pricing_config import get_rate_card, refresh_rate_card
+
+
+def test_rate_card_resolves_fallbacks():
+    card = get_rate_card()
+    assert card.country('Nowhere') is card.country('APAC')
+    assert card.country('LATAM').manday_rates('India') == (400.0, 500.0)
+    assert card.country('India').manday_rates('LATAM') == (20000.0, 30000.0)
+    # Unknown dev locations keep the first configured rate instead of zeroing dev cost
+    assert card.country('LATAM').manday_rates('Mars') == (580.0, 750.0)
+    alias = 'ACE Agentic pro (gpt-4o-mini)'
+    target = pricing_config.AI_AGENT_MODEL_LEGACY_ALIASES[alias]
+    assert card.ai_model_cost('India', alias, 'regular') == card.ai_model_cost('India', target, 'regular') > 0
+
+
+def test_rate_card_is_read_only_and_refreshes(monkeypatch):
+    card = get_rate_card()
+    with pytest.raises(AttributeError):
+        card.version = 'x'
+    with pytest.raises(TypeError):
+        card.country('India').meta_costs['marketing'] = 1.0
+    assert refresh_rate_card() is card
+
+    patched = dict(pricing_config.meta_costs_table)
+    patched['India'] = dict(patched['India'], marketing=9.0)
+    monkeypatch.setattr(pricing_config, 'meta_costs_table', patched)
+    try:
+        fresh = refresh_rate_card()
+        assert fresh.version != card.version
+        assert fresh.country('India').meta_costs['marketing'] == 9.0
+    finally:
+        monkeypatch.undo()
+        refresh_rate_card()
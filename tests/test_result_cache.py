@@ -0,0 +1,87 @@
+"""Result cache: canonical keys, LRU bound, rate-card invalidation, copy isolation."""
+
+from result_cache import ResultCache, canonical_hash
+
+
+def test_canonical_hash_ignores_key_order_and_number_spelling():
+    a = canonical_hash({"ai_volume": 1000, "country": "India"}, {"ai_price": 1})
+    b = canonical_hash({"country": "India", "ai_volume": 1000.0}, {"ai_price": 1.0})
+    assert a == b
+    assert a != canonical_hash({"country": "India", "ai_volume": 1001}, {"ai_price": 1})
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = ResultCache(maxsize=2)
+    cache.put("a", "v1", 1)
+    cache.put("b", "v1", 2)
+    assert cache.get("a", "v1") == 1  # a is now most recent
+    cache.put("c", "v1", 3)
+    assert cache.get("b", "v1") is None
+    assert cache.get("a", "v1") == 1
+    assert cache.get("c", "v1") == 3
+
+
+def test_rate_card_version_change_empties_cache():
+    cache = ResultCache()
+    cache.put("a", "v1", {"x": 1})
+    assert cache.get("a", "v2") is None
+    assert len(cache) == 0
+
+
+def test_values_are_isolated_from_callers():
+    cache = ResultCache()
+    value = {"rows": [1]}
+    cache.put("a", "v1", value)
+    value["rows"].append(2)
+    got = cache.get("a", "v1")
+    got["rows"].append(3)
+    assert cache.get("a", "v1") == {"rows": [1]}
+
+
+def test_get_or_compute_and_discard_calculation():
+    cache = ResultCache()
+    calls = []
+    key = cache.key("calc-1", "results_page", {"country": "India"}, {})
+
+    def compute():
+        calls.append(1)
+        return {"total": 5}
+
+    assert cache.get_or_compute(key, "v1", compute) == {"total": 5}
+    assert cache.get_or_compute(key, "v1", compute) == {"total": 5}
+    assert len(calls) == 1
+    cache.discard_calculation("calc-1")
+    cache.get_or_compute(key, "v1", compute)
+    assert len(calls) == 2
+
+
+def test_cached_pricing_simulation_matches_direct(app_ctx):
+    from app import RESULT_CACHE, cached_pricing_simulation, calculate_pricing_simulation
+
+    inputs = {"country": "India", "ai_volume": "10000", "advanced_volume": "5000",
+              "basic_marketing_volume": "20000", "basic_utility_volume": "3000",
+              "platform_fee": "100000", "committed_amount": "0"}
+    RESULT_CACHE.clear()
+    first = cached_pricing_simulation("calc-x", inputs, None)
+    second = cached_pricing_simulation("calc-x", inputs, None)
+    assert first == second == calculate_pricing_simulation(inputs, None)
+    assert RESULT_CACHE.hits == 1
+
+
+def test_rate_table_edit_invalidates_cached_simulation(app_ctx, monkeypatch):
+    import pricing_config
+    from app import RESULT_CACHE, cached_pricing_simulation
+
+    inputs = {"country": "India", "basic_marketing_volume": "20000", "platform_fee": "100000"}
+    RESULT_CACHE.clear()
+    before = cached_pricing_simulation("calc-y", inputs, None)
+    patched = dict(pricing_config.meta_costs_table)
+    patched["India"] = dict(patched["India"], marketing=patched["India"]["marketing"] + 1)
+    monkeypatch.setattr(pricing_config, "meta_costs_table", patched)
+    try:
+        after = cached_pricing_simulation("calc-y", inputs, None)
+        assert after["meta_costs"]["marketing"] == before["meta_costs"]["marketing"] + 1
+        assert RESULT_CACHE.hits == 0
+    finally:
+        monkeypatch.undo()
+        pricing_config.refresh_rate_card()
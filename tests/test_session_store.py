@@ -0,0 +1,86 @@
+"""Server-side session store: cookie carries only an id, data round-trips, TTL eviction."""
+
+import time
+
+import pytest
+from flask import Flask, session
+
+from session_store import (
+    FileSystemSessionStore,
+    SQLiteSessionStore,
+    create_session_interface,
+)
+
+
+def _make_app(interface):
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.session_interface = interface
+
+    @app.route("/set")
+    def set_value():
+        session["results"] = {"total": 123.45, "rows": ["x"] * 500}
+        return "ok"
+
+    @app.route("/get")
+    def get_value():
+        return {"results": session.get("results")}
+
+    @app.route("/clear")
+    def clear():
+        session.clear()
+        return "ok"
+
+    return app
+
+
+@pytest.fixture(params=["sqlite", "filesystem"])
+def interface(request, tmp_path):
+    path = tmp_path / ("sessions.db" if request.param == "sqlite" else "sessions")
+    return create_session_interface(request.param, str(path), ttl=60)
+
+
+def test_cookie_holds_only_opaque_id_and_data_round_trips(interface):
+    app = _make_app(interface)
+    client = app.test_client()
+    resp = client.get("/set")
+    cookie = resp.headers["Set-Cookie"]
+    sid = cookie.split(";", 1)[0].split("=", 1)[1]
+    assert len(sid) < 100
+    assert "total" not in cookie
+    data = client.get("/get").get_json()
+    assert data["results"]["total"] == 123.45
+    assert len(data["results"]["rows"]) == 500
+
+
+def test_clearing_session_deletes_cookie_and_stored_copy(interface):
+    app = _make_app(interface)
+    client = app.test_client()
+    client.get("/set")
+    sid = client.get_cookie("session").value
+    resp = client.get("/clear")
+    assert "session=;" in resp.headers["Set-Cookie"]
+    assert interface.store.get(sid) is None
+
+
+def test_untouched_session_sets_no_cookie(interface):
+    app = _make_app(interface)
+    resp = app.test_client().get("/get")
+    assert "Set-Cookie" not in resp.headers
+
+
+def test_cookie_backend_keeps_flask_default():
+    assert create_session_interface("cookie", "", 60) is None
+    with pytest.raises(ValueError):
+        create_session_interface("redis", "", 60)
+
+
+@pytest.mark.parametrize("store_cls", [SQLiteSessionStore, FileSystemSessionStore])
+def test_expired_sessions_are_evicted(store_cls, tmp_path):
+    path = tmp_path / ("s.db" if store_cls is SQLiteSessionStore else "s")
+    store = store_cls(str(path), ttl=1)
+    store.set("a" * 43, "{}")
+    assert store.get("a" * 43) is not None
+    time.sleep(1.1)
+    assert store.get("a" * 43) is None
+    assert store.cleanup() == 1
@@ -0,0 +1,28 @@
+"""The bisect-based committed slab index must agree with a plain linear scan."""
+
+from calculator import get_committed_amount_rate_for_volume, get_committed_amount_rates
+from pricing_config import committed_amount_slabs, nearest_programmed_bundles
+
+
+def _scan(slabs, amount):
+    for lower, upper, rates in slabs:
+        if lower <= amount < upper:
+            return rates
+    return None
+
+
+def test_slab_lookups_match_linear_scan():
+    for country, slabs in committed_amount_slabs.items():
+        bounds = sorted({b for s in slabs for b in s[:2]})
+        amounts = [-1, 0.5, 2500000] + bounds + [b - 0.01 for b in bounds] + [b + 0.01 for b in bounds]
+        for amount in amounts:
+            expected = _scan(slabs, amount)
+            assert get_committed_amount_rates(country, amount) == (expected or slabs[0][2])
+            assert get_committed_amount_rate_for_volume(country, 'ai', amount) == (expected or slabs[-1][2])['ai']
+
+            lower = [b for b in bounds if b <= amount]
+            upper = [b for b in bounds if b >= amount]
+            assert nearest_programmed_bundles(country, amount) == (
+                max(lower) if lower else bounds[0],
+                min(upper) if upper else bounds[-1],
+            )
@@ -0,0 +1,53 @@
+"""Generated SOWs are cached on disk by input hash, bounded in size, evicted least recently used first."""
+
+import os
+
+from sow_cache import SowArtifactCache
+
+
+def test_builds_once_per_key(tmp_path):
+    cache = SowArtifactCache(str(tmp_path))
+    builds = []
+
+    def build():
+        builds.append(1)
+        return b"docx-bytes"
+
+    key = cache.key({"country": "India", "volume": 100}, {"name": "Asha"})
+    assert key == cache.key({"volume": 100.0, "country": "India"}, {"name": "Asha"})
+    first = cache.get_or_build(key, build)
+    second = cache.get_or_build(key, build)
+    assert first == second and open(first, "rb").read() == b"docx-bytes"
+    assert len(builds) == 1 and (cache.hits, cache.misses) == (1, 1)
+    assert cache.key({"country": "India", "volume": 101}, {"name": "Asha"}) != key
+
+
+def test_evicts_least_recently_used_past_the_size_bound(tmp_path):
+    cache = SowArtifactCache(str(tmp_path), max_bytes=250)
+    for age, key in enumerate(["a", "b"]):
+        path = cache.put(key, b"x" * 100)
+        os.utime(path, ns=(age * 10**9, age * 10**9))
+    assert cache.get("a")  # "a" is now the most recently used
+    cache.put("c", b"x" * 100)
+
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_rebuilds_a_document_evicted_before_it_is_opened(tmp_path):
+    cache = SowArtifactCache(str(tmp_path))
+    cache.put("k", b"old")
+    real_get = cache.get
+
+    def get_then_evict(key):
+        path = real_get(key)
+        if path is not None and cache.misses == 0:
+            os.remove(path)  # another worker evicts it between lookup and open
+        return path
+
+    cache.get = get_then_evict
+    with cache.open_or_build("k", lambda: b"rebuilt") as f:
+        assert f.read() == b"rebuilt"
+    assert cache.misses == 1
+    assert cache.open("missing") is None
@@ -0,0 +1,76 @@
+"""Background SOW builds: bounded backlog, one build per document, pollable status and download."""
+
+import threading
+import time
+
+import pytest
+
+import app as app_module
+from sow_cache import SowArtifactCache
+from sow_jobs import DONE, FAILED, QueueFull, SowJobQueue
+
+
+def _wait(job, timeout=10):
+    deadline = time.time() + timeout
+    while job.status not in (DONE, FAILED) and time.time() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+def test_queue_dedups_bounds_backlog_and_reports_failures():
+    queue = SowJobQueue(max_workers=1, max_pending=2)
+    release = threading.Event()
+    builds = []
+
+    def slow_build():
+        builds.append(1)
+        release.wait(5)
+        return "/tmp/a.docx"
+
+    first = queue.submit("a", slow_build)
+    assert queue.submit("a", slow_build) is first
+    queue.submit("b", lambda: "/tmp/b.docx")
+    with pytest.raises(QueueFull):
+        queue.submit("c", lambda: "/tmp/c.docx")
+    release.set()
+    assert _wait(first).status == DONE and first.path == "/tmp/a.docx"
+    assert len(builds) == 1
+
+    def broken():
+        raise ValueError("template missing")
+
+    failed = _wait(queue.submit("d", broken))
+    assert (failed.status, failed.error) == (FAILED, "template missing")
+    # A failed job can be resubmitted
+    assert _wait(queue.submit("d", lambda: "/tmp/d.docx")).status == DONE
+
+
+def test_sow_details_background_job_round_trip(flask_app, monkeypatch, tmp_path):
+    monkeypatch.setattr(app_module, "SOW_CACHE", SowArtifactCache(str(tmp_path)))
+    monkeypatch.setattr(app_module, "SOW_JOBS", SowJobQueue(max_workers=1))
+    monkeypatch.setattr(app_module, "record_funnel_event", lambda *args, **kwargs: None)
+    email = sorted(app_module.SOW_BETA_EMAILS)[0]
+
+    with flask_app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess.update(
+                authenticated=True, csrf_token="t",
+                profile={"email": email, "name": "Asha", "country": "India"},
+                inputs={"country": "India"}, results={"platform_fee": 1}, final_price_details={"total": 1},
+                final_inclusions=["Journey Builder"],
+            )
+        response = client.post(
+            "/sow-details", data={"csrf_token": "t", "background": "1", "business_objective": "Grow"},
+            headers={"Origin": "http://localhost"},
+        )
+        assert response.status_code == 202
+        job = response.get_json()
+        _wait(app_module.SOW_JOBS.get(job["job_id"]))
+
+        status = client.get(job["status_url"]).get_json()
+        assert status["status"] == "done"
+        download = client.get(job["download_url"])
+        assert download.status_code == 200 and download.data[:2] == b"PK"
+        assert download.headers["ETag"].strip('"') == job["job_id"]
+        download.close()
+        assert client.get("/sow-jobs/unknown").status_code == 404
@@ -0,0 +1,42 @@
+"""The master SOW template is parsed once; each request edits its own copy."""
+
+import io
+import zipfile
+from pathlib import Path
+
+from sow_template import SowTemplate
+
+TEMPLATE = Path(__file__).resolve().parent.parent / "master sow" / "Latest SOW Master Copy 2026.docx"
+
+
+def _document_xml(doc):
+    bio = io.BytesIO()
+    doc.save(bio)
+    return zipfile.ZipFile(bio).read("word/document.xml")
+
+
+def test_copies_are_independent_and_saved_edits_stick():
+    template = SowTemplate(TEMPLATE)
+    first, second = template.new_document(), template.new_document()
+    first.doc.add_paragraph("ONLY-IN-FIRST")
+    first.table_by_row_label("Business Objective").rows[1].cells[1].text = "Grow revenue"
+
+    assert b"ONLY-IN-FIRST" in _document_xml(first.doc)
+    assert b"Grow revenue" in _document_xml(first.doc)
+    assert b"ONLY-IN-FIRST" not in _document_xml(second.doc)
+    assert b"ONLY-IN-FIRST" not in _document_xml(template.new_document().doc)
+
+
+def test_indexed_lookups_match_a_table_scan():
+    sow = SowTemplate(TEMPLATE).new_document()
+    roles = sow.table_by_headers(["Roles", "Responsibilities", "Credentials"])
+    assert [c.text.strip() for c in roles.rows[0].cells][:3] == ["Roles", "Responsibilities", "Credentials"]
+    assert len(sow.tables_by_headers(["Reviewer Name", "Title"])) == 2
+    assert sow.table_by_headers(["No such header"]) is None
+
+    ai_table = sow.table_by_row_label("Model Name")
+    assert ai_table.rows[1].cells[0].text.strip() == "Model Name"
+    # Tables removed from this copy are no longer found
+    ai_table._tbl.getparent().remove(ai_table._tbl)
+    assert sow.table_by_row_label("Model Name") is None
+    assert sow.table_by_row_label("Dialer") is not None
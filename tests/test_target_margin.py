@@ -0,0 +1,35 @@
+"""solve_prices_for_target_margin must land exactly on the requested margin."""
+
+import pytest
+
+from calculator import calculate_pricing, solve_prices_for_target_margin
+
+
+def _margin(result):
+    return float(result['margin'].rstrip('%'))
+
+
+@pytest.mark.parametrize('country', ['India', 'MENA', 'Europe'])
+@pytest.mark.parametrize('shift', [-2, 3])
+def test_uniform_discount_hits_target(country, shift):
+    args = (country, 2000, 1500, 400000, 80000, 500)
+    current = solve_prices_for_target_margin(*args, 0)['current_margin']
+    solved = solve_prices_for_target_margin(*args, current + shift)
+    # Lower target -> discount, higher target -> markup increase (negative discount)
+    assert (solved['uniform_discount'] > 0) == (shift < 0)
+    prices = solved['uniform_prices']
+    result = calculate_pricing(
+        *args,
+        ai_price=prices['ai'], advanced_price=prices['advanced'],
+        basic_marketing_price=prices['basic_marketing'], basic_utility_price=prices['basic_utility'],
+    )
+    assert _margin(result) == pytest.approx(current + shift, abs=1e-3)
+
+
+def test_line_floor_price_hits_target():
+    args = ('India', 0, 0, 400000, 80000, 100000)
+    solved = solve_prices_for_target_margin(*args, 35, basic_utility_price=0.02)
+    floor = solved['line_floor_prices']['basic_marketing']
+    result = calculate_pricing(*args, basic_marketing_price=floor, basic_utility_price=0.02)
+    assert _margin(result) == pytest.approx(35, abs=1e-3)
+    assert solved['line_floor_prices']['ai'] is None
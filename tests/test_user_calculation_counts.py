@@ -0,0 +1,22 @@
+"""Per-user calculation counts are maintained incrementally on analytics inserts."""
+
+import sqlalchemy as sa
+
+from app import UserCalculationCount, _bump_user_calculation_counts
+
+
+def test_counts_accumulate_across_batches():
+    engine = sa.create_engine("sqlite://")
+    table = UserCalculationCount.__table__
+    table.create(engine)
+
+    with engine.begin() as conn:
+        _bump_user_calculation_counts(conn, [
+            {"user_name": "Asha"}, {"user_name": "Ben"}, {"user_name": "Asha"}, {"user_name": ""}, {},
+        ])
+    with engine.begin() as conn:
+        _bump_user_calculation_counts(conn, [{"user_name": "Ben"}, {"user_name": "Ben"}])
+
+    with engine.connect() as conn:
+        counts = dict(conn.execute(sa.select(table.c.user_name, table.c.calculation_count)).all())
+    assert counts == {"Asha": 2, "Ben": 3}
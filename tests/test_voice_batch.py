@@ -0,0 +1,58 @@
+"""calculate_voice_calling_costs_batch must reproduce the scalar voice calling costs."""
+
+import random
+
+import pytest
+
+from calculator import (
+    VOICE_MINUTE_COLUMNS,
+    calculate_voice_calling_costs,
+    calculate_voice_calling_costs_batch,
+)
+
+
+@pytest.mark.parametrize('country,region', [
+    ('India', None), ('MENA', 'UAE'), ('MENA', None), ('LATAM', 'Brazil'), ('Europe', None),
+])
+@pytest.mark.parametrize('settings', [
+    {'voice_ai_enabled': 'Yes'},
+    {'voice_ai_enabled': 'No'},
+    {'voice_ai_enabled': 'Yes', 'vr_pstn_out_overage': '0.9', 'vr_wa_in_per_min': '0.05'},
+])
+def test_voice_batch_matches_scalar(country, region, settings):
+    rng = random.Random(11)
+    choices = [0, 10, 49999, 50000, 50000.5, 50001, 250000, 3_000_000, 7_000_000]
+    rows = [
+        {key: rng.choice(choices) + rng.choice([0, rng.random()]) for key in VOICE_MINUTE_COLUMNS}
+        for _ in range(200)
+    ]
+    shared = dict(settings, region=region)
+    columns = {key: [row[key] for row in rows] for key in VOICE_MINUTE_COLUMNS}
+    batch = calculate_voice_calling_costs_batch(columns, shared, country)
+
+    for i, row in enumerate(rows):
+        scalar = calculate_voice_calling_costs(dict(shared, **row), country)
+        for key, value in scalar.items():
+            assert batch[key][i] == value, (key, row)
+
+
+def test_wa_voice_tier_lookup_is_total():
+    from pricing_config import get_whatsapp_voice_tier
+
+    assert get_whatsapp_voice_tier('India', 50000)['min_minutes'] == 0
+    # Between whole-minute tier bounds stays in the lower tier
+    assert get_whatsapp_voice_tier('India', 50000.5)['min_minutes'] == 0
+    assert get_whatsapp_voice_tier('India', 50001)['min_minutes'] == 50001
+    assert get_whatsapp_voice_tier('India', 10 ** 9)['max_minutes'] == float('inf')
+
+
+@pytest.mark.parametrize('tiers', [
+    [{'min_minutes': 0, 'max_minutes': 100}, {'min_minutes': 100, 'max_minutes': float('inf')}],
+    [{'min_minutes': 0, 'max_minutes': 100}, {'min_minutes': 150, 'max_minutes': float('inf')}],
+    [{'min_minutes': 0, 'max_minutes': 100}, {'min_minutes': 101, 'max_minutes': 500}],
+])
+def test_wa_voice_tier_validation_rejects_bad_tables(tiers):
+    from pricing_config import _build_wa_voice_tier_index
+
+    with pytest.raises(ValueError):
+        _build_wa_voice_tier_index({'Test': tiers})
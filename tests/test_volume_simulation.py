@@ -0,0 +1,55 @@
+"""Monte Carlo volume simulation: degenerate spreads reproduce calculate_pricing."""
+
+import numpy as np
+import pytest
+
+import calculator
+from calculator import calculate_pricing, simulate_volume_uncertainty
+
+
+def test_zero_spread_matches_scalar():
+    volumes = {'ai_volume': 1000, 'advanced_volume': 0, 'basic_marketing_volume': 300000, 'basic_utility_volume': 5000}
+    sim = simulate_volume_uncertainty('India', volumes, 100000, {'type': 'uniform', 'spread': 0.0}, draws=1000, seed=1)
+    scalar = calculate_pricing('India', 1000, 0, 300000, 5000, 100000)
+    assert sim['revenue']['p10'] == sim['revenue']['p90'] == pytest.approx(scalar['revenue'])
+    assert sim['margin']['p50'] == pytest.approx(float(scalar['margin'].rstrip('%')), abs=1e-3)
+
+
+def test_spread_orders_percentiles():
+    volumes = {'basic_marketing_volume': 300000}
+    sim = simulate_volume_uncertainty(
+        'India', volumes, 0, {'type': 'lognormal', 'sigma': 0.5}, committed_amount=20000, seed=2,
+    )
+    assert sim['draws'] == 100000
+    assert sim['revenue']['p10'] < sim['revenue']['p50'] < sim['revenue']['p90']
+    assert 0 < sim['overage_probability'] < 1
+
+
+def test_voice_commitments_are_not_sampled(monkeypatch):
+    seen = {}
+    batch = calculator.calculate_voice_calling_costs_batch
+
+    def capture(columns, inputs, country):
+        seen.update(columns)
+        return batch(columns, inputs, country)
+
+    monkeypatch.setattr(calculator, 'calculate_voice_calling_costs_batch', capture)
+    voice_inputs = {'pstn_inbound_ai_minutes': 5000, 'pstn_inbound_committed': 4000}
+    simulate_volume_uncertainty(
+        'India', {'ai_volume': 1000}, 0, {'type': 'uniform', 'spread': 0.5},
+        voice_inputs=voice_inputs, draws=500, seed=3,
+    )
+    assert np.all(seen['pstn_inbound_committed'] == 4000)
+    assert seen['pstn_inbound_ai_minutes'].std() > 0
+
+
+@pytest.mark.parametrize("distribution", ["uniform", ["lognormal", 0.3], 0.2])
+def test_route_rejects_a_distribution_that_is_not_an_object(flask_app, distribution):
+    with flask_app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess["authenticated"] = True
+            sess["csrf_token"] = "token"
+        resp = client.post("/api/volume-simulation", json={"distribution": distribution, "draws": 10},
+                           headers={"X-CSRF-Token": "token"})
+    assert resp.status_code == 400
+    assert "distribution" in resp.get_json()["error"]
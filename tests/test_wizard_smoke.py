@@ -63,3 +63,13 @@ def test_volumes_step_renders_voice_options(client):
     assert resp.status_code == 200
     assert b'value="voice_only"' in resp.data
     assert b'value="text_voice"' in resp.data
+
+
+def test_volumes_step_lists_ai_models_from_names_only(client):
+    """The model dropdown is rendered from model names; prices come from /api/ai-prices."""
+    from pricing_config import AI_AGENT_PRICING
+
+    _authenticate(client)
+    resp = client.get("/?step=volumes")
+    model = next(iter(AI_AGENT_PRICING["International"]))
+    assert f'<option value="{model}"'.encode() in resp.data